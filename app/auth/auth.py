@@ -1,31 +1,43 @@
+from __future__ import annotations
+
 import logging
 from datetime import (
     datetime,
     timedelta,
 )
+from functools import cached_property
+from typing import TYPE_CHECKING
 
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt
-from passlib.context import CryptContext
 
 from app.auth.settings import AuthorizationSettings
 from models import pydantic
 from models.enum.auth import AuthFlow
 
 
+if TYPE_CHECKING:
+    from passlib.context import CryptContext
+
+
 class Authorization:
     """Local authorization manager."""
 
     logger: logging.Logger
-    crypto_manager: CryptContext
     settings: AuthorizationSettings
 
     def __init__(self, settings: AuthorizationSettings):
         self.logger = logging.getLogger(self.__class__.__name__)
         self.settings = settings
-        self.crypto_manager = CryptContext(schemes=["bcrypt"], deprecated="auto")
         self.oauth2_schema = OAuth2PasswordBearer(tokenUrl=settings.LOGIN_URL)
 
+    @cached_property
+    def crypto_manager(self) -> CryptContext:
+        """Password hashing context, created on the first use, since loading of bcrypt backend is slow"""
+        from passlib.context import CryptContext  # pylint: disable=import-outside-toplevel
+
+        return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
     def get_password_hash(self, password: str) -> str:
         """Get hash of the provided password.
 
@@ -1,2 +1,2 @@
-from app.cache.cache import Cache
 from app.cache.cache_base import CacheBase
+from app.cache.cache import Cache
@@ -1,8 +1,10 @@
 from app.cache import CacheBase
+from app.cache.idempotency import IdempotencyCache
 from app.cache.project import ProjectCache
 
 
 class Cache(CacheBase):
     """Application cache manager"""
 
+    idempotency: IdempotencyCache = IdempotencyCache()
     projects: ProjectCache = ProjectCache()
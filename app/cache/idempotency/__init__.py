@@ -0,0 +1 @@
+from app.cache.idempotency.idempotency import IdempotencyCache
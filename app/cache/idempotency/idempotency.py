@@ -0,0 +1,70 @@
+import dataclasses
+import json
+import uuid
+
+from app.cache import CacheBase
+from models.dataclass import IdempotentRequest
+from services import Services
+
+
+COMPLETED_TTL_SEC = 600  # completed requests are replayed for the retries within this time
+PENDING_TTL_SEC = 30  # reservation of a request, that crashed before completing, is released after this time
+# Deletes the reservation only if it was not taken over by another request after its expiration
+RELEASE_SCRIPT = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+
+
+class IdempotencyCache(CacheBase):
+    """
+    Working with requests by their idempotency keys
+    - a key is reserved atomically before the request is processed (reserve), so concurrent retries are not processed
+      twice
+    - the reservation is replaced with the response (complete) or deleted, if the request failed (release)
+    """
+
+    async def reserve(self, idempotency_key: uuid.UUID, request: IdempotentRequest) -> IdempotentRequest | None:
+        """Reserve the key for the request, unless it is already reserved.
+
+        Args:
+            idempotency_key (uuid.UUID): idempotency key of the request
+            request (IdempotentRequest): request in progress
+
+        Returns:
+            IdempotentRequest | None: None if the key is reserved for the request, otherwise the request holding the key
+        """
+        key = self._make_key(idempotency_key)
+        while not await Services.redis.set(key, self._dump(request), nx=True, ex=PENDING_TTL_SEC):
+            stored = await Services.redis.get(key)
+            # Otherwise the key expired between the commands and is reserved again
+            if stored is not None:
+                return IdempotentRequest(**json.loads(stored))
+        return None
+
+    async def complete(self, idempotency_key: uuid.UUID, request: IdempotentRequest, response: str) -> None:
+        """Replace the reservation with the response for the retries.
+
+        Args:
+            idempotency_key (uuid.UUID): idempotency key of the request
+            request (IdempotentRequest): request holding the key
+            response (str): JSON of the response body
+        """
+        completed = dataclasses.replace(request, response=response)
+        await Services.redis.set(self._make_key(idempotency_key), self._dump(completed), ex=COMPLETED_TTL_SEC)
+
+    async def release(self, idempotency_key: uuid.UUID, request: IdempotentRequest) -> None:
+        """Delete the reservation of the failed request, so it can be retried.
+
+        Args:
+            idempotency_key (uuid.UUID): idempotency key of the request
+            request (IdempotentRequest): request holding the key
+        """
+        await Services.redis.eval(RELEASE_SCRIPT, 1, self._make_key(idempotency_key), self._dump(request))
+
+    @staticmethod
+    def _make_key(idempotency_key: uuid.UUID) -> str:
+        """Redis key of the request"""
+        return f"idempotency.{idempotency_key}"
+
+    @staticmethod
+    def _dump(request: IdempotentRequest) -> str:
+        """Stored value of the request"""
+        return json.dumps(dataclasses.asdict(request))
@@ -1,14 +1,38 @@
+import json
+import pickle
 import uuid
+from functools import cached_property
 
 from app.cache import CacheBase
 from models import (
+    enum,
     pydantic,
     redisorm,
 )
+from services import Services
+from services.local_cache import LocalCache
+from services.metrics import CacheMetrics
+
+
+CACHED_FIELDS = ("name", "description")  # fields of redisorm.Projects, the name goes first as it is always set
 
 
 class ProjectCache(CacheBase):
-    """Working with projects"""
+    """
+    Working with projects
+    - two tiers: in-process cache (local) in front of Redis
+    - local entries are compact JSON of the project fields, they are invalidated by writes of the process
+    """
+
+    @cached_property
+    def local(self) -> LocalCache:
+        """In-process tier, created on the first use, when services are configured"""
+        return LocalCache(name="projects", params=Services.config.local_cache, collector=Services.collector)
+
+    @cached_property
+    def redis_metrics(self) -> CacheMetrics:
+        """Hits and misses of the Redis tier"""
+        return Services.collector.bind_cache(cache="projects", tier=enum.CollectorCacheTier.REDIS)
 
     async def get(self, project_id: uuid.UUID) -> redisorm.Projects | None:
         """Get project cache by its ID.
@@ -19,7 +43,41 @@ class ProjectCache(CacheBase):
         Returns:
             redisorm.Projects | None: project cache if found, None otherwise
         """
-        return await redisorm.Projects.get(id=project_id)
+        local_value = self.local.get(project_id)
+        if local_value is not None:
+            return self._load(project_id=project_id, value=local_value)
+        project_cache = (await self._read(project_ids=[project_id])).get(project_id)
+        if project_cache is None:
+            self.redis_metrics.miss.inc()
+            return None
+        self.redis_metrics.hit.inc()
+        self.local.set(project_id, self._dump(project_cache))
+        return project_cache
+
+    async def get_many(self, project_ids: list[uuid.UUID]) -> dict[uuid.UUID, redisorm.Projects]:
+        """Get projects cache by their IDs, projects missing in the process are read with a single MGET.
+
+        Args:
+            project_ids (list[uuid.UUID]): project IDs
+
+        Returns:
+            dict[uuid.UUID, redisorm.Projects]: projects cache by ID, missing projects are omitted
+        """
+        projects_cache: dict[uuid.UUID, redisorm.Projects] = {}
+        for project_id in project_ids:
+            local_value = self.local.get(project_id)
+            if local_value is not None:
+                projects_cache[project_id] = self._load(project_id=project_id, value=local_value)
+        missing_ids = [project_id for project_id in project_ids if project_id not in projects_cache]
+        if not missing_ids:
+            return projects_cache
+        for project_id, project_cache in (await self._read(project_ids=missing_ids)).items():
+            projects_cache[project_id] = project_cache
+            self.local.set(project_id, self._dump(project_cache))
+        found = len(projects_cache) - (len(project_ids) - len(missing_ids))
+        self.redis_metrics.hit.inc(found)
+        self.redis_metrics.miss.inc(len(missing_ids) - found)
+        return projects_cache
 
     async def create(self, project: pydantic.ProjectModel) -> redisorm.Projects:
         """Cache project.
@@ -32,4 +90,78 @@ class ProjectCache(CacheBase):
         """
         project_cache = redisorm.Projects(**project.model_dump())
         await project_cache.save()
+        self.invalidate(project_ids=[project.id])
         return project_cache
+
+    async def set_many(self, projects: list[pydantic.ProjectModel]) -> list[redisorm.Projects]:
+        """Cache projects with a single pipelined request.
+
+        The pipeline is created for the call, so concurrent calls do not share the buffered commands.
+
+        Args:
+            projects (list[pydantic.ProjectModel]): project models
+
+        Raises:
+            redis.RedisError: if projects could not be cached
+
+        Returns:
+            list[redisorm.Projects]: projects cache
+        """
+        projects_cache = [redisorm.Projects(**project.model_dump()) for project in projects]
+        if projects_cache:
+            async with Services.redis.pipeline(transaction=False) as pipeline:
+                for project_cache in projects_cache:
+                    for key, value in project_cache.mapping.items():
+                        pipeline.set(name=key, value=value, ex=redisorm.Projects.Meta.ttl)
+                await pipeline.execute()
+            self.invalidate(project_ids=[project.id for project in projects])
+        return projects_cache
+
+    @staticmethod
+    async def _read(project_ids: list[uuid.UUID]) -> dict[uuid.UUID, redisorm.Projects]:
+        """Reads projects from Redis with a single MGET round trip.
+
+        The fields are read by the keys of the storage ORM items, the ORM itself pings Redis before every read.
+
+        Args:
+            project_ids (list[uuid.UUID]): project IDs
+
+        Returns:
+            dict[uuid.UUID, redisorm.Projects]: projects cache by ID, missing projects are omitted
+        """
+        keys = [
+            f"{redisorm.Projects.Meta.table.format(id=project_id)}.{field}"
+            for project_id in project_ids
+            for field in CACHED_FIELDS
+        ]
+        values = await Services.redis.mget(keys)
+        projects_cache: dict[uuid.UUID, redisorm.Projects] = {}
+        for index, project_id in enumerate(project_ids):
+            fields = values[index * len(CACHED_FIELDS) : (index + 1) * len(CACHED_FIELDS)]
+            if fields[0] is None:
+                continue
+            projects_cache[project_id] = redisorm.Projects(
+                id=project_id,
+                **{field: pickle.loads(value) for field, value in zip(CACHED_FIELDS, fields) if value is not None},
+            )
+        return projects_cache
+
+    def invalidate(self, project_ids: list[uuid.UUID]) -> None:
+        """Remove changed projects from the in-process tier, Redis entries are overwritten by the writes.
+
+        Args:
+            project_ids (list[uuid.UUID]): IDs of the changed projects
+        """
+        for project_id in project_ids:
+            self.local.invalidate(project_id)
+
+    @staticmethod
+    def _dump(project_cache: redisorm.Projects) -> bytes:
+        """Compact representation of the project in the in-process tier"""
+        return json.dumps([project_cache.name, project_cache.description], separators=(",", ":")).encode()
+
+    @staticmethod
+    def _load(project_id: uuid.UUID, value: bytes) -> redisorm.Projects:
+        """Project from the in-process tier"""
+        name, description = json.loads(value)
+        return redisorm.Projects(id=project_id, name=name, description=description)
@@ -1,6 +1,15 @@
 import uuid
+from typing import AsyncIterator
 
-from sqlalchemy import select
+from sqlalchemy import (
+    any_,
+    bindparam,
+    select,
+)
+from sqlalchemy.dialects.postgresql import (
+    ARRAY,
+    insert,
+)
 
 from app.db.db_base import DatabaseBase
 from models.pydantic.db.project import ProjectModel
@@ -26,6 +35,61 @@ class ProjectDb(DatabaseBase):
             Services.collector.increment_database_total(model=project_db)
         return ProjectModel.model_validate(project_db)
 
+    async def create_if_not_exists(self, project_model: ProjectModel) -> ProjectModel | None:
+        """Create project, if a project with its ID does not exist.
+
+        A duplicate is skipped by the database, so it costs neither a failed statement nor a rollback.
+
+        Args:
+            project_model (ProjectModel): project model
+
+        Returns:
+            ProjectModel | None: created project model, None if the project already exists
+        """
+        query = (
+            insert(Projects)
+            .values(**project_model.model_dump())
+            .on_conflict_do_nothing(index_elements=[Projects.id])
+            .returning(*Projects.__table__.columns)
+        )
+        async with Services.database.session() as session:
+            result = await session.execute(query)
+            project = result.fetchone()
+        if not project:
+            return None
+        Services.collector.increment_database_total(model=Projects)
+        return ProjectModel.model_validate(project)
+
+    async def upsert_many(self, project_models: list[ProjectModel]) -> list[ProjectModel]:
+        """Create or update projects with a single statement.
+
+        Args:
+            project_models (list[ProjectModel]): project models, the last one wins for repeated IDs
+
+        Returns:
+            list[ProjectModel]: upserted project models
+        """
+        # A statement can not update the same row twice, so repeated IDs are collapsed
+        projects = list({project_model.id: project_model for project_model in project_models}.values())
+        await Services.database.bulk_create(table_name=Projects.__tablename__, objects=projects, on_conflict="update")
+        Services.collector.increment_database_total(model=Projects, count=len(projects))
+        return projects
+
+    async def create_many(self, project_models: list[ProjectModel]) -> int:
+        """Create projects with a single statement, skipping already existing ones.
+
+        Args:
+            project_models (list[ProjectModel]): project models
+
+        Returns:
+            int: number of created projects
+        """
+        created = await Services.database.bulk_create(
+            table_name=Projects.__tablename__, objects=project_models, on_conflict="nothing"
+        )
+        Services.collector.increment_database_total(model=Projects, count=created)
+        return created
+
     async def get(self, project_id: uuid.UUID) -> ProjectModel | None:
         """Get project by its ID.
 
@@ -36,9 +100,62 @@ class ProjectDb(DatabaseBase):
             ProjectModel | None: project model if found, None otherwise
         """
         query = select(Projects).where(Projects.id == project_id)
-        async with Services.database.session() as session:
+        async with Services.database.session(readonly=True) as session:
             result = await session.execute(query)
         project = result.fetchone()
         if not project:
             return None
         return ProjectModel.model_validate(project)
+
+    async def get_many(self, project_ids: list[uuid.UUID]) -> list[ProjectModel]:
+        """Get projects by their IDs with a single query.
+
+        IDs are bound as one array parameter, so the statement is prepared once for any number of IDs.
+
+        Args:
+            project_ids (list[uuid.UUID]): project IDs
+
+        Returns:
+            list[ProjectModel]: found project models in arbitrary order
+        """
+        if not project_ids:
+            return []
+        ids = bindparam("project_ids", value=project_ids, type_=ARRAY(Projects.id.type))
+        query = select(*Projects.__table__.columns).where(Projects.id == any_(ids))
+        async with Services.database.session(readonly=True) as session:
+            result = await session.execute(query)
+        return [ProjectModel.model_validate(project) for project in result.fetchall()]
+
+    async def list_after(self, cursor: uuid.UUID | None, limit: int) -> list[ProjectModel]:
+        """Get a page of projects ordered by ID, starting after the cursor.
+
+        Keyset pagination: the page is found by the primary key index, so its cost does not depend on the page number.
+
+        Args:
+            cursor (uuid.UUID | None): ID of the last project of the previous page, None for the first page
+            limit (int): maximum number of projects
+
+        Returns:
+            list[ProjectModel]: project models
+        """
+        query = select(*Projects.__table__.columns).order_by(Projects.id).limit(limit)
+        if cursor is not None:
+            query = query.where(Projects.id > cursor)
+        async with Services.database.session(readonly=True) as session:
+            result = await session.execute(query)
+        return [ProjectModel.model_validate(project) for project in result.fetchall()]
+
+    async def stream_after(self, cursor: uuid.UUID | None) -> AsyncIterator[list[ProjectModel]]:
+        """Iterate over all projects ordered by ID, starting after the cursor, with a server-side cursor.
+
+        Args:
+            cursor (uuid.UUID | None): ID of the last already received project, None to start from the first one
+
+        Yields:
+            list[ProjectModel]: project models fetched at once
+        """
+        query = select(*Projects.__table__.columns).order_by(Projects.id)
+        if cursor is not None:
+            query = query.where(Projects.id > cursor)
+        async for partition in Services.database.stream(query):
+            yield [ProjectModel.model_validate(project) for project in partition]
@@ -49,7 +49,7 @@ class UserDb(DatabaseBase):
             UserModel | None: user model if found, None otherwise
         """
         query = select(Users).where(Users.id == user_id)
-        async with Services.database.session() as session:
+        async with Services.database.session(readonly=True) as session:
             result = await session.execute(query)
         user = result.fetchone()
         if not user:
@@ -66,7 +66,7 @@ class UserDb(DatabaseBase):
             UserModel | None: user model if found, None otherwise
         """
         query = select(Users).where(Users.email == email)
-        async with Services.database.session() as session:
+        async with Services.database.session(readonly=True) as session:
             result = await session.execute(query)
         user = result.fetchone()
         if not user:
@@ -99,7 +99,7 @@ class UserDb(DatabaseBase):
             .join(Projects, Projects.id == ProjectUsers.project_id)
             .where(and_(Users.email == email, Projects.id == project_id, ServiceUsers.service == ConstSettings.SERVICE))
         )
-        async with Services.database.session() as session:
+        async with Services.database.session(readonly=True) as session:
             result = await session.execute(query)
         user = result.fetchone()
         if not user:
@@ -116,6 +116,6 @@ class UserDb(DatabaseBase):
             bool: True if user exists, False otherwise
         """
         query = exists(Users).where(Users.email == email).select()
-        async with Services.database.session() as session:
+        async with Services.database.session(readonly=True) as session:
             result = await session.execute(query)
         return bool(result.scalar())
@@ -3,6 +3,7 @@ import logging
 from fastapi import FastAPI
 from prometheus_fastapi_instrumentator import Instrumentator
 
+from app.middlewares import UnitOfWorkMiddleware
 from app.router.router import router
 from services import Services
 
@@ -24,15 +25,14 @@ class Application(FastAPI):
         # Routers
         self.add_event_handler("startup", self.mount_routers)
 
-        # Services. Comment service if not used in microservice.
-        self.add_event_handler("startup", self.services.initialize_services)
-        self.add_event_handler("startup", self.services.initialize_db)
-        self.add_event_handler("startup", self.services.initialize_cache)
-        self.add_event_handler("startup", self.services.initialize_broker)
-        self.add_event_handler("startup", self.services.initialize_s3)
+        # Services are initialized concurrently. Comment service in Services.initialize if not used in microservice.
+        self.add_event_handler("startup", self.services.initialize)
 
         # Shut down
         self.add_event_handler("shutdown", self.services.stop_broker)
+
+        # Middlewares
+        self.add_middleware(UnitOfWorkMiddleware)
         self.prepare_fastapi_instrumentator()
 
     def mount_routers(self) -> None:
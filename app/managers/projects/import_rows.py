@@ -0,0 +1,116 @@
+import csv
+import json
+from typing import (
+    Any,
+    AsyncIterator,
+)
+
+
+MAX_LINE_BYTES = 1024 * 1024  # longer lines are reported as invalid rows, so a body without line breaks is not buffered
+
+Line = bytes | ValueError  # line without the line break or the error of an over-long line
+Row = tuple[int, dict[str, Any] | Exception]  # line number and the parsed row or its error
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Line]:
+    """Splits a streamed body into lines, only the incomplete last line of a chunk is kept in memory.
+
+    Lines are not decoded here, so an invalid line is reported by the row parsers as a row error.
+
+    Args:
+        chunks: body chunks as they are received
+
+    Yields:
+        Lines without line breaks, or the error for a line longer than MAX_LINE_BYTES
+    """
+    rest = b""
+    skipping = False  # the end of an over-long line, that was already reported, is dropped
+    async for chunk in chunks:
+        lines = (rest + chunk).split(b"\n")
+        rest = lines.pop()
+        for line in lines:
+            if skipping:
+                skipping = False
+            elif len(line) > MAX_LINE_BYTES:
+                yield ValueError(f"Line is longer than {MAX_LINE_BYTES} bytes")
+            else:
+                yield line.rstrip(b"\r")
+        if len(rest) > MAX_LINE_BYTES:
+            if not skipping:
+                yield ValueError(f"Line is longer than {MAX_LINE_BYTES} bytes")
+            skipping = True
+            rest = b""
+    if rest and not skipping:
+        yield rest.rstrip(b"\r")
+
+
+async def iter_ndjson_rows(lines: AsyncIterator[Line]) -> AsyncIterator[Row]:
+    """Parses JSON objects, one per line. Blank lines are skipped.
+
+    Args:
+        lines: lines of the body
+
+    Yields:
+        Line number and the object, or the error if the line is not a JSON object
+    """
+    number = 0
+    async for line in lines:
+        number += 1
+        if isinstance(line, ValueError):
+            yield number, line
+            continue
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line.decode())
+        except ValueError as error:
+            yield number, error
+            continue
+        yield number, row if isinstance(row, dict) else ValueError("Line is not a JSON object")
+
+
+async def iter_csv_rows(lines: AsyncIterator[Line]) -> AsyncIterator[Row]:
+    """Parses CSV records, the first record is the header with column names. Blank lines are skipped.
+
+    Quoted values may contain line breaks, so lines are joined until their quotes are balanced.
+
+    Args:
+        lines: lines of the body
+
+    Yields:
+        Line number of the record start and the record, or the error if the record is invalid
+    """
+    header: list[str] | None = None
+    record: list[str] = []
+    record_bytes = 0
+    number = start = 0
+    async for line in lines:
+        number += 1
+        if not record:
+            start = number
+        try:
+            if isinstance(line, ValueError):
+                raise line
+            record_bytes += len(line)
+            if record_bytes > MAX_LINE_BYTES:
+                raise ValueError(f"Record is longer than {MAX_LINE_BYTES} bytes")
+            record.append(line.decode())
+        except ValueError as error:
+            record, record_bytes = [], 0
+            yield start, error
+            continue
+        text = "\n".join(record)
+        if text.count('"') % 2:
+            continue
+        record, record_bytes = [], 0
+        if not text.strip():
+            continue
+        values = next(csv.reader([text]))
+        if header is None:
+            header = values
+        elif len(values) != len(header):
+            yield start, ValueError(f"Expected {len(header)} values, got {len(values)}")
+        else:
+            yield start, dict(zip(header, values))
+    if record:
+        yield start, ValueError("Unterminated quoted value")
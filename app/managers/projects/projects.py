@@ -1,31 +1,173 @@
+import asyncio
+import base64
+import binascii
+import hashlib
+import json
 import uuid
+from functools import cached_property
+from typing import AsyncIterator
+
+from pydantic import ValidationError
 
 from app.cache import Cache
 from app.db import Database
 from app.managers.managers_base import ManagersBase
+from app.managers.projects.import_rows import (
+    iter_csv_rows,
+    iter_lines,
+    iter_ndjson_rows,
+)
 from models import pydantic
+from models.dataclass import IdempotentRequest
 from services import Services
+from services.single_flight import SingleFlight
+
+
+IMPORT_CHUNK_SIZE = 5000  # projects created by a single statement
+MAX_REPORTED_ERRORS = 100  # invalid rows reported in the import response
 
 
 class ProjectsManager(ManagersBase):
     """Working with projects"""
 
     async def create_project_sync(
-        self, project_info: pydantic.PostProjectSyncRequest
+        self, project_info: pydantic.PostProjectSyncRequest, idempotency_key: uuid.UUID | None = None
     ) -> pydantic.PostProjectSyncResponse:
         """Logic of endpoint POST `/{project}/project_sync`
 
+        The idempotency key is reserved before the project is created, so concurrent retries do not create it twice.
+        The project is committed before it is cached and before the response is stored for the key,
+        so neither of them refers to a project, that failed to commit.
+
         Args:
             project_info (pydantic.PostProjectSyncRequest): info about the project to create
+            idempotency_key (uuid.UUID | None): key of the request, retries with the key get the stored response
+
+        Raises:
+            pydantic.ObjectAlreadyExists: if the project already exists
+            pydantic.IdempotencyKeyReused: if the key was used for another request
+            pydantic.IdempotentRequestInProgress: if the request with the key is still in progress
 
         Returns:
             pydantic.PostProjectSyncResponse: created project
         """
+        if not idempotency_key:
+            return await self._create_project(project_info=project_info)
+
+        # Generated ID differs between retries, so only the sent fields identify the request
+        sent_fields = {field: getattr(project_info, field) for field in sorted(project_info.model_fields_set)}
+        request = IdempotentRequest(
+            request_hash=hashlib.sha256(json.dumps(sent_fields, default=str).encode()).hexdigest()
+        )
+        holder = await Cache.idempotency.reserve(idempotency_key=idempotency_key, request=request)
+        if holder:
+            if holder.request_hash != request.request_hash:
+                raise pydantic.IdempotencyKeyReused(idempotency_key=str(idempotency_key))
+            if holder.response is None:
+                raise pydantic.IdempotentRequestInProgress(idempotency_key=str(idempotency_key))
+            return pydantic.PostProjectSyncResponse.model_validate_json(holder.response)
+
+        try:
+            response = await self._create_project(project_info=project_info)
+        except BaseException:
+            await Cache.idempotency.release(idempotency_key=idempotency_key, request=request)
+            raise
+        await Cache.idempotency.complete(
+            idempotency_key=idempotency_key, request=request, response=response.model_dump_json()
+        )
+        return response
+
+    @staticmethod
+    async def _create_project(project_info: pydantic.PostProjectSyncRequest) -> pydantic.PostProjectSyncResponse:
+        """Creates the project, commits it and caches it"""
         project_model = pydantic.ProjectModel.model_validate(project_info)
-        project = await Database.projects.create(project_model=project_model)
+        async with Services.database.unit_of_work():
+            project = await Database.projects.create_if_not_exists(project_model=project_model)
+        if not project:
+            raise pydantic.ObjectAlreadyExists(message_prefix="Object already exists", project_id=project_model.id)
         await Cache.projects.create(project=project)
         return pydantic.PostProjectSyncResponse.model_validate(project)
 
+    async def upsert_projects(self, project_models: list[pydantic.ProjectModel]) -> None:
+        """Logic of batched projects synchronization from the broker
+
+        Args:
+            project_models (list[pydantic.ProjectModel]): projects to create or update
+        """
+        projects = await Database.projects.upsert_many(project_models=project_models)
+        await Cache.projects.set_many(projects=projects)
+
+    async def import_projects(
+        self, chunks: AsyncIterator[bytes], content_type: str
+    ) -> pydantic.PostProjectsImportResponse:
+        """Logic of endpoint POST `/projects/import`
+
+        Rows are validated as they are received and created in chunks, so memory does not depend on the body size.
+        A chunk is written while the next one is parsed. Chunks are committed independently and existing projects
+        are skipped, so a failed import can be repeated. Imported projects are cached on the first read.
+
+        Args:
+            chunks (AsyncIterator[bytes]): body chunks as they are received
+            content_type (str): `text/csv` for CSV with a header, NDJSON otherwise
+
+        Raises:
+            pydantic.DatabaseException: if a chunk could not be written, previous chunks stay imported
+
+        Returns:
+            pydantic.PostProjectsImportResponse: numbers of imported, skipped and invalid rows
+        """
+        lines = iter_lines(chunks)
+        rows = iter_csv_rows(lines) if content_type.startswith("text/csv") else iter_ndjson_rows(lines)
+        response = pydantic.PostProjectsImportResponse(imported=0, skipped=0, failed=0, errors=[])
+        projects: list[pydantic.ProjectModel] = []
+        written = 0
+        writing: asyncio.Task[int] | None = None
+        try:
+            async for line, row in rows:
+                try:
+                    if isinstance(row, Exception):
+                        raise row
+                    # Empty and null values are omitted, so defaults of the model are used
+                    projects.append(
+                        pydantic.ProjectModel.model_validate(
+                            {key: value for key, value in row.items() if value is not None and value != ""}
+                        )
+                    )
+                except (ValidationError, ValueError) as error:
+                    response.failed += 1
+                    if len(response.errors) < MAX_REPORTED_ERRORS:
+                        response.errors.append(pydantic.ImportRowError(line=line, error=self._format_row_error(error)))
+                    continue
+                if len(projects) >= IMPORT_CHUNK_SIZE:
+                    if writing:
+                        response.imported += await writing
+                    writing = asyncio.create_task(self._create_chunk(project_models=projects))
+                    written += len(projects)
+                    projects = []
+            if writing:
+                response.imported += await writing
+            if projects:
+                response.imported += await self._create_chunk(project_models=projects)
+                written += len(projects)
+        finally:
+            if writing and not writing.done():
+                writing.cancel()
+        response.skipped = written - response.imported
+        return response
+
+    @staticmethod
+    async def _create_chunk(project_models: list[pydantic.ProjectModel]) -> int:
+        """Creates a chunk of imported projects, it is committed independently of the request"""
+        async with Services.database.unit_of_work():
+            return await Database.projects.create_many(project_models=project_models)
+
+    @staticmethod
+    def _format_row_error(error: Exception) -> str:
+        """Short description of the invalid row"""
+        if isinstance(error, ValidationError):
+            return "; ".join(f"{'.'.join(map(str, detail['loc']))}: {detail['msg']}" for detail in error.errors())
+        return str(error)
+
     async def create_project_async(
         self, project_info: pydantic.PostProjectAsyncRequest
     ) -> pydantic.PostProjectAsyncResponse:
@@ -41,9 +183,18 @@ class ProjectsManager(ManagersBase):
         await Services.broker.produce(topic="dev.admin.cdc.project.0", message=project_model)
         return pydantic.PostProjectAsyncResponse.model_validate(project_info)
 
+    @cached_property
+    def project_loads(self) -> SingleFlight[pydantic.ProjectModel | None]:
+        """Loads of projects missing in the cache, shared by concurrent requests"""
+        return SingleFlight(
+            name="projects", params=Services.config.single_flight, collector=Services.collector, redis=Services.redis
+        )
+
     async def get_project(self, project_id: uuid.UUID) -> pydantic.GetProjectResponse:
         """Logic of endpoint GET `/{project}/project`
 
+        Concurrent misses of the same project wait for a single database read and cache write.
+
         Args:
             project_id (uuid.UUID): project ID
 
@@ -58,8 +209,111 @@ class ProjectsManager(ManagersBase):
             return pydantic.GetProjectResponse(
                 id=project_cache.id, name=project_cache.name, description=project_cache.description
             )
-        project = await Database.projects.get(project_id=project_id)
+        project = await self.project_loads.do(
+            key=str(project_id),
+            load=lambda: self._load_project(project_id=project_id),
+            lookup=lambda: self._lookup_project(project_id=project_id),
+        )
         if not project:
             raise pydantic.ObjectNotFound(message_prefix="Object not found", project_id=project_id)
-        await Cache.projects.create(project=project)
         return pydantic.GetProjectResponse.model_validate(project)
+
+    @staticmethod
+    async def _load_project(project_id: uuid.UUID) -> pydantic.ProjectModel | None:
+        """Reads the project from the database and caches it"""
+        project = await Database.projects.get(project_id=project_id)
+        if project:
+            await Cache.projects.create(project=project)
+        return project
+
+    @staticmethod
+    async def _lookup_project(project_id: uuid.UUID) -> pydantic.ProjectModel | None:
+        """Reads the project cached by another process"""
+        project_cache = await Cache.projects.get(project_id=project_id)
+        if not project_cache:
+            return None
+        return pydantic.ProjectModel(id=project_cache.id, name=project_cache.name, description=project_cache.description)
+
+    async def get_projects(self, project_ids: list[uuid.UUID]) -> pydantic.PostProjectsBatchGetResponse:
+        """Logic of endpoint POST `/projects:batchGet`
+
+        Cache is read with a single MGET, only missing projects are read from the database with a single query,
+        then they are cached with a single pipeline.
+
+        Args:
+            project_ids (list[uuid.UUID]): project IDs, may repeat
+
+        Returns:
+            pydantic.PostProjectsBatchGetResponse: found projects in the order of the IDs and IDs of missing projects
+        """
+        unique_ids = list(dict.fromkeys(project_ids))
+        projects: dict[uuid.UUID, pydantic.GetProjectResponse] = {
+            project_id: pydantic.GetProjectResponse(
+                id=project_cache.id, name=project_cache.name, description=project_cache.description
+            )
+            for project_id, project_cache in (await Cache.projects.get_many(project_ids=unique_ids)).items()
+        }
+        missing_ids = [project_id for project_id in unique_ids if project_id not in projects]
+        if missing_ids:
+            projects_db = await Database.projects.get_many(project_ids=missing_ids)
+            await Cache.projects.set_many(projects=projects_db)
+            projects.update(
+                (project.id, pydantic.GetProjectResponse.model_validate(project)) for project in projects_db
+            )
+        return pydantic.PostProjectsBatchGetResponse(
+            items=[projects[project_id] for project_id in project_ids if project_id in projects],
+            not_found=[project_id for project_id in unique_ids if project_id not in projects],
+        )
+
+    async def list_projects(self, cursor: str | None, limit: int) -> pydantic.GetProjectsResponse:
+        """Logic of endpoint GET `/projects`
+
+        Args:
+            cursor (str | None): opaque cursor of the page, None for the first page
+            limit (int): maximum number of projects in the page
+
+        Raises:
+            pydantic.InvalidCursor: if the cursor is malformed
+
+        Returns:
+            pydantic.GetProjectsResponse: projects and the cursor of the next page
+        """
+        # One more project is read to know whether the next page exists
+        projects = await Database.projects.list_after(cursor=self._decode_cursor(cursor), limit=limit + 1)
+        next_cursor = self._encode_cursor(projects[limit - 1].id) if len(projects) > limit else None
+        return pydantic.GetProjectsResponse(items=projects[:limit], next_cursor=next_cursor)
+
+    async def export_projects(self, cursor: str | None) -> AsyncIterator[bytes]:
+        """Logic of endpoint GET `/projects` in the NDJSON mode
+
+        Args:
+            cursor (str | None): opaque cursor of the page to start from, None to export all projects
+
+        Raises:
+            pydantic.InvalidCursor: if the cursor is malformed
+
+        Returns:
+            AsyncIterator[bytes]: JSON lines of the projects, a chunk per fetched partition
+        """
+        project_id = self._decode_cursor(cursor)
+
+        async def lines() -> AsyncIterator[bytes]:
+            async for projects in Database.projects.stream_after(cursor=project_id):
+                yield b"".join(project.model_dump_json().encode() + b"\n" for project in projects)
+
+        return lines()
+
+    @staticmethod
+    def _encode_cursor(project_id: uuid.UUID) -> str:
+        """Opaque cursor pointing after the project"""
+        return base64.urlsafe_b64encode(project_id.bytes).rstrip(b"=").decode()
+
+    @staticmethod
+    def _decode_cursor(cursor: str | None) -> uuid.UUID | None:
+        """ID of the project the cursor points after"""
+        if cursor is None:
+            return None
+        try:
+            return uuid.UUID(bytes=base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        except (binascii.Error, ValueError) as error:
+            raise pydantic.InvalidCursor(cursor=cursor) from error
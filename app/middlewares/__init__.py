@@ -0,0 +1 @@
+from app.middlewares.unit_of_work import UnitOfWorkMiddleware
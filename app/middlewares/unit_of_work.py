@@ -0,0 +1,65 @@
+import logging
+
+from fastapi.exceptions import HTTPException
+from starlette.responses import JSONResponse
+from starlette.types import (
+    ASGIApp,
+    Message,
+    Receive,
+    Scope,
+    Send,
+)
+
+from models import pydantic
+from services import Services
+
+
+class UnitOfWorkMiddleware:
+    """
+    Runs every HTTP request in a database unit of work.
+    Writes are committed right before the response is started, so the client never gets a success for data
+    that failed to commit. If the commit fails, its error response is sent instead of the prepared one.
+    Error responses roll the writes back. Repositories of the request share one transaction, so a failed
+    repository call rolls back all writes made by the request before it.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async with Services.database.unit_of_work() as unit_of_work:
+            is_replaced = False
+
+            async def send_after_commit(message: Message) -> None:
+                nonlocal is_replaced
+                if is_replaced:
+                    # The body of the prepared response is dropped, the commit error is sent instead
+                    return
+                if message["type"] == "http.response.start":
+                    if message["status"] < 400:
+                        try:
+                            await unit_of_work.commit()
+                        except Exception as commit_error:  # pylint: disable=broad-exception-caught
+                            is_replaced = True
+                            await self._send_error(commit_error=commit_error, scope=scope, receive=receive, send=send)
+                            return
+                    else:
+                        await unit_of_work.rollback()
+                await send(message)
+
+            await self.app(scope, receive, send_after_commit)
+
+    @staticmethod
+    async def _send_error(commit_error: Exception, scope: Scope, receive: Receive, send: Send) -> None:
+        """Sends the error response of the failed commit, as it would be sent for the error raised by a manager"""
+        if not isinstance(commit_error, HTTPException):
+            logging.exception(commit_error)
+            commit_error = pydantic.DatabaseException(message="Failed to perform database operation")
+        response = JSONResponse(
+            content={"detail": commit_error.detail}, status_code=commit_error.status_code, headers=commit_error.headers
+        )
+        await response(scope, receive, send)
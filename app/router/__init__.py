@@ -1,3 +1,6 @@
 from app.router.auth.auth import router_auth
-from app.router.projects.project import router_projects
+from app.router.projects.project import (
+    router_projects,
+    router_projects_collection,
+)
 from app.router.system.system import router_system
@@ -1,15 +1,24 @@
 import uuid
+from typing import (
+    Annotated,
+    Literal,
+)
 
 from fastapi import (
     APIRouter,
+    Header,
+    Query,
+    Request,
     status,
 )
+from fastapi.responses import StreamingResponse
 
 from app.managers import Managers
 from models import pydantic
 
 
 router_projects = APIRouter()
+router_projects_collection = APIRouter()
 
 
 @router_projects.post(
@@ -18,11 +27,19 @@ router_projects = APIRouter()
     summary="Synchronous project creation",
     status_code=status.HTTP_201_CREATED,
 )
-async def create_project_sync(project_info: pydantic.PostProjectSyncRequest) -> pydantic.PostProjectSyncResponse:
+async def create_project_sync(
+    project_info: pydantic.PostProjectSyncRequest,
+    idempotency_key: Annotated[uuid.UUID | None, Header(description="Key to retry the request safely")] = None,
+) -> pydantic.PostProjectSyncResponse:
     """
     Create project in a sync way.
 
     ### Request
+    #### Headers
+    * **Idempotency-Key**: UUID of the request. Retries with the same key within 10 minutes return the response of
+    the first request instead of creating the project again. A retry sent while the first request is in progress
+    gets 409 Conflict and can be repeated later.
+
     #### Body
     * **id**: project ID. None if ID has to be autogenerated.
     * **name**: project name
@@ -33,7 +50,7 @@ async def create_project_sync(project_info: pydantic.PostProjectSyncRequest) ->
     * **name**: project name
     * **description**: project description. Can be None.
     """
-    return await Managers.projects.create_project_sync(project_info=project_info)
+    return await Managers.projects.create_project_sync(project_info=project_info, idempotency_key=idempotency_key)
 
 
 @router_projects.post(
@@ -82,3 +99,93 @@ async def get_project(project_id: uuid.UUID) -> pydantic.GetProjectResponse:
     * **description**: project description. Can be None.
     """
     return await Managers.projects.get_project(project_id)
+
+
+@router_projects_collection.get(
+    path="",
+    response_model=pydantic.GetProjectsResponse,
+    summary="List projects",
+    responses={
+        status.HTTP_200_OK: {"content": {"application/x-ndjson": {}}},
+    },
+)
+async def list_projects(
+    cursor: Annotated[str | None, Query(description="Cursor of the page from the previous response")] = None,
+    limit: Annotated[int, Query(ge=1, le=1000, description="Maximum number of projects in the page")] = 100,
+    response_format: Annotated[Literal["json", "ndjson"], Query(alias="format")] = "json",
+) -> pydantic.GetProjectsResponse | StreamingResponse:
+    """
+    List projects ordered by ID.
+
+    ### Request
+    #### Query parameters
+    * **cursor**: `next_cursor` of the previous page. None for the first page.
+    * **limit**: maximum number of projects in the page
+    * **format**: `json` for a page, `ndjson` to stream all projects after the cursor, a JSON object per line
+
+    ### Response
+    * **items**: projects, each with **id**, **name** and **description**
+    * **next_cursor**: cursor of the next page. None on the last page.
+    """
+    if response_format == "ndjson":
+        lines = await Managers.projects.export_projects(cursor=cursor)
+        return StreamingResponse(content=lines, media_type="application/x-ndjson")
+    return await Managers.projects.list_projects(cursor=cursor, limit=limit)
+
+
+@router_projects_collection.post(
+    path="/import",
+    response_model=pydantic.PostProjectsImportResponse,
+    summary="Bulk import of projects",
+    status_code=status.HTTP_200_OK,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/x-ndjson": {"schema": {"type": "string"}},
+                "text/csv": {"schema": {"type": "string"}},
+            },
+        },
+    },
+)
+async def import_projects(request: Request) -> pydantic.PostProjectsImportResponse:
+    """
+    Create projects from a streamed body. Existing projects are skipped, so a failed import can be repeated.
+
+    ### Request
+    #### Body
+    NDJSON (`application/x-ndjson`) with a project per line or CSV (`text/csv`) with a header. Fields:
+    * **id**: project ID. Empty if ID has to be autogenerated.
+    * **name**: project name
+    * **description**: project description. Can be empty.
+
+    ### Response
+    * **imported**: number of created projects
+    * **skipped**: number of already existing projects
+    * **failed**: number of invalid rows
+    * **errors**: line and error of the first invalid rows
+    """
+    return await Managers.projects.import_projects(
+        chunks=request.stream(), content_type=request.headers.get("content-type", "")
+    )
+
+
+@router_projects_collection.post(
+    path=":batchGet",
+    response_model=pydantic.PostProjectsBatchGetResponse,
+    summary="Find several projects",
+    status_code=status.HTTP_200_OK,
+)
+async def get_projects(request: pydantic.PostProjectsBatchGetRequest) -> pydantic.PostProjectsBatchGetResponse:
+    """
+    Get projects by their IDs with a single request instead of a request per project.
+
+    ### Request
+    #### Body
+    * **ids**: project IDs, up to 1000
+
+    ### Response
+    * **items**: found projects in the order of the requested IDs, each with **id**, **name** and **description**
+    * **not_found**: IDs of missing projects
+    """
+    return await Managers.projects.get_projects(project_ids=request.ids)
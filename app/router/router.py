@@ -4,6 +4,7 @@ from app.auth import auth_manager
 from app.router import (
     router_auth,
     router_projects,
+    router_projects_collection,
     router_system,
 )
 from models.enum import AuthFlow
@@ -12,7 +13,13 @@ from models.enum import AuthFlow
 router = APIRouter()
 
 
-# all routers will contain prefix="/projects/{project_uuid}" excluding router_system
+router.include_router(
+    router=router_projects_collection,
+    prefix="/projects",
+    tags=["Projects"],
+)
+
+# all routers will contain prefix="/projects/{project_uuid}" excluding router_system and router_projects_collection
 router.include_router(
     router=router_projects,
     prefix="/projects/{project_id}",
@@ -6,11 +6,13 @@ from pydantic_settings import (
 
 from models.enum import Service
 from services.broker.kafka.settings import KafkaSettings
-from services.database.postgresql.postgresql import PostgreSQLParams
+from services.database.postgresql.settings import PostgreSQLParams
+from services.local_cache.settings import LocalCacheParams
 from services.s3_storage import (
     MinioParams,
     S3Params,
 )
+from services.single_flight.settings import SingleFlightParams
 from services.storage_orm import RedisORMParams
 
 
@@ -24,9 +26,14 @@ class Settings(BaseSettings):
 
     LOG_FORMAT: str = "%(asctime)s [%(name)s:%(lineno)s] [%(levelname)s]: %(message)s"
 
+    # Project CDC messages are upserted in batches of up to 500 instead of being created one by one
+    PROJECTS_BATCH_SYNC: bool = Field(default=False)
+
     postgresql: PostgreSQLParams = PostgreSQLParams()
     kafka_settings: KafkaSettings = KafkaSettings()
     redis: RedisORMParams = RedisORMParams()
+    local_cache: LocalCacheParams = LocalCacheParams()
+    single_flight: SingleFlightParams = SingleFlightParams()
     minio: MinioParams = MinioParams()
     s3: S3Params = S3Params()
 
@@ -4,7 +4,6 @@ from models.pydantic import ObjectAlreadyExists
 from services import Services
 
 
-@Services.broker.listen(topic="dev.admin.cdc.project.0")
 async def create_example_project(project_model: pydantic.ProjectModel) -> None:
     """
     Each new message that will be added to the topic example_topic
@@ -18,3 +17,24 @@ async def create_example_project(project_model: pydantic.ProjectModel) -> None:
         await Managers.projects.create_project_sync(project_info=project_info)
     except ObjectAlreadyExists:
         Managers.projects.logger.error(f"Project already exist: project_id={project_info.id}")
+
+
+async def create_example_projects(project_models: list[pydantic.ProjectModel]) -> None:
+    """
+    Messages added to the topic dev.admin.cdc.project.0 are accumulated up to 500 or for a second
+    and delivered to this method in one call, so the whole buffer is written to the database and the cache at once.
+    Unlike create_example_project, existing projects are updated
+
+    Args:
+        project_models: data required to create or update projects
+    """
+    await Managers.projects.upsert_projects(project_models=project_models)
+
+
+# A topic has a single listener, so the batched one replaces the per-message one, if enabled (PROJECTS_BATCH_SYNC)
+if Services.config.PROJECTS_BATCH_SYNC:
+    Services.broker.listen(topic="dev.admin.cdc.project.0", messages_count=500, interval_period_sec=1.0)(
+        create_example_projects
+    )
+else:
+    Services.broker.listen(topic="dev.admin.cdc.project.0")(create_example_project)
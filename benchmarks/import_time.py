@@ -0,0 +1,53 @@
+"""
+Cold import time of the application modules, measured by `python -X importtime` in a fresh interpreter:
+    - services: service registry, clients are constructed on the first attribute access
+    - app.db, app.main: repositories and the web application
+
+Fails, if the best of the runs of a module exceeds the limit, so it can be used as a CI guard.
+
+Run:
+    python -m benchmarks.import_time --modules services --repeat 5 --max-ms 300
+"""
+import argparse
+import re
+import subprocess
+import sys
+
+
+IMPORT_TIME_LINE = re.compile(r"^import time:\s+(?P<self>\d+) \|\s+(?P<cumulative>\d+) \|(?P<indent>\s*)(?P<module>\S+)$")
+
+
+def measure(module: str) -> float:
+    """Imports the module in a new interpreter and returns its cumulative import time in milliseconds"""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    for line in completed.stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        # Top level modules are reported with a single space indent
+        if match and match["module"] == module and len(match["indent"]) == 1:
+            return int(match["cumulative"]) / 1000
+    raise RuntimeError(f"Import time of {module} is not reported")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", nargs="+", default=["services"])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, default=300.0)
+    args = parser.parse_args()
+
+    exceeded = False
+    for module in args.modules:
+        best = min(measure(module) for _ in range(args.repeat))
+        exceeded |= best > args.max_ms
+        print(f"{module:<24} {best:10.1f} ms")
+    if exceeded:
+        sys.exit(f"import time exceeds {args.max_ms} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Comparison of Kafka messages deserialization paths on a synthetic ProjectModel stream:
+    - per-message confluent AvroDeserializer + parse_obj (KafkaBroker.prepare_obj)
+    - batch AvroDecoder with writer schemas cached by schema ID
+
+Run:
+    python -m benchmarks.kafka_avro_decoding --messages 100000 --batch 500
+"""
+import argparse
+import asyncio
+import io
+import json
+import struct
+import time
+import uuid
+from collections import namedtuple
+from typing import Callable
+
+import fastavro
+from confluent_kafka.schema_registry import Schema
+from confluent_kafka.schema_registry.avro import AvroDeserializer
+from confluent_kafka.serialization import (
+    MessageField,
+    SerializationContext,
+)
+
+from models.pydantic import ProjectModel
+from services.broker.kafka.avro_decoder import AvroDecoder
+from services.broker.kafka.schema_cache import SchemaCache
+from services.metrics import Collector
+
+
+TOPIC = "dev.admin.cdc.project.0"
+SCHEMA_ID = 1
+PROJECT_SCHEMA = {
+    "type": "record",
+    "name": "Project",
+    "fields": [
+        {"name": "id", "type": "string"},
+        {"name": "name", "type": "string"},
+        {"name": "description", "type": ["null", "string"], "default": None},
+    ],
+}
+
+ConsumerRecord = namedtuple("ConsumerRecord", "topic partition offset key value")
+
+
+class LocalSchemaRegistry:
+    """Schema Registry stand-in, that knows the only project schema"""
+
+    def get_schema(self, schema_id: int, *args, **kwargs) -> Schema:  # pylint: disable=unused-argument
+        """Gets schema by its ID"""
+        return Schema(schema_str=json.dumps(PROJECT_SCHEMA), schema_type="AVRO")
+
+    def get_associations_by_resource_name(self, *args, **kwargs) -> list:  # pylint: disable=unused-argument
+        """Subject associations lookup of recent confluent-kafka versions: topic name strategy is used"""
+        return []
+
+
+def make_messages(count: int) -> list[ConsumerRecord]:
+    """Serializes synthetic projects into Confluent wire format"""
+    parsed_schema = fastavro.parse_schema(PROJECT_SCHEMA)
+    header = struct.pack(">bI", 0, SCHEMA_ID)
+    messages = []
+    for offset in range(count):
+        payload = io.BytesIO()
+        payload.write(header)
+        record = {"id": str(uuid.uuid4()), "name": f"project-{offset}", "description": "synthetic project"}
+        fastavro.schemaless_writer(payload, parsed_schema, record)
+        messages.append(ConsumerRecord(TOPIC, 0, offset, None, payload.getvalue()))
+    return messages
+
+
+def deserializer_path(messages: list[ConsumerRecord], batch_size: int) -> None:
+    """Per-message deserialization, as done by KafkaBroker.prepare_obj"""
+    deserializer = AvroDeserializer(schema_registry_client=LocalSchemaRegistry())
+    ctx = SerializationContext(TOPIC, MessageField.VALUE)
+    for start in range(0, len(messages), batch_size):
+        for message in messages[start : start + batch_size]:
+            ProjectModel.parse_obj(deserializer(message.value, ctx))
+
+
+def decoder_path(messages: list[ConsumerRecord], batch_size: int) -> None:
+    """Batch decoding, as done by KafkaBroker.prepare_objs"""
+    collector = Collector()
+    collector.initialize()
+    schema_cache = SchemaCache(schema_registry_client=LocalSchemaRegistry(), collector=collector)  # type: ignore
+    decoder = AvroDecoder(schema_cache=schema_cache)
+
+    async def decode() -> None:
+        for start in range(0, len(messages), batch_size):
+            values = [message.value for message in messages[start : start + batch_size]]
+            await decoder.load_schemas(values=values)
+            decoder.decode_models(values=values, model=ProjectModel)
+
+    asyncio.run(decode())
+
+
+def measure(name: str, path: Callable, messages: list[ConsumerRecord], batch_size: int) -> float:
+    """Runs the path and prints its throughput"""
+    start = time.perf_counter()
+    path(messages, batch_size)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<14} {elapsed:8.3f}s {len(messages) / elapsed:12.0f} msg/s")
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--batch", type=int, default=500)
+    args = parser.parse_args()
+
+    messages = make_messages(count=args.messages)
+    old = measure("deserializer", deserializer_path, messages, args.batch)
+    new = measure("decoder", decoder_path, messages, args.batch)
+    print(f"speedup: {old / new:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+from models.dataclass.idempotency import IdempotentRequest
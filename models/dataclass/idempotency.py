@@ -0,0 +1,14 @@
+import uuid
+from dataclasses import (
+    dataclass,
+    field,
+)
+
+
+@dataclass
+class IdempotentRequest:
+    """Request stored by its idempotency key"""
+
+    request_hash: str  # digest of the request, the key can not be reused for another request
+    response: str | None = None  # JSON of the response body, None while the request is in progress
+    reservation: str = field(default_factory=lambda: uuid.uuid4().hex)  # the key is released only by its holder
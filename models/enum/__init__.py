@@ -2,6 +2,11 @@ from models.enum.auth import AuthFlow
 from models.enum.collector_broker_type import (
     CollectorConsumerType,
     CollectorProducerType,
+    CollectorSchemaCacheType,
+)
+from models.enum.collector_cache_type import (
+    CollectorCacheTier,
+    CollectorCacheType,
 )
 from models.enum.collector_database_type import CollectorDatabaseType
 from models.enum.roles import (
@@ -7,6 +7,7 @@ class CollectorConsumerType(StrEnum):
     TOTAL = "total"
     DESERIALIZATION_ERROR = "deserialization_error"
     PROCESSING_ERROR = "processing_error"
+    DEAD_LETTER = "dead_letter"
 
 
 class CollectorProducerType(StrEnum):
@@ -14,3 +15,10 @@ class CollectorProducerType(StrEnum):
 
     TOTAL = "total"
     PRODUCING_ERROR = "producing_error"
+
+
+class CollectorSchemaCacheType(StrEnum):
+    """Types of Schema Registry cache requests"""
+
+    HIT = "hit"
+    MISS = "miss"
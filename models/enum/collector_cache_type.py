@@ -0,0 +1,19 @@
+from enum import StrEnum
+
+
+class CollectorCacheTier(StrEnum):
+    """Tiers of the application cache"""
+
+    LOCAL = "local"
+    REDIS = "redis"
+
+
+class CollectorCacheType(StrEnum):
+    """Types of cache operations"""
+
+    HIT = "hit"
+    MISS = "miss"
+    EVICTED = "evicted"  # removed to fit the cache bounds
+    EXPIRED = "expired"
+    INVALIDATED = "invalidated"  # removed on write
+    COALESCED = "coalesced"  # waited for the load of another request instead of loading
@@ -1,8 +1,13 @@
 from models.pydantic.api import (
     GetProjectResponse,
+    GetProjectsResponse,
+    ImportRowError,
     PostLoginResponse,
     PostProjectAsyncRequest,
     PostProjectAsyncResponse,
+    PostProjectsBatchGetRequest,
+    PostProjectsBatchGetResponse,
+    PostProjectsImportResponse,
     PostProjectSyncRequest,
     PostProjectSyncResponse,
     PostRegisterRequest,
@@ -20,7 +25,10 @@ from models.pydantic.db import (
 from models.pydantic.exceptions import (
     AuthenticationFailed,
     DatabaseException,
+    IdempotencyKeyReused,
+    IdempotentRequestInProgress,
     InvalidCredentials,
+    InvalidCursor,
     ObjectAlreadyExists,
     ObjectNotFound,
     UserHasNoPassword,
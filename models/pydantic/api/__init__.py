@@ -5,8 +5,13 @@ from models.pydantic.api.auth import (
 )
 from models.pydantic.api.projects import (
     GetProjectResponse,
+    GetProjectsResponse,
+    ImportRowError,
     PostProjectAsyncRequest,
     PostProjectAsyncResponse,
+    PostProjectsBatchGetRequest,
+    PostProjectsBatchGetResponse,
+    PostProjectsImportResponse,
     PostProjectSyncRequest,
     PostProjectSyncResponse,
     ProjectNotFoundModel,
@@ -1,8 +1,13 @@
 from models.pydantic.api.projects.error_responses import ProjectNotFoundModel
 from models.pydantic.api.projects.projects import (
     GetProjectResponse,
+    GetProjectsResponse,
+    ImportRowError,
     PostProjectAsyncRequest,
     PostProjectAsyncResponse,
+    PostProjectsBatchGetRequest,
+    PostProjectsBatchGetResponse,
+    PostProjectsImportResponse,
     PostProjectSyncRequest,
     PostProjectSyncResponse,
 )
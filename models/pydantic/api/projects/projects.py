@@ -1,3 +1,10 @@
+import uuid
+
+from pydantic import (
+    BaseModel,
+    Field,
+)
+
 from models.pydantic.db import ProjectModel
 
 
@@ -19,3 +26,39 @@ class PostProjectAsyncResponse(ProjectModel):
 
 class GetProjectResponse(ProjectModel):
     """GET response body of `/project"""
+
+
+class GetProjectsResponse(BaseModel):
+    """GET response body of `/projects`"""
+
+    items: list[ProjectModel]
+    next_cursor: str | None = None  # None on the last page
+
+
+class ImportRowError(BaseModel):
+    """Row of the import, that was not imported"""
+
+    line: int  # line of the row in the body, starting with 1
+    error: str
+
+
+class PostProjectsImportResponse(BaseModel):
+    """POST response body of `/projects/import`"""
+
+    imported: int  # created projects
+    skipped: int  # valid rows of already existing projects
+    failed: int  # invalid rows, only the first of them are reported in errors
+    errors: list[ImportRowError]
+
+
+class PostProjectsBatchGetRequest(BaseModel):
+    """POST request body of `/projects:batchGet`"""
+
+    ids: list[uuid.UUID] = Field(min_length=1, max_length=1000)
+
+
+class PostProjectsBatchGetResponse(BaseModel):
+    """POST response body of `/projects:batchGet`"""
+
+    items: list[GetProjectResponse]  # found projects in the order of the requested IDs
+    not_found: list[uuid.UUID]
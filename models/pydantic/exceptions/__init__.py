@@ -1,7 +1,10 @@
 from models.pydantic.exceptions.exceptions import (
     AuthenticationFailed,
     DatabaseException,
+    IdempotencyKeyReused,
+    IdempotentRequestInProgress,
     InvalidCredentials,
+    InvalidCursor,
     ObjectAlreadyExists,
     ObjectNotFound,
     UserHasNoPassword,
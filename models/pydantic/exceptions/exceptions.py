@@ -28,6 +28,42 @@ class ObjectNotFound(HTTPException):
         )
 
 
+class IdempotencyKeyReused(HTTPException):
+    """Error occurs when idempotency key of a completed request is sent with another request"""
+
+    status_code: int = status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    def __init__(self, idempotency_key: str) -> None:
+        super().__init__(
+            status_code=self.status_code,
+            detail=f"Idempotency key was used for another request: {idempotency_key}",
+        )
+
+
+class IdempotentRequestInProgress(HTTPException):
+    """Error occurs when request with the idempotency key of a request in progress is sent"""
+
+    status_code: int = status.HTTP_409_CONFLICT
+
+    def __init__(self, idempotency_key: str) -> None:
+        super().__init__(
+            status_code=self.status_code,
+            detail=f"Request with the idempotency key is in progress: {idempotency_key}",
+        )
+
+
+class InvalidCursor(HTTPException):
+    """Error occurs when pagination cursor is malformed"""
+
+    status_code: int = status.HTTP_400_BAD_REQUEST
+
+    def __init__(self, cursor: str) -> None:
+        super().__init__(
+            status_code=self.status_code,
+            detail=f"Invalid cursor: {cursor}",
+        )
+
+
 class DatabaseException(HTTPException):
     """Error occurs when something go wrong in the database"""
 
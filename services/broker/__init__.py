@@ -1,3 +1,17 @@
+from typing import TYPE_CHECKING
+
 from services.broker.broker import Broker
 from services.broker.exceptions import DeserializationError
-from services.broker.kafka.kafka import KafkaBroker
+
+
+if TYPE_CHECKING:
+    from services.broker.kafka.kafka import KafkaBroker
+
+
+def __getattr__(name: str):
+    """Kafka clients are imported only when the implementation is used"""
+    if name == "KafkaBroker":
+        from services.broker.kafka.kafka import KafkaBroker  # pylint: disable=import-outside-toplevel
+
+        return KafkaBroker
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,3 +1,4 @@
+import asyncio
 from abc import abstractmethod
 from typing import (
     Callable,
@@ -15,14 +16,34 @@ class Broker(Protocol):
     async def start(self) -> None:
         """Start listening processing"""
 
+    @abstractmethod
+    async def warm_up(self) -> None:
+        """Prepare everything needed before the first message"""
+
     @abstractmethod
     async def stop(self) -> None:
         """Close connection and correct finish"""
 
     @abstractmethod
-    async def produce(self, topic: str, message: BaseModel, key: str | None = None) -> None:
+    async def produce(
+        self,
+        topic: str,
+        message: BaseModel,
+        key: str | None = None,
+        wait_delivery: bool = False,
+    ) -> asyncio.Future:
         """Produce message into broker"""
 
+    @abstractmethod
+    async def produce_many(
+        self,
+        topic: str,
+        messages: list[BaseModel],
+        keys: list[str | None] | None = None,
+        wait_delivery: bool = False,
+    ) -> list[asyncio.Future]:
+        """Produce batch of messages into broker"""
+
     # fmt: off
     @classmethod
     @abstractmethod
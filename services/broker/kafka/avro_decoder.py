@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import io
+import json
+import struct
+from array import array
+from typing import (
+    TYPE_CHECKING,
+    Any,
+)
+
+import fastavro
+from fastavro.read import SchemaResolutionError
+from fastavro.validation import ValidationError
+from pydantic import BaseModel
+
+from services.broker.exceptions import DeserializationError
+
+
+if TYPE_CHECKING:
+    from services.broker.kafka.schema_cache import SchemaCache
+
+
+MAGIC_BYTE = 0
+WIRE_HEADER = struct.Struct(">bI")  # magic byte and schema ID of the Confluent wire format
+
+
+class AvroDecoder:
+    """
+    Decoding of Confluent wire format Avro messages
+    - writer schemas are loaded from the schema cache once per schema ID before decoding (load_schemas)
+    - reader schema resolution is prepared once per schema ID (_resolutions)
+    - whole buffers are decoded in a single loop (decode_batch)
+    - packed buffers are decoded in a process pool (pack_values, decode_packed_models)
+    """
+
+    _schema_cache: SchemaCache
+    _reader_schema: dict | None
+    _resolutions: dict[int, tuple[Any, Any]]
+
+    def __init__(self, schema_cache: SchemaCache, reader_schema: str | None = None) -> None:
+        """
+        Args:
+            schema_cache: cache to get writer schemas by their IDs
+            reader_schema: schema to resolve decoded records to. Records are decoded with writer schemas if not passed
+        """
+        self._schema_cache = schema_cache
+        self._reader_schema = fastavro.parse_schema(json.loads(reader_schema)) if reader_schema else None
+        self._resolutions = {}
+
+    @staticmethod
+    def read_schema_id(value: bytes) -> int:
+        """Reads schema ID from the 5-byte wire header.
+
+        Args:
+            value: raw Kafka message value
+
+        Raises:
+            DeserializationError: if message was not produced with a Confluent Schema Registry serializer
+
+        Returns:
+            Schema ID of the message
+        """
+        if value is None or len(value) <= WIRE_HEADER.size:
+            raise DeserializationError(f"Message is too short for Confluent wire format: {value=}")
+        magic, schema_id = WIRE_HEADER.unpack_from(value)
+        if magic != MAGIC_BYTE:
+            raise DeserializationError(f"Unknown magic byte: {magic=}")
+        return schema_id
+
+    async def load_schemas(self, values: list[bytes]) -> dict[int, tuple[Any, Any]]:
+        """Loads writer schemas of the messages, that were not used yet.
+
+        Args:
+            values: raw Kafka message values
+
+        Raises:
+            DeserializationError: if any of the messages has no valid wire header
+
+        Returns:
+            Writer and reader schemas pairs by schema ID of the messages
+        """
+        schema_ids = {self.read_schema_id(value) for value in values}
+        for schema_id in schema_ids - self._resolutions.keys():
+            # Without reader schema fastavro skips the resolution step entirely
+            self._resolutions[schema_id] = (await self._schema_cache.get_by_id(schema_id), self._reader_schema)
+        return {schema_id: self._resolutions[schema_id] for schema_id in schema_ids}
+
+    def decode(self, value: bytes) -> dict:
+        """Decodes a single message.
+
+        Args:
+            value: raw Kafka message value
+
+        Returns:
+            Decoded record
+        """
+        return self.decode_batch(values=[value])[0]
+
+    def decode_batch(self, values: list[bytes]) -> list[dict]:
+        """Decodes a buffer of messages. Their writer schemas have to be loaded beforehand.
+
+        Args:
+            values: raw Kafka message values
+
+        Raises:
+            DeserializationError: if any of the messages could not be decoded
+
+        Returns:
+            Decoded records in order of values
+        """
+        records = []
+        resolutions = self._resolutions
+        for value in values:
+            schema_id = self.read_schema_id(value)
+            resolution = resolutions.get(schema_id)
+            if resolution is None:
+                raise DeserializationError(f"Writer schema is not loaded: {schema_id=}")
+            payload = io.BytesIO(value)
+            payload.seek(WIRE_HEADER.size)
+            records.append(_read_record(payload=payload, resolution=resolution, schema_id=schema_id))
+        return records
+
+    def decode_models(self, values: list[bytes], model: type[BaseModel]) -> list[BaseModel]:
+        """Decodes a buffer of messages straight into pydantic models.
+
+        Args:
+            values: raw Kafka message values
+            model: pydantic model to validate decoded records with
+
+        Raises:
+            DeserializationError: if any of the messages could not be decoded
+
+        Returns:
+            Validated models in order of values
+        """
+        model_validate = model.model_validate
+        return [model_validate(record) for record in self.decode_batch(values=values)]
+
+
+def _read_record(payload: io.BytesIO, resolution: tuple[Any, Any], schema_id: int) -> dict:
+    """Reads a single record from the current payload position"""
+    try:
+        return fastavro.schemaless_reader(payload, *resolution)
+    except SchemaResolutionError as resolution_error:
+        # The writer schema evolved incompatibly with the reader schema
+        raise DeserializationError(f"Avro schema resolution error: {schema_id=}") from resolution_error
+    except (EOFError, ValueError, TypeError, IndexError, KeyError, ValidationError) as decoding_error:
+        raise DeserializationError(f"Avro decoding error: {schema_id=}") from decoding_error
+
+
+def pack_values(values: list[bytes]) -> tuple[bytes, bytes]:
+    """Packs message values into one contiguous payload to be shipped to another process.
+
+    Args:
+        values: raw Kafka message values
+
+    Returns:
+        Joined values and their lengths as an array of unsigned ints
+    """
+    return b"".join(values), array("I", map(len, values)).tobytes()
+
+
+def decode_packed_models(
+    payload: bytes,
+    lengths: bytes,
+    resolutions: dict[int, tuple[Any, Any]],
+    model: type[BaseModel],
+) -> list[BaseModel]:
+    """Decodes packed messages straight into pydantic models. Executed in a process pool.
+
+    Args:
+        payload: joined raw Kafka message values
+        lengths: lengths of the values as an array of unsigned ints
+        resolutions: writer and reader schemas pairs by schema ID
+        model: pydantic model to validate decoded records with
+
+    Raises:
+        DeserializationError: if any of the messages could not be decoded
+
+    Returns:
+        Validated models in order of values
+    """
+    view = memoryview(payload)
+    stream = io.BytesIO(payload)
+    model_validate = model.model_validate
+    models = []
+    position = 0
+    for length in array("I", lengths):
+        schema_id = AvroDecoder.read_schema_id(view[position : position + length])
+        stream.seek(position + WIRE_HEADER.size)
+        record = _read_record(payload=stream, resolution=resolutions[schema_id], schema_id=schema_id)
+        models.append(model_validate(record))
+        position += length
+    return models
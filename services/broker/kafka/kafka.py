@@ -1,12 +1,12 @@
 import asyncio
 import logging
+import multiprocessing
 import time
-from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
 from functools import wraps
 from typing import (
-    Awaitable,
     Callable,
-    Coroutine,
+    Iterable,
     Optional,
     get_args,
 )
@@ -29,38 +29,71 @@ from services.broker import (
     Broker,
     DeserializationError,
 )
+from services.broker.kafka.avro_decoder import (
+    AvroDecoder,
+    decode_packed_models,
+    pack_values,
+)
+from services.broker.kafka.listener import (
+    CallbackType,
+    Listener,
+    TopicKey,
+)
+from services.broker.kafka.partition_worker import (
+    PartitionRebalanceListener,
+    PartitionWorker,
+)
+from services.broker.kafka.rebalance_listener import BackpressureRebalanceListener
+from services.broker.kafka.schema_cache import (
+    CachedSchema,
+    SchemaCache,
+)
+from services.broker.kafka.settings import KafkaSettings
 from services.metrics import Collector
 
 
-CallbackType = Callable[[BaseModel | list[BaseModel]], Awaitable[None]]
-
-
 class KafkaBroker(Broker):
     """
     Complex kafka operations
     """
 
-    TopicKey = namedtuple("TopicKey", "topic key")
-    _serializers_cache: dict[str, avro.AvroSerializer] = {}
-    _batch_callbacks: dict[TopicKey, asyncio.Queue] = {}
-    _tasks: list[Coroutine] = []
+    TopicKey = TopicKey
+    _listeners: dict[TopicKey, Listener] = {}
+    _tasks: list[asyncio.Task] = []
+    _partition_workers: dict[aiokafka.TopicPartition, PartitionWorker] = {}
+    _paused_partitions: dict[aiokafka.TopicPartition, set[TopicKey]] = {}
+    _committed_offsets: dict[aiokafka.TopicPartition, int] = {}  # next offsets to consume, the lag is measured from
+    _params: KafkaSettings
     _collector: Collector
     _deserializer: avro.AvroDeserializer
+    _schema_cache: SchemaCache
+    _decoder: AvroDecoder
+    _decoders: dict[str, AvroDecoder] = {}  # by reader schemas of listeners
+    _process_pool: ProcessPoolExecutor | None = None
     producer: aiokafka.AIOKafkaProducer | None
     consumer: aiokafka.AIOKafkaConsumer | None
 
     def __init__(
         self,
-        bootstrap_servers: str,
-        group_id: str,
+        params: KafkaSettings,
         collector: Collector,
-        schema_registry_configuration: dict,
     ) -> None:
-        self.schema_registry_client: SchemaRegistryClient = SchemaRegistryClient(conf=schema_registry_configuration)
-        self._bootstrap_servers = bootstrap_servers
-        self._group_id = group_id
+        self.schema_registry_client: SchemaRegistryClient = SchemaRegistryClient(
+            conf=params.schema_registry_configuration
+        )
+        self._bootstrap_servers = params.BOOTSTRAP_SERVERS
+        self._group_id = params.GROUP_ID
+        self.__class__._params = params
         self.__class__._collector = collector
         self.__class__._deserializer = avro.AvroDeserializer(schema_registry_client=self.schema_registry_client)
+        self.__class__._schema_cache = SchemaCache(
+            schema_registry_client=self.schema_registry_client,
+            collector=collector,
+            ttl_sec=params.SCHEMA_CACHE_TTL_SEC,
+            refresh_ahead=params.SCHEMA_CACHE_REFRESH_AHEAD,
+            snapshot_path=params.SCHEMA_CACHE_SNAPSHOT_PATH,
+        )
+        self.__class__._decoder = AvroDecoder(schema_cache=self._schema_cache)
         self.__class__.producer = None
         self.__class__.consumer = None
 
@@ -72,6 +105,13 @@ class KafkaBroker(Broker):
         key: Optional[str] = None,
         messages_count: int = 1,
         interval_period_sec: float = 1.0,
+        max_queue_size: int | None = None,
+        decode_in_process: bool = False,
+        retries: int = 0,
+        retry_backoff_sec: float = 1.0,
+        dead_letter_topic: str | None = None,
+        concurrency: int = 1,
+        reader_schema: str | None = None,
         # fmt: on
     ) -> Callable:
         """Decorator maker.
@@ -83,6 +123,18 @@ class KafkaBroker(Broker):
             key: message key from Kafka
             messages_count: buffer size for accumulating messages from Kafka
             interval_period_sec: number of seconds to fill the buffer
+            max_queue_size: number of not processed messages after which feeding partitions are paused
+                (LISTENER_MAX_QUEUE_SIZE setting by default, 0 - unbounded)
+            decode_in_process: flag, that indicates to deserialize buffers in a process pool instead of the event loop
+            retries: number of buffer processing retries with exponential backoff
+            retry_backoff_sec: delay before the first retry, doubled for every next one
+            dead_letter_topic: topic for messages failed after all retries. Without it a failed buffer is retried
+                with its partitions paused, until it succeeds
+            concurrency: number of workers processing buffers concurrently. Order is kept only for messages
+                with the same key, keyless messages are ordered per partition
+            reader_schema: Avro schema JSON to resolve messages to, so messages of older and newer writer schemas
+                are decoded into the same fields. Messages are decoded with their writer schemas if not passed.
+                Used by the fast Avro decoding only
 
         Returns:
             Decorator object
@@ -108,18 +160,20 @@ class KafkaBroker(Broker):
             callback_key = cls.make_key(topic=topic, key=key)
             is_multiple = len(get_args(first_arg_type)) > 0
             model = get_args(first_arg_type)[0] if is_multiple else first_arg_type
-            async_queue: asyncio.Queue = asyncio.Queue()
-            cls._batch_callbacks[callback_key] = async_queue
-            cls._tasks.append(
-                cls.capacitor(
-                    topic_key=callback_key,
-                    async_queue=async_queue,
-                    function=function,
-                    model=model,
-                    max_buffer_size=messages_count,
-                    interval_period_sec=interval_period_sec,
-                    is_multiple=is_multiple,
-                )
+            cls._listeners[callback_key] = Listener(
+                topic_key=callback_key,
+                function=function,
+                model=model,
+                is_multiple=is_multiple,
+                max_buffer_size=messages_count,
+                interval_period_sec=interval_period_sec,
+                max_queue_size=max_queue_size,
+                decode_in_process=decode_in_process,
+                retries=retries,
+                retry_backoff_sec=retry_backoff_sec,
+                dead_letter_topic=dead_letter_topic,
+                concurrency=concurrency,
+                reader_schema=reader_schema,
             )
             return wrapper
 
@@ -137,7 +191,19 @@ class KafkaBroker(Broker):
             Namedtuple Topic with keychain: topic name and message key
         """
         prepared_key = key.encode() if isinstance(key, str) else key
-        return KafkaBroker.TopicKey(topic=topic, key=prepared_key)
+        return TopicKey(topic=topic, key=prepared_key)
+
+    @classmethod
+    def get_listener(cls, topic_key: TopicKey) -> Listener | None:
+        """Gets the listener registered for the keychain.
+
+        Args:
+            topic_key: Kafka topic name with key
+
+        Returns:
+            Registered listener or None, if messages with such keychain are not listened
+        """
+        return cls._listeners.get(topic_key)
 
     @classmethod
     def prepare_obj(cls, src_object: aiokafka.structs.ConsumerRecord, target_model: BaseModel) -> BaseModel:
@@ -161,17 +227,101 @@ class KafkaBroker(Broker):
 
         return target_model.parse_obj(deserialized_obj)
 
+    @classmethod
+    def _get_decoder(cls, reader_schema: str | None) -> AvroDecoder:
+        """Decoder resolving messages to the reader schema, decoders are shared by listeners with the same schema.
+
+        Args:
+            reader_schema: Avro schema JSON of the listener
+
+        Returns:
+            Decoder of the reader schema, the default decoder without it
+        """
+        if not reader_schema:
+            return cls._decoder
+        decoder = cls._decoders.get(reader_schema)
+        if decoder is None:
+            decoder = cls._decoders[reader_schema] = AvroDecoder(
+                schema_cache=cls._schema_cache, reader_schema=reader_schema
+            )
+        return decoder
+
+    @classmethod
+    async def prepare_objs(
+        cls,
+        buffer: list[aiokafka.structs.ConsumerRecord],
+        target_model: type[BaseModel],
+        decoder: AvroDecoder | None = None,
+    ) -> list[BaseModel]:
+        """Deserializes a buffer of messages to decorated function arguments.
+
+        Args:
+            buffer: Kafka messages to deserialize
+            target_model: decorated function argument to which to deserialize
+            decoder: decoder with the reader schema of the listener, the default decoder if not passed
+
+        Raises:
+            DeserializationError: if any of the messages could not be deserialized
+
+        Returns:
+            Deserialized objects in order of messages
+        """
+        if cls._params.FAST_AVRO_DECODING:
+            decoder = decoder or cls._decoder
+            values = [message.value for message in buffer]
+            await decoder.load_schemas(values=values)
+            return decoder.decode_models(values=values, model=target_model)
+        try:
+            return [cls.prepare_obj(src_object=message, target_model=target_model) for message in buffer]
+        except SerializationError as serialization_error:
+            raise DeserializationError(str(serialization_error)) from serialization_error
+
+    @classmethod
+    async def prepare_objs_in_process(
+        cls,
+        buffer: list[aiokafka.structs.ConsumerRecord],
+        target_model: type[BaseModel],
+        decoder: AvroDecoder | None = None,
+    ) -> list[BaseModel]:
+        """Deserializes a buffer of messages in the process pool without blocking the event loop.
+
+        Message values are shipped as one contiguous payload together with the writer schemas they need.
+
+        Args:
+            buffer: Kafka messages to deserialize
+            target_model: decorated function argument to which to deserialize
+            decoder: decoder with the reader schema of the listener, the default decoder if not passed
+
+        Raises:
+            DeserializationError: if any of the messages could not be deserialized
+
+        Returns:
+            Deserialized objects in order of messages
+        """
+        values = [message.value for message in buffer]
+        resolutions = await (decoder or cls._decoder).load_schemas(values=values)
+        payload, lengths = pack_values(values=values)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            cls._process_pool, decode_packed_models, payload, lengths, resolutions, target_model
+        )
+
     async def start(self) -> None:
         """Starts process of multiple writing Kafka messages to asynchronous queues."""
-        topics = [key.topic for key in self._batch_callbacks]
+        topics = list({key.topic for key in self._listeners})
         if not topics:
             return
 
-        self.__class__.producer = aiokafka.AIOKafkaProducer(bootstrap_servers=self._bootstrap_servers)
+        self.__class__.producer = aiokafka.AIOKafkaProducer(
+            bootstrap_servers=self._bootstrap_servers,
+            linger_ms=self._params.LINGER_MS,
+            max_batch_size=self._params.MAX_BATCH_SIZE,
+            compression_type=self._params.COMPRESSION_TYPE,
+            acks=self._params.producer_acks,
+        )
         await self.__class__.producer.start()
 
         consumer = aiokafka.AIOKafkaConsumer(
-            *topics,
             bootstrap_servers=self._bootstrap_servers,
             group_id=self._group_id,
             auto_offset_reset="earliest",
@@ -180,15 +330,37 @@ class KafkaBroker(Broker):
         self.__class__.consumer = consumer
         await self.__class__.consumer.start()
 
-        asyncio.gather(*self._tasks)
+        for listener in self._listeners.values():
+            listener.metrics = self._collector.bind_listener(topic=listener.topic_key.topic, key=listener.key)
+            listener.decoder = self._get_decoder(reader_schema=listener.reader_schema)
+
+        if any(listener.decode_in_process for listener in self._listeners.values()):
+            # Forkserver avoids forking the process with a running event loop and open connections
+            self.__class__._process_pool = ProcessPoolExecutor(
+                max_workers=self._params.PROCESS_POOL_WORKERS or None,
+                mp_context=multiprocessing.get_context("forkserver"),
+            )
+
+        if self._params.PARTITION_WORKERS:
+            # Partition workers are started and stopped by the rebalance listener
+            consumer.subscribe(topics=topics, listener=PartitionRebalanceListener(broker=self))
+            return
+
+        consumer.subscribe(topics=topics, listener=BackpressureRebalanceListener(broker=self.__class__))
+        for listener in self._listeners.values():
+            if listener.max_queue_size is None:
+                listener.max_queue_size = self._params.LISTENER_MAX_QUEUE_SIZE
+        self.__class__._tasks = [asyncio.create_task(self.capacitor(listener)) for listener in self._listeners.values()]
 
         try:
-            async for msg in consumer:
-                callback_key = self.make_key(topic=msg.topic, key=msg.key)
-                if callback_key not in self._batch_callbacks:
-                    continue
-                target_queue = self._batch_callbacks[callback_key]
-                await target_queue.put(msg)
+            while True:
+                batches = await consumer.getmany(
+                    timeout_ms=self._params.FETCH_TIMEOUT_MS,
+                    max_records=self._params.FETCH_MAX_RECORDS,
+                )
+                for records in batches.values():
+                    self._dispatch(records)
+                self.update_consumer_lag(batches=batches, partitions=consumer.assignment())
         except aiokafka.errors.ConsumerStoppedError:
             pass
         finally:
@@ -196,120 +368,589 @@ class KafkaBroker(Broker):
             if self.consumer:
                 await self.consumer.stop()
 
+    @classmethod
+    def _dispatch(cls, records: list[aiokafka.ConsumerRecord]) -> None:
+        """Hands fetched records to the asynchronous queues of their listeners, one list per listener.
+
+        Args:
+            records: records of a single partition in order of their offsets
+        """
+        grouped: dict[TopicKey, list[aiokafka.ConsumerRecord]] = {}
+        for record in records:
+            grouped.setdefault(cls.make_key(topic=record.topic, key=record.key), []).append(record)
+        for topic_key, chunk in grouped.items():
+            listener = cls._listeners.get(topic_key)
+            if not listener:
+                continue
+            listener.async_queue.put_nowait(chunk)
+            listener.queue_depth += len(chunk)
+            listener.metrics.queue_depth.set(listener.queue_depth)
+            if listener.max_queue_size and listener.queue_depth >= listener.max_queue_size:
+                topic_partition = aiokafka.TopicPartition(chunk[0].topic, chunk[0].partition)
+                cls._pause(listener=listener, topic_partition=topic_partition)
+
+    @classmethod
+    def _pause(cls, listener: Listener, topic_partition: aiokafka.TopicPartition) -> None:
+        """Stops fetching from the partition until the listener queue is drained.
+
+        Args:
+            listener: listener with overflowed queue
+            topic_partition: partition feeding the listener
+        """
+        listener.paused_partitions.add(topic_partition)
+        pausing_keys = cls._paused_partitions.setdefault(topic_partition, set())
+        if not pausing_keys:
+            cls.consumer.pause(topic_partition)
+        pausing_keys.add(listener.topic_key)
+        cls._collector.set_consumer_paused_partitions(count=len(cls._paused_partitions))
+
+    @classmethod
+    def _resume(cls, listener: Listener) -> None:
+        """Resumes fetching from the partitions paused by the listener, unless other listeners still hold them.
+
+        Args:
+            listener: listener with drained queue
+        """
+        assignment = cls.consumer.assignment()
+        for topic_partition in listener.paused_partitions:
+            pausing_keys = cls._paused_partitions.get(topic_partition, set())
+            pausing_keys.discard(listener.topic_key)
+            if pausing_keys:
+                continue
+            cls._paused_partitions.pop(topic_partition, None)
+            if topic_partition in assignment:
+                cls.consumer.resume(topic_partition)
+        listener.paused_partitions.clear()
+        cls._collector.set_consumer_paused_partitions(count=len(cls._paused_partitions))
+
     async def stop(self) -> None:
         """Stop process consumer"""
+        await self.stop_partition_workers(partitions=set(self._partition_workers))
         if self.consumer:
             await self.consumer.stop()
         if self.producer:
             await self.producer.stop()
+        if self._process_pool:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+            self.__class__._process_pool = None
+
+    @classmethod
+    def start_partition_workers(cls, partitions: set[aiokafka.TopicPartition]) -> None:
+        """Starts separate processing pipelines for assigned partitions.
+
+        Args:
+            partitions: partitions assigned to the consumer
+        """
+        for topic_partition in partitions:
+            if topic_partition in cls._partition_workers:
+                continue
+            worker = PartitionWorker(
+                broker=cls,
+                topic_partition=topic_partition,
+                fetch_timeout_ms=cls._params.FETCH_TIMEOUT_MS,
+                fetch_max_records=cls._params.FETCH_MAX_RECORDS,
+            )
+            cls._partition_workers[topic_partition] = worker
+            worker.start()
+
+    @classmethod
+    async def stop_partition_workers(cls, partitions: set[aiokafka.TopicPartition]) -> None:
+        """Stops processing pipelines of revoked partitions.
+
+        Args:
+            partitions: partitions revoked from the consumer
+        """
+        workers = [cls._partition_workers.pop(tp) for tp in partitions if tp in cls._partition_workers]
+        await asyncio.gather(*(worker.stop() for worker in workers))
+        cls.forget_partitions(partitions=partitions)
+
+    @classmethod
+    def forget_partitions(cls, partitions: set[aiokafka.TopicPartition]) -> None:
+        """Drops the state of partitions, that changed their owner on rebalance.
+
+        The consumer does not keep partitions paused across rebalances, so they are paused again by listeners,
+        whose queues are still overflowed. Other consumers commit partitions until they are assigned again.
+
+        Args:
+            partitions: revoked or newly assigned partitions
+        """
+        for topic_partition in partitions:
+            cls._paused_partitions.pop(topic_partition, None)
+            cls._committed_offsets.pop(topic_partition, None)
+        for listener in cls._listeners.values():
+            listener.paused_partitions -= partitions
+        cls._collector.set_consumer_paused_partitions(count=len(cls._paused_partitions))
+
+    @classmethod
+    def discard_records(cls, partitions: set[aiokafka.TopicPartition]) -> None:
+        """Removes queued records of revoked partitions, their new owners consume them from the committed offsets.
+
+        Args:
+            partitions: partitions revoked from the consumer
+        """
+        for listener in cls._listeners.values():
+            chunks = []
+            while not listener.async_queue.empty():
+                chunks.append(listener.async_queue.get_nowait())
+            for chunk in chunks:
+                if aiokafka.TopicPartition(chunk[0].topic, chunk[0].partition) in partitions:
+                    listener.queue_depth -= len(chunk)
+                else:
+                    listener.async_queue.put_nowait(chunk)
+            listener.metrics.queue_depth.set(listener.queue_depth)
+
+    @classmethod
+    def _drop_revoked(cls, buffer: list[aiokafka.ConsumerRecord]) -> list[aiokafka.ConsumerRecord]:
+        """Drops buffered records of partitions, that are not assigned to the consumer anymore.
+
+        Args:
+            buffer: messages to process
+
+        Returns:
+            Messages of assigned partitions
+        """
+        assignment = cls.consumer.assignment()
+        return [record for record in buffer if aiokafka.TopicPartition(record.topic, record.partition) in assignment]
 
     @classmethod
     async def _process_and_clear_buffer(
         cls,
+        listener: Listener,
         buffer: list,
-        topic: str,
-        key: str | None,
-        model: BaseModel,
-        is_multiple: bool,
-        function: CallbackType,
-    ) -> None:
+        commit: bool = True,
+    ) -> dict[aiokafka.TopicPartition, int]:
         """
         Processing accumulated messages and corresponding call
 
         Args:
+            listener: decorated function with its buffering parameters
             buffer: container with messages to process
-            topic: single topic name
-            key: corrected kafka key
-            model: decorated function argument to which to deserialize
-            is_multiple: flag, that indicates type of function arguments
-            function: function to which the deserialized messages should be returned
-        """
-        cls._collector.increment_consumer_total(topic=topic, key=key, count=len(buffer))
-        prepared_objs = []
-        topics = {}
-        for consumer_message in buffer:
-            try:
-                prepared_obj: BaseModel = cls.prepare_obj(
-                    src_object=consumer_message,
-                    target_model=model,
+            commit: flag, that indicates to commit offsets right after the call
+
+        Returns:
+            Offsets to commit for processed partitions
+        """
+        metrics = listener.metrics
+        metrics.total.inc(len(buffer))
+        try:
+            if listener.decode_in_process and cls._process_pool:
+                prepared_objs = await cls.prepare_objs_in_process(
+                    buffer=buffer, target_model=listener.model, decoder=listener.decoder
                 )
-                prepared_objs.append(prepared_obj)
-                topic_partition = aiokafka.TopicPartition(consumer_message.topic, consumer_message.partition)
-                topics[topic_partition] = consumer_message.offset + 1
-            except DeserializationError as deserialization_error:
-                logging.exception(deserialization_error)
-                cls._collector.increment_consumer_error(topic=topic, key=key)
-                raise
+            else:
+                prepared_objs = await cls.prepare_objs(
+                    buffer=buffer, target_model=listener.model, decoder=listener.decoder
+                )
+        except DeserializationError as deserialization_error:
+            logging.exception(deserialization_error)
+            metrics.deserialization_error.inc()
+            raise
+
+        topics = cls._get_offsets(buffer=buffer)
 
         if prepared_objs:
-            if is_multiple:
-                await function(prepared_objs)
+            metrics.batch_size.observe(len(prepared_objs))
+            started_at = time.perf_counter()
+            if listener.is_multiple:
+                await listener.function(prepared_objs)
             else:
-                await function(prepared_objs[0])
+                await listener.function(prepared_objs[0])
+            metrics.handler_seconds.observe(time.perf_counter() - started_at)
 
-        if topics:
-            await cls.consumer.commit(topics)
+        if topics and commit:
+            await cls.commit_offsets(topics)
 
         buffer.clear()
+        return topics
+
+    @classmethod
+    async def commit_offsets(cls, offsets: dict[aiokafka.TopicPartition, int]) -> None:
+        """Commits processed offsets and updates lag of the partitions.
+
+        Offsets of partitions, that are not assigned to the consumer anymore, are skipped. A failed commit is only
+        logged: offsets are committed cumulatively, so the next commit or the new owner of the partition covers them,
+        and the processed messages are not processed again because of it.
+
+        Args:
+            offsets: next offsets to consume by partitions
+        """
+        assignment = cls.consumer.assignment()
+        offsets = {partition: offset for partition, offset in offsets.items() if partition in assignment}
+        if not offsets:
+            return
+        started_at = time.perf_counter()
+        try:
+            await cls.consumer.commit(offsets)
+        except aiokafka.errors.KafkaError as commit_error:
+            logging.warning(f"Offsets are not committed: {offsets=}, {commit_error=}")
+            return
+        cls._collector.observe_consumer_commit(duration=time.perf_counter() - started_at)
+        cls._committed_offsets.update(offsets)
+        cls.update_consumer_lag(batches={}, partitions=offsets)
 
     @classmethod
-    async def capacitor(  # pylint: disable=too-many-arguments
+    def update_consumer_lag(
         cls,
-        topic_key: TopicKey,
-        async_queue: asyncio.Queue,
-        function: CallbackType,
-        model: BaseModel,
-        max_buffer_size: int,
-        interval_period_sec: float,
-        is_multiple: bool,
-    ):
-        """Reads Kafka messages from asynchronous queues and gives them to decorated functions.
+        batches: dict[aiokafka.TopicPartition, list[aiokafka.ConsumerRecord]],
+        partitions: Iterable[aiokafka.TopicPartition],
+    ) -> None:
+        """Updates lag of the partitions after every fetch, so it grows while nothing is committed.
+
+        High watermark comes with every fetch response, so no extra requests are made. Until the first commit of
+        the consumer, the lag of a partition is measured from its first fetched offset.
 
         Args:
-            topic_key: Kafka topic name with key
-            async_queue: asynchronous queue to read messages
-            function: function to which the deserialized messages should be returned
-            model: decorated function argument to which to deserialize
-            max_buffer_size: buffer size for accumulating messages from Kafka
-            interval_period_sec: number of seconds to fill the buffer
-            is_multiple: flag, that indicates type of function arguments
+            batches: fetched records by partitions
+            partitions: partitions to update
+        """
+        for topic_partition, records in batches.items():
+            if records:
+                cls._committed_offsets.setdefault(topic_partition, records[0].offset)
+        for topic_partition in partitions:
+            highwater = cls.consumer.highwater(topic_partition)
+            offset = cls._committed_offsets.get(topic_partition)
+            if highwater is not None and offset is not None:
+                cls._collector.set_consumer_lag(
+                    topic=topic_partition.topic, partition=topic_partition.partition, lag=max(0, highwater - offset)
+                )
+
+    @staticmethod
+    def _get_offsets(buffer: list[aiokafka.ConsumerRecord]) -> dict[aiokafka.TopicPartition, int]:
+        """Offsets to commit after processing of the messages.
+
+        Args:
+            buffer: processed messages
+
+        Returns:
+            Next offset for every partition of the messages
+        """
+        topics = {}
+        for consumer_message in buffer:
+            topic_partition = aiokafka.TopicPartition(consumer_message.topic, consumer_message.partition)
+            topics[topic_partition] = consumer_message.offset + 1
+        return topics
+
+    @classmethod
+    async def process_buffer(
+        cls,
+        listener: Listener,
+        buffer: list[aiokafka.ConsumerRecord],
+        commit: bool = True,
+    ) -> dict[aiokafka.TopicPartition, int]:
+        """
+        Processing accumulated messages by chunks of the listener buffer size
+
+        With concurrency > 1 messages are spread over workers by their key, so messages with the same key
+        (or without key, from the same partition) are processed in order, while the workers overlap their I/O.
+
+        Args:
+            listener: decorated function with its buffering parameters
+            buffer: container with messages to process
+            commit: flag, that indicates to commit offsets right after processing
+
+        Returns:
+            Offsets to commit for processed partitions
+        """
+        if listener.concurrency > 1:
+            return await cls._process_concurrently(listener=listener, buffer=buffer, commit=commit)
+
+        topics = {}
+        for start in range(0, len(buffer), listener.max_buffer_size):
+            chunk = buffer[start : start + listener.max_buffer_size]
+            topics |= await cls._process_with_retries(listener=listener, buffer=chunk, commit=commit)
+        return topics
+
+    @classmethod
+    async def _process_concurrently(
+        cls,
+        listener: Listener,
+        buffer: list[aiokafka.ConsumerRecord],
+        commit: bool = True,
+    ) -> dict[aiokafka.TopicPartition, int]:
+        """
+        Processing accumulated messages by key-hashed workers
+
+        A failed worker stops at the failed chunk, other workers finish their messages. Offsets are committed only up to
+        the lowest not processed message of every partition, so nothing is skipped after restart.
+
+        Args:
+            listener: decorated function with its buffering parameters
+            buffer: container with messages to process
+            commit: flag, that indicates to commit offsets right after processing
+
+        Raises:
+            Exception: the first processing error of the workers
+
+        Returns:
+            Offsets to commit for processed partitions
+        """
+        lanes: list[list[aiokafka.ConsumerRecord]] = [[] for _ in range(listener.concurrency)]
+        for record in buffer:
+            ordering_key = record.key if record.key is not None else record.partition
+            lanes[hash(ordering_key) % listener.concurrency].append(record)
+
+        not_processed: list[aiokafka.ConsumerRecord] = []
+
+        async def worker(lane: list[aiokafka.ConsumerRecord]) -> None:
+            for start in range(0, len(lane), listener.max_buffer_size):
+                chunk = lane[start : start + listener.max_buffer_size]
+                try:
+                    await cls._process_with_retries(listener=listener, buffer=chunk, commit=False)
+                except Exception:
+                    not_processed.extend(lane[start:])
+                    raise
+
+        results = await asyncio.gather(*(worker(lane) for lane in lanes if lane), return_exceptions=True)
+
+        topics = cls._get_offsets(buffer=buffer)
+        for record in not_processed:
+            topic_partition = aiokafka.TopicPartition(record.topic, record.partition)
+            topics[topic_partition] = min(topics[topic_partition], record.offset)
+        if topics and commit:
+            await cls.commit_offsets(topics)
+
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        return topics
+
+    @classmethod
+    async def _process_with_retries(
+        cls,
+        listener: Listener,
+        buffer: list[aiokafka.ConsumerRecord],
+        commit: bool = True,
+    ) -> dict[aiokafka.TopicPartition, int]:
         """
-        key = topic_key.key.decode() if topic_key.key else None
-        time_inner = interval_period_sec
-        buffer = []
+        Processing accumulated messages with retries and dead letter topic
+
+        The whole buffer is retried with exponential backoff. If it still fails and the listener has a dead letter
+        topic, the buffer is split to isolate failing messages: a message is sent to the dead letter topic only if it
+        still fails alone after its own retries, so a transient error does not send the whole buffer there.
+        The rest of the buffer is processed as usual.
+
+        Args:
+            listener: decorated function with its buffering and retry parameters
+            buffer: container with messages to process
+            commit: flag, that indicates to commit offsets right after processing
+
+        Raises:
+            Exception: processing error, if the listener has no dead letter topic
+
+        Returns:
+            Offsets to commit for processed partitions
+        """
+        try:
+            return await cls._process_retrying(listener=listener, buffer=buffer, commit=commit)
+        except Exception as exception:  # pylint: disable=broad-exception-caught
+            if not listener.dead_letter_topic:
+                raise
+            if len(buffer) == 1:
+                await cls._send_to_dead_letter_topic(listener=listener, message=buffer[0], error=exception)
+            else:
+                await cls._isolate_failed(listener=listener, buffer=buffer)
+
+        topics = cls._get_offsets(buffer=buffer)
+        if commit:
+            await cls.commit_offsets(topics)
+        return topics
+
+    @classmethod
+    async def _process_retrying(
+        cls,
+        listener: Listener,
+        buffer: list[aiokafka.ConsumerRecord],
+        commit: bool = True,
+    ) -> dict[aiokafka.TopicPartition, int]:
+        """Processing accumulated messages, retried with exponential backoff.
+
+        Messages are retried at least once before they are sent to the dead letter topic.
+        Deserialization errors are not retried, retrying will not help with a malformed message.
+
+        Args:
+            listener: decorated function with its buffering and retry parameters
+            buffer: container with messages to process
+            commit: flag, that indicates to commit offsets right after processing
+
+        Raises:
+            Exception: processing error of the last attempt
+
+        Returns:
+            Offsets to commit for processed partitions
+        """
+        retries = max(listener.retries, 1) if listener.dead_letter_topic else listener.retries
+        attempt = 0
         while True:
             try:
-                start_time = time.monotonic()
-                message = await asyncio.wait_for(async_queue.get(), time_inner)
-                buffer.append(message)
+                return await cls._process_and_clear_buffer(listener=listener, buffer=list(buffer), commit=commit)
+            except DeserializationError:
+                raise
+            except Exception as exception:  # pylint: disable=broad-exception-caught
+                if attempt >= retries:
+                    raise
+                delay = listener.retry_backoff_sec * 2**attempt
+                logging.warning(f"Processing failed, retry in {delay}s: {listener.topic_key=}, {exception=}")
+                await asyncio.sleep(delay)
+                attempt += 1
 
-                if len(buffer) >= max_buffer_size:
-                    raise asyncio.TimeoutError
+    @classmethod
+    async def _isolate_failed(
+        cls,
+        listener: Listener,
+        buffer: list[aiokafka.ConsumerRecord],
+    ) -> None:
+        """Splits failed buffer in halves until failing messages are found and sent to the dead letter topic.
 
-                time_inner -= time.monotonic() - start_time
-            except asyncio.TimeoutError:
+        Halves are tried once, a single failing message is retried before it is sent to the dead letter topic.
+
+        Args:
+            listener: decorated function with its dead letter topic
+            buffer: failed messages
+        """
+        middle = len(buffer) // 2
+        for part in (buffer[:middle], buffer[middle:]):
+            if len(part) == 1:
+                try:
+                    await cls._process_retrying(listener=listener, buffer=part, commit=False)
+                except Exception as exception:  # pylint: disable=broad-exception-caught
+                    await cls._send_to_dead_letter_topic(listener=listener, message=part[0], error=exception)
+                continue
+            try:
+                await cls._process_and_clear_buffer(listener=listener, buffer=list(part), commit=False)
+            except Exception:  # pylint: disable=broad-exception-caught
+                await cls._isolate_failed(listener=listener, buffer=part)
+
+    @classmethod
+    async def _send_to_dead_letter_topic(
+        cls,
+        listener: Listener,
+        message: aiokafka.ConsumerRecord,
+        error: Exception,
+    ) -> None:
+        """Sends raw message with its headers and processing error to the dead letter topic.
+
+        Args:
+            listener: decorated function with its dead letter topic
+            message: failed message
+            error: processing error of the message
+        """
+        headers = [
+            *(message.headers or ()),
+            ("x-original-topic", message.topic.encode()),
+            ("x-original-partition", str(message.partition).encode()),
+            ("x-original-offset", str(message.offset).encode()),
+            ("x-exception-type", type(error).__name__.encode()),
+            ("x-exception-message", str(error).encode()),
+        ]
+        logging.error(f"Message sent to dead letter topic: {listener.dead_letter_topic=}, {message.offset=}, {error=}")
+        listener.metrics.dead_letter.inc()
+        # Original offset is committed only after the dead letter is acknowledged
+        await cls.producer.send_and_wait(
+            topic=listener.dead_letter_topic,
+            value=message.value,
+            key=message.key,
+            headers=headers,
+        )
+
+    @classmethod
+    async def capacitor(cls, listener: Listener):
+        """Reads Kafka messages from asynchronous queues and gives them to decorated functions.
+
+        Args:
+            listener: decorated function with its buffering parameters
+        """
+        buffer: list[aiokafka.ConsumerRecord] = []
+        deadline = filling_since = 0.0
+        while True:
+            try:
                 if buffer:
-                    try:
-                        await cls._process_and_clear_buffer(
-                            buffer=buffer,
-                            topic=topic_key.topic,
-                            key=key,
-                            model=model,
-                            is_multiple=is_multiple,
-                            function=function,
-                        )
-                    except Exception as exception:
-                        cls._collector.increment_consumer_processing_error(topic=topic_key.topic, key=key)
-                        logging.error(f"Consumer stopped: {topic_key=}")
-                        logging.exception(exception)
-                        break
-
-                time_inner = interval_period_sec
+                    chunk = await asyncio.wait_for(listener.async_queue.get(), max(0.0, deadline - time.monotonic()))
+                else:
+                    chunk = await listener.async_queue.get()
+                    deadline = time.monotonic() + listener.interval_period_sec
+                    filling_since = time.monotonic()
+                buffer.extend(chunk)
+                while len(buffer) < listener.max_buffer_size and not listener.async_queue.empty():
+                    buffer.extend(listener.async_queue.get_nowait())
 
+                if len(buffer) < listener.max_buffer_size:
+                    continue
+                # Only full buffers are given away, the rest waits for the next messages or interval end
+                flush_size = len(buffer) - len(buffer) % listener.max_buffer_size
+            except asyncio.TimeoutError:
+                flush_size = len(buffer)
             except asyncio.exceptions.CancelledError:
                 return
 
-    async def produce(self, topic: str, message: BaseModel, key: str | None = None) -> None:
+            listener.metrics.batch_fill_seconds.observe(time.monotonic() - filling_since)
+            batch = buffer[:flush_size]
+            del buffer[:flush_size]
+            await cls._process_until_success(listener=listener, buffer=batch)
+
+            deadline = time.monotonic() + listener.interval_period_sec
+            filling_since = time.monotonic()
+
+            listener.queue_depth -= flush_size
+            listener.metrics.queue_depth.set(listener.queue_depth)
+            # Resuming at the half of the bound prevents pausing and resuming on every batch
+            if listener.paused_partitions and (
+                not listener.max_queue_size or listener.queue_depth <= listener.max_queue_size // 2
+            ):
+                cls._resume(listener=listener)
+
+    @classmethod
+    async def _process_until_success(cls, listener: Listener, buffer: list[aiokafka.ConsumerRecord]) -> None:
+        """Processing of the buffer, retried until it succeeds.
+
+        Partitions of a failed buffer are paused, so no more messages are fetched from them, while the buffer is retried
+        with growing intervals. They are resumed, when the listener queue is drained after the success.
+        Chunks of the buffer, that were processed before the failure, are processed again. Messages of partitions
+        revoked meanwhile are dropped before every attempt, their new owners process them.
+
+        Args:
+            listener: decorated function with its buffering parameters
+            buffer: messages to process
+        """
+        failures = 0
+        while True:
+            buffer = cls._drop_revoked(buffer=buffer)
+            if not buffer:
+                return
+            try:
+                await cls.process_buffer(listener=listener, buffer=buffer)
+                return
+            except Exception as exception:  # pylint: disable=broad-exception-caught
+                listener.metrics.processing_error.inc()
+                delay = cls.get_retry_delay(listener=listener, failures=failures)
+                logging.error(f"Processing failed, partitions paused, retry in {delay}s: {listener.topic_key=}")
+                logging.exception(exception)
+                assignment = cls.consumer.assignment()
+                for topic_partition in cls._get_offsets(buffer=buffer):
+                    if topic_partition in assignment:
+                        cls._pause(listener=listener, topic_partition=topic_partition)
+                failures += 1
+                await asyncio.sleep(delay)
+
+    @classmethod
+    def get_retry_delay(cls, listener: Listener, failures: int) -> float:
+        """Delay before the next processing attempt of a failed buffer.
+
+        Args:
+            listener: decorated function with its retry parameters
+            failures: number of failed attempts
+
+        Returns:
+            Exponentially growing delay, limited by FAILED_BUFFER_MAX_BACKOFF_SEC setting
+        """
+        return min(listener.retry_backoff_sec * 2 ** min(failures, 16), cls._params.FAILED_BUFFER_MAX_BACKOFF_SEC)
+
+    async def produce(
+        self,
+        topic: str,
+        message: BaseModel,
+        key: str | None = None,
+        wait_delivery: bool = False,
+    ) -> asyncio.Future:
         """
         Produce message to topic
 
@@ -317,46 +958,98 @@ class KafkaBroker(Broker):
             topic: kafka topic
             key: topic key
             message: bytes serializable value
-        """
-        if not self.producer:
-            raise ConnectionError("Producer not initialized")
-
-        serializer = self._get_serializer(topic=topic)
+            wait_delivery: flag, that indicates to wait for the broker acknowledgement
 
-        try:
-            serialized_message = serializer(message.dict(), SerializationContext(topic, MessageField.VALUE))
-        except TypeError as type_error:
-            error_message: str = f"Incorrect schema: {serializer._parsed_schema=}, {topic=}, {message=}"
-            logging.error(error_message)
-            raise HTTPException(status_code=status.HTTP_426_UPGRADE_REQUIRED, detail=error_message) from type_error
-
-        await self.producer.send(
+        Returns:
+            Delivery future resolving to the record metadata
+        """
+        futures = await self.produce_many(
             topic=topic,
-            value=serialized_message,
-            key=key,
+            messages=[message],
+            keys=[key],
+            wait_delivery=wait_delivery,
         )
+        return futures[0]
 
-    def _get_serializer(
+    async def produce_many(
         self,
         topic: str,
-    ) -> avro.AvroSerializer:
+        messages: list[BaseModel],
+        keys: list[str | None] | None = None,
+        wait_delivery: bool = False,
+    ) -> list[asyncio.Future]:
         """
-        Gets the latest version schema
+        Produce messages to topic. Messages are batched by the producer according to LINGER_MS and MAX_BATCH_SIZE
 
         Args:
             topic: kafka topic
+            messages: bytes serializable values
+            keys: topic keys of the messages
+            wait_delivery: flag, that indicates to wait for the broker acknowledgement of all messages
+
+        Raises:
+            ValueError: if the number of keys differs from the number of messages
+            KafkaError: if wait_delivery is set and any of the messages was not delivered
 
         Returns:
-            Latest version serializer
+            Delivery futures resolving to the records metadata
         """
-        if topic not in self._serializers_cache:
-            schema = self.schema_registry_client.get_latest_version(topic).schema
-            serializer = avro.AvroSerializer(
-                schema_registry_client=self.schema_registry_client,
-                schema_str=schema,
+        if not self.producer:
+            raise ConnectionError("Producer not initialized")
+        if keys is None:
+            keys = [None] * len(messages)
+        if len(keys) != len(messages):
+            raise ValueError(f"Number of keys ({len(keys)}) differs from number of messages ({len(messages)})")
+
+        schema = await self._schema_cache.get_latest(subject=topic)
+        serialized_messages = [self._serialize(schema=schema, topic=topic, message=message) for message in messages]
+
+        futures = []
+        for serialized_message, key in zip(serialized_messages, keys, strict=True):
+            # send() waits only when the producer buffer is full and returns a delivery future
+            future = await self.producer.send(
+                topic=topic,
+                value=serialized_message,
+                key=key.encode() if isinstance(key, str) else key,
             )
-            self.__class__._serializers_cache[topic] = serializer
-        else:
-            serializer = self._serializers_cache[topic]
+            future.add_done_callback(self._log_delivery_error)
+            futures.append(future)
+
+        if wait_delivery:
+            # All deliveries are awaited, so no failure is left unretrieved, then the first of them is raised
+            results = await asyncio.gather(*futures, return_exceptions=True)
+            for result in results:
+                if isinstance(result, BaseException):
+                    raise result
+        return futures
+
+    @staticmethod
+    def _log_delivery_error(future: asyncio.Future) -> None:
+        """Delivery failures are logged, even if the caller does not await the delivery futures"""
+        if not future.cancelled() and future.exception():
+            logging.error(f"Message delivery failed: {future.exception()!r}")
+
+    @staticmethod
+    def _serialize(schema: CachedSchema, topic: str, message: BaseModel) -> bytes:
+        """
+        Serializes message with the latest schema version
+
+        Args:
+            schema: latest version of the topic schema
+            topic: kafka topic
+            message: bytes serializable value
+
+        Returns:
+            Message in Confluent wire format
+        """
+        try:
+            return schema.serialize(message.model_dump())
+        except (TypeError, ValueError) as type_error:
+            error_message: str = f"Incorrect schema: {schema.schema_str=}, {topic=}, {message=}"
+            logging.error(error_message)
+            raise HTTPException(status_code=status.HTTP_426_UPGRADE_REQUIRED, detail=error_message) from type_error
 
-        return serializer
+    async def warm_up(self) -> None:
+        """Fills the schema cache for listened topics and topics from SCHEMA_WARM_UP_TOPICS setting"""
+        topics = {key.topic for key in self._listeners} | set(self._params.SCHEMA_WARM_UP_TOPICS)
+        await self._schema_cache.warm_up(subjects=sorted(topics))
@@ -0,0 +1,49 @@
+import asyncio
+from collections import namedtuple
+from dataclasses import (
+    dataclass,
+    field,
+)
+from typing import (
+    Awaitable,
+    Callable,
+)
+
+import aiokafka
+from pydantic import BaseModel
+
+from services.broker.kafka.avro_decoder import AvroDecoder
+from services.metrics import ListenerMetrics
+
+
+CallbackType = Callable[[BaseModel | list[BaseModel]], Awaitable[None]]
+TopicKey = namedtuple("TopicKey", "topic key")
+
+
+@dataclass
+class Listener:  # pylint: disable=too-many-instance-attributes
+    """Decorated function with its buffering parameters"""
+
+    topic_key: TopicKey
+    function: CallbackType
+    model: type[BaseModel]
+    is_multiple: bool
+    max_buffer_size: int
+    interval_period_sec: float
+    max_queue_size: int | None = None
+    decode_in_process: bool = False
+    retries: int = 0
+    retry_backoff_sec: float = 1.0
+    dead_letter_topic: str | None = None
+    concurrency: int = 1
+    reader_schema: str | None = None
+    async_queue: asyncio.Queue = field(default_factory=asyncio.Queue)
+    queue_depth: int = 0  # messages received, but not processed yet
+    paused_partitions: set[aiokafka.TopicPartition] = field(default_factory=set)
+    metrics: ListenerMetrics | None = None  # bound on the broker start
+    decoder: AvroDecoder | None = None  # bound on the broker start, shared by listeners with the same reader schema
+
+    @property
+    def key(self) -> str | None:
+        """Decoded message key"""
+        return self.topic_key.key.decode() if self.topic_key.key else None
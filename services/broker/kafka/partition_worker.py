@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import TYPE_CHECKING
+
+import aiokafka
+
+from services.broker.kafka.listener import (
+    Listener,
+    TopicKey,
+)
+
+
+if TYPE_CHECKING:
+    from services.broker.kafka.kafka import KafkaBroker
+
+
+class PartitionWorker:
+    """
+    Pipeline of a single assigned partition: fetch -> deserialize -> callback -> commit.
+    Records of the partition are processed strictly in order, partitions are processed concurrently.
+    """
+
+    def __init__(
+        self,
+        broker: type[KafkaBroker],
+        topic_partition: aiokafka.TopicPartition,
+        fetch_timeout_ms: int,
+        fetch_max_records: int,
+    ) -> None:
+        self._broker = broker
+        self._topic_partition = topic_partition
+        self._fetch_timeout_ms = fetch_timeout_ms
+        self._fetch_max_records = fetch_max_records
+        self._buffers: dict[TopicKey, list[aiokafka.ConsumerRecord]] = {}
+        self._next_offset: int | None = None
+        self._flush_deadline: float | None = None
+        self._filling_since: dict[TopicKey, float] = {}
+        self._stopping = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """Starts partition processing in a separate task"""
+        tp = self._topic_partition
+        self._task = asyncio.create_task(self._run(), name=f"kafka-partition-{tp.topic}-{tp.partition}")
+
+    async def stop(self) -> None:
+        """Gracefully stops processing: pending records are flushed and committed.
+
+        A pending fetch is cancelled, so only an in-flight flush is waited for. Stopping is called by the rebalance
+        listener, and the fetch would not return until the rebalance is over.
+        """
+        self._stopping.set()
+        if self._task:
+            await self._task
+
+    async def _run(self) -> None:
+        """Processing loop of the partition"""
+        try:
+            while not self._stopping.is_set():
+                records = await self._fetch()
+                for record in records.get(self._topic_partition, []):
+                    self._append(record)
+                self._broker.update_consumer_lag(batches=records, partitions=[self._topic_partition])
+                if self._is_ready():
+                    await self._flush()
+            await self._flush()
+        except aiokafka.errors.ConsumerStoppedError:
+            pass
+        except Exception as exception:  # pylint: disable=broad-exception-caught
+            logging.error(f"Pending records are not processed on stop: {self._topic_partition=}")
+            logging.exception(exception)
+
+    async def _fetch(self) -> dict[aiokafka.TopicPartition, list[aiokafka.ConsumerRecord]]:
+        """Fetches records of the partition, the fetch is cancelled when the worker is stopped"""
+        fetching = asyncio.ensure_future(
+            self._broker.consumer.getmany(
+                self._topic_partition,
+                timeout_ms=self._get_fetch_timeout_ms(),
+                max_records=self._fetch_max_records,
+            )
+        )
+        stopping = asyncio.ensure_future(self._stopping.wait())
+        try:
+            await asyncio.wait({fetching, stopping}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            stopping.cancel()
+            is_fetched = fetching.done()
+            if not is_fetched:
+                fetching.cancel()
+        return fetching.result() if is_fetched else {}
+
+    def _append(self, record: aiokafka.ConsumerRecord) -> None:
+        """Puts the record to the buffer of its listener"""
+        self._next_offset = record.offset + 1
+        topic_key = self._broker.make_key(topic=record.topic, key=record.key)
+        listener = self._broker.get_listener(topic_key)
+        if not listener:
+            return
+        self._buffers.setdefault(topic_key, []).append(record)
+        self._filling_since.setdefault(topic_key, time.monotonic())
+        deadline = time.monotonic() + listener.interval_period_sec
+        if self._flush_deadline is None or deadline < self._flush_deadline:
+            self._flush_deadline = deadline
+
+    def _is_ready(self) -> bool:
+        """Checks whether any buffer is full or the buffering interval is over"""
+        if self._flush_deadline is not None and time.monotonic() >= self._flush_deadline:
+            return True
+        for topic_key, buffer in self._buffers.items():
+            listener = self._broker.get_listener(topic_key)
+            if listener and len(buffer) >= listener.max_buffer_size:
+                return True
+        return False
+
+    def _get_fetch_timeout_ms(self) -> int:
+        """Fetch waiting time that does not exceed the buffering interval"""
+        if self._flush_deadline is None:
+            return self._fetch_timeout_ms
+        remaining_ms = int((self._flush_deadline - time.monotonic()) * 1000)
+        return max(0, min(remaining_ms, self._fetch_timeout_ms))
+
+    async def _flush(self) -> None:
+        """Gives buffered records to their listeners, then commits the partition offset"""
+        for topic_key, buffer in self._buffers.items():
+            listener = self._broker.get_listener(topic_key)
+            if not listener:
+                continue
+            listener.metrics.batch_fill_seconds.observe(time.monotonic() - self._filling_since[topic_key])
+            await self._process_until_success(listener=listener, buffer=buffer)
+        self._buffers.clear()
+        self._filling_since.clear()
+        self._flush_deadline = None
+
+        if self._next_offset is not None:
+            await self._broker.commit_offsets({self._topic_partition: self._next_offset})
+            self._next_offset = None
+
+    async def _process_until_success(self, listener: Listener, buffer: list[aiokafka.ConsumerRecord]) -> None:
+        """Processing of the buffer, retried until it succeeds or the worker is stopped.
+
+        The partition is paused while the buffer is retried with growing intervals, and resumed after the success.
+        On stop the buffer is tried once more, its records are consumed again by the next owner of the partition
+        if it still fails.
+
+        Args:
+            listener: decorated function with its buffering parameters
+            buffer: messages to process
+
+        Raises:
+            Exception: processing error of the stopped worker
+        """
+        consumer = self._broker.consumer
+        failures = 0
+        while True:
+            try:
+                await self._broker.process_buffer(listener=listener, buffer=buffer, commit=False)
+                break
+            except Exception as exception:  # pylint: disable=broad-exception-caught
+                listener.metrics.processing_error.inc()
+                if self._stopping.is_set():
+                    raise
+                delay = self._broker.get_retry_delay(listener=listener, failures=failures)
+                logging.error(f"Processing failed, partition paused, retry in {delay}s: {self._topic_partition=}")
+                logging.exception(exception)
+                if self._topic_partition in consumer.assignment():
+                    consumer.pause(self._topic_partition)
+                failures += 1
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+        if failures and self._topic_partition in consumer.assignment():
+            consumer.resume(self._topic_partition)
+
+
+class PartitionRebalanceListener(aiokafka.ConsumerRebalanceListener):
+    """Spins up and tears down partition workers on consumer group rebalance"""
+
+    def __init__(self, broker: KafkaBroker) -> None:
+        self._broker = broker
+
+    async def on_partitions_revoked(self, revoked: set[aiokafka.TopicPartition]) -> None:
+        """Stops workers of the revoked partitions, committing their processed records"""
+        await self._broker.stop_partition_workers(partitions=revoked)
+
+    async def on_partitions_assigned(self, assigned: set[aiokafka.TopicPartition]) -> None:
+        """Starts workers for the newly assigned partitions"""
+        self._broker.forget_partitions(partitions=assigned)
+        self._broker.start_partition_workers(partitions=assigned)
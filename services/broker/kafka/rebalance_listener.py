@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import aiokafka
+
+
+if TYPE_CHECKING:
+    from services.broker.kafka.kafka import KafkaBroker
+
+
+class BackpressureRebalanceListener(aiokafka.ConsumerRebalanceListener):
+    """Resets partitions paused by listeners backpressure on consumer group rebalance"""
+
+    def __init__(self, broker: type[KafkaBroker]) -> None:
+        self._broker = broker
+
+    async def on_partitions_revoked(self, revoked: set[aiokafka.TopicPartition]) -> None:
+        """Forgets the revoked partitions and their queued records, they are consumed by their new owners"""
+        self._broker.discard_records(partitions=revoked)
+        self._broker.forget_partitions(partitions=revoked)
+
+    async def on_partitions_assigned(self, assigned: set[aiokafka.TopicPartition]) -> None:
+        """Forgets the assigned partitions, the consumer fetches them unpaused after the assignment"""
+        self._broker.forget_partitions(partitions=assigned)
@@ -0,0 +1,247 @@
+import asyncio
+import io
+import json
+import logging
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+)
+
+import fastavro
+from confluent_kafka.schema_registry import SchemaRegistryClient
+
+from services.broker.kafka.avro_decoder import (
+    MAGIC_BYTE,
+    WIRE_HEADER,
+)
+from services.metrics import Collector
+
+
+@dataclass
+class CachedSchema:
+    """Latest schema version of a subject"""
+
+    schema_id: int
+    schema_str: str
+    parsed_schema: Any
+    fetched_at: float
+
+    def serialize(self, record: dict) -> bytes:
+        """Encodes the record into Confluent wire format.
+
+        Args:
+            record: record matching the schema
+
+        Returns:
+            Wire header with schema ID and Avro binary encoded record
+        """
+        payload = io.BytesIO()
+        payload.write(WIRE_HEADER.pack(MAGIC_BYTE, self.schema_id))
+        fastavro.schemaless_writer(payload, self.parsed_schema, record)
+        return payload.getvalue()
+
+
+class SchemaCache:
+    """
+    Asynchronous Schema Registry cache
+    - registry is requested in a thread, so the event loop is never blocked on HTTP round trips
+    - latest versions of subjects live TTL seconds and are refreshed in background after
+      refresh_ahead part of TTL, stale versions are served if the registry is unavailable
+    - schemas by ID are immutable and never expire
+    - concurrent misses of the same subject or ID wait for a single request (_pending)
+    - optional JSON snapshot on disk allows cold starts without the registry, it is saved on warm up,
+      on a new latest version of a subject and on every new schema ID
+    """
+
+    _subjects: dict[str, CachedSchema]
+    _schemas: dict[int, Any]
+    _schema_strs: dict[int, str]
+    _pending: dict[str | int, asyncio.Task]
+    _snapshot_lock: asyncio.Lock
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        schema_registry_client: SchemaRegistryClient,
+        collector: Collector,
+        ttl_sec: float = 300.0,
+        refresh_ahead: float = 0.8,
+        snapshot_path: str | None = None,
+    ) -> None:
+        """
+        Args:
+            schema_registry_client: synchronous Schema Registry client
+            collector: metrics collector
+            ttl_sec: lifetime of the latest subject versions
+            refresh_ahead: part of TTL after which latest version is refreshed in background
+            snapshot_path: path to JSON snapshot of the cache, snapshot is not used if not passed
+        """
+        self._schema_registry_client = schema_registry_client
+        self._collector = collector
+        self._ttl_sec = ttl_sec
+        self._refresh_after_sec = ttl_sec * refresh_ahead
+        self._snapshot_path = Path(snapshot_path) if snapshot_path else None
+        self._subjects = {}
+        self._schemas = {}
+        self._schema_strs = {}
+        self._pending = {}
+        self._snapshot_lock = asyncio.Lock()
+
+    async def get_latest(self, subject: str) -> CachedSchema:
+        """Gets the latest schema version of the subject.
+
+        Args:
+            subject: Schema Registry subject
+
+        Returns:
+            Cached latest schema version
+        """
+        cached_schema = self._subjects.get(subject)
+        if cached_schema is None:
+            self._collector.increment_schema_cache_miss()
+            return await asyncio.shield(self._start(subject, lambda: self._fetch_latest(subject)))
+
+        self._collector.increment_schema_cache_hit()
+        age = time.monotonic() - cached_schema.fetched_at
+        if age >= self._ttl_sec:
+            try:
+                return await asyncio.shield(self._start(subject, lambda: self._fetch_latest(subject)))
+            except Exception:  # pylint: disable=broad-exception-caught
+                logging.warning(f"Schema Registry is unavailable, stale schema is used: {subject=}", exc_info=True)
+        elif age >= self._refresh_after_sec and subject not in self._pending:
+            task = self._start(subject, lambda: self._fetch_latest(subject))
+            task.add_done_callback(self._log_refresh_error)
+        return cached_schema
+
+    async def get_by_id(self, schema_id: int) -> Any:
+        """Gets parsed schema by its ID.
+
+        Args:
+            schema_id: schema ID from the wire header
+
+        Returns:
+            Parsed schema
+        """
+        parsed_schema = self._schemas.get(schema_id)
+        if parsed_schema is not None:
+            self._collector.increment_schema_cache_hit()
+            return parsed_schema
+        self._collector.increment_schema_cache_miss()
+        return await asyncio.shield(self._start(schema_id, lambda: self._fetch_by_id(schema_id)))
+
+    async def warm_up(self, subjects: list[str]) -> None:
+        """Loads the snapshot and fetches the latest versions of the subjects.
+
+        Args:
+            subjects: Schema Registry subjects, that will be used
+        """
+        await asyncio.to_thread(self._load_snapshot)
+        results = await asyncio.gather(*(self.get_latest(subject) for subject in subjects), return_exceptions=True)
+        for subject, result in zip(subjects, results):
+            if isinstance(result, Exception):
+                logging.error(f"Schema warm up failed: {subject=}, {result=}")
+        await self.save_snapshot()
+
+    async def save_snapshot(self) -> None:
+        """Saves the cache to the snapshot file.
+
+        The snapshot is copied on the event loop, so fetches completed while it is written do not change it.
+        Saves are done one at a time, the file is not required for serving, so write errors are only logged.
+        """
+        if not self._snapshot_path:
+            return
+        async with self._snapshot_lock:
+            snapshot = {
+                "subjects": {
+                    subject: {"schema_id": cached_schema.schema_id, "schema_str": cached_schema.schema_str}
+                    for subject, cached_schema in self._subjects.items()
+                },
+                "schemas": dict(self._schema_strs),
+            }
+            try:
+                await asyncio.to_thread(self._save_snapshot, snapshot)
+            except OSError:
+                logging.exception(f"Schema cache snapshot is not saved: {self._snapshot_path}")
+
+    def _start(self, key: str | int, fetch: Callable[[], Awaitable]) -> asyncio.Task:
+        """Starts fetching of the key, unless it is already in progress, so concurrent requests share a single fetch"""
+        task = self._pending.get(key)
+        if task is None:
+            task = asyncio.create_task(fetch())
+            self._pending[key] = task
+            task.add_done_callback(lambda _: self._pending.pop(key, None))
+        return task
+
+    @staticmethod
+    def _log_refresh_error(task: asyncio.Task) -> None:
+        """Background refresh errors are only logged, cached version is still served"""
+        if not task.cancelled() and task.exception():
+            logging.warning(f"Schema refresh failed: {task.exception()!r}")
+
+    async def _fetch_latest(self, subject: str) -> CachedSchema:
+        """Requests the latest version of the subject from the registry"""
+        # Unlike get_latest_version, the version is not cached by the client, so the registry is requested every time
+        registered_schema = await asyncio.to_thread(self._schema_registry_client.get_version, subject, "latest")
+        schema_str = registered_schema.schema.schema_str
+        previous = self._subjects.get(subject)
+        cached_schema = CachedSchema(
+            schema_id=registered_schema.schema_id,
+            schema_str=schema_str,
+            parsed_schema=self._schemas.get(registered_schema.schema_id) or self._parse(schema_str),
+            fetched_at=time.monotonic(),
+        )
+        self._subjects[subject] = cached_schema
+        self._schemas[cached_schema.schema_id] = cached_schema.parsed_schema
+        self._schema_strs[cached_schema.schema_id] = schema_str
+        if previous and previous.schema_id != cached_schema.schema_id:
+            logging.info(f"New schema version: {subject=}, schema_id={cached_schema.schema_id}")
+            await self.save_snapshot()
+        return cached_schema
+
+    async def _fetch_by_id(self, schema_id: int) -> Any:
+        """Requests the schema by its ID from the registry"""
+        schema = await asyncio.to_thread(self._schema_registry_client.get_schema, schema_id)
+        parsed_schema = self._parse(schema.schema_str)
+        self._schemas[schema_id] = parsed_schema
+        self._schema_strs[schema_id] = schema.schema_str
+        # Messages of the schema may come again after restart, while the registry is unavailable
+        await self.save_snapshot()
+        return parsed_schema
+
+    @staticmethod
+    def _parse(schema_str: str) -> Any:
+        """Parses Avro schema"""
+        return fastavro.parse_schema(json.loads(schema_str))
+
+    def _load_snapshot(self) -> None:
+        """Fills the cache from the snapshot. Loaded versions are refreshed in background on the first use"""
+        if not self._snapshot_path or not self._snapshot_path.exists():
+            return
+        try:
+            snapshot = json.loads(self._snapshot_path.read_text())
+        except (OSError, ValueError):
+            logging.exception(f"Invalid schema cache snapshot: {self._snapshot_path}")
+            return
+        fetched_at = time.monotonic() - self._refresh_after_sec
+        for schema_id, schema_str in snapshot.get("schemas", {}).items():
+            if int(schema_id) not in self._schemas:
+                self._schemas[int(schema_id)] = self._parse(schema_str)
+                self._schema_strs[int(schema_id)] = schema_str
+        for subject, latest in snapshot.get("subjects", {}).items():
+            if subject in self._subjects:
+                continue
+            self._subjects[subject] = CachedSchema(
+                schema_id=latest["schema_id"],
+                schema_str=latest["schema_str"],
+                parsed_schema=self._parse(latest["schema_str"]),
+                fetched_at=fetched_at,
+            )
+
+    def _save_snapshot(self, snapshot: dict[str, dict]) -> None:
+        """Writes the copy of the cache to the snapshot file"""
+        temporary_path = self._snapshot_path.with_suffix(".tmp")
+        temporary_path.write_text(json.dumps(snapshot))
+        temporary_path.replace(self._snapshot_path)
@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic import Field
 from pydantic_settings import (
     BaseSettings,
@@ -14,9 +16,34 @@ class KafkaSettings(BaseSettings):
     ENCODING_TYPE: str = Field(default="utf-8")
 
     SCHEMA_REGISTRY_URL: str = Field(default="http://localhost:8085")
+    SCHEMA_CACHE_TTL_SEC: float = Field(default=300.0)
+    SCHEMA_CACHE_REFRESH_AHEAD: float = Field(default=0.8)  # part of TTL after which schema is refreshed in background
+    SCHEMA_CACHE_SNAPSHOT_PATH: str | None = Field(default=None)  # JSON snapshot for cold starts without the registry
+    SCHEMA_WARM_UP_TOPICS: list[str] = Field(default=[])  # produced topics to fetch schemas for on startup
+    FAST_AVRO_DECODING: bool = Field(default=True)  # batch decoding with writer schemas cached by schema ID
+    PROCESS_POOL_WORKERS: int = Field(default=0)  # for listeners decoding in process, 0 - number of CPUs
+
+    # Producer batching: records are accumulated up to LINGER_MS or MAX_BATCH_SIZE bytes per partition
+    LINGER_MS: int = Field(default=5)
+    MAX_BATCH_SIZE: int = Field(default=65536)
+    COMPRESSION_TYPE: Literal["gzip", "snappy", "lz4", "zstd"] | None = Field(default=None)
+    ACKS: Literal["0", "1", "all"] = Field(default="1")
+
+    PARTITION_WORKERS: bool = Field(default=False)  # separate processing pipeline per assigned partition
+    FETCH_TIMEOUT_MS: int = Field(default=1000)
+    FETCH_MAX_RECORDS: int = Field(default=500)
+    # Default bound of not processed messages per listener, feeding partitions are paused above it (0 - unbounded).
+    # Partition workers do not fetch while processing, so they need no bound.
+    LISTENER_MAX_QUEUE_SIZE: int = Field(default=10000)
+    # Bound of the retry interval of a buffer, that failed without a dead letter topic, its partitions stay paused
+    FAILED_BUFFER_MAX_BACKOFF_SEC: float = Field(default=60.0)
 
     model_config = SettingsConfigDict(env_prefix="SERVICE_NAME_KAFKA_")
 
     @property
     def schema_registry_configuration(self):
         return {"url": f"{self.SCHEMA_REGISTRY_URL}"}
+
+    @property
+    def producer_acks(self) -> int | str:
+        return "all" if self.ACKS == "all" else int(self.ACKS)
@@ -1,3 +1,17 @@
+from typing import TYPE_CHECKING
+
 from services.database.database import Database
 from services.database.exceptions import UniqueViolation
-from services.database.postgresql import PostgreSQL
+
+
+if TYPE_CHECKING:
+    from services.database.postgresql import PostgreSQL
+
+
+def __getattr__(name: str):
+    """Database drivers are imported only when the implementation is used"""
+    if name == "PostgreSQL":
+        from services.database.postgresql import PostgreSQL  # pylint: disable=import-outside-toplevel
+
+        return PostgreSQL
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
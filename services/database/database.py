@@ -1,22 +1,60 @@
 from __future__ import annotations
 
 from abc import abstractmethod
-from typing import Protocol
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncContextManager,
+    AsyncIterator,
+    Iterable,
+    Literal,
+    Protocol,
+    Sequence,
+)
 
-from sqlalchemy.ext.asyncio import session
+
+if TYPE_CHECKING:
+    from pydantic import BaseModel
+    from sqlalchemy import (
+        Executable,
+        Row,
+    )
+    from sqlalchemy.ext.asyncio import session
 
 
 class Database(Protocol):
     """Target data store (DB) interface"""
 
     @abstractmethod
-    def session(self) -> SessionHandler:
+    def session(self, readonly: bool = False) -> SessionHandler:
         """Session"""
 
+    @abstractmethod
+    def unit_of_work(self) -> AsyncContextManager:
+        """Sessions shared by all repositories within the context, committed once at its end"""
+
+    @abstractmethod
+    def stream(self, statement: Executable, partition_size: int = 1000) -> AsyncIterator[Sequence[Row]]:
+        """Rows of the read statement in partitions, fetched with a server-side cursor"""
+
     @abstractmethod
     async def connect(self) -> None:
         """Database connection"""
 
+    @abstractmethod
+    async def warm_up(self) -> None:
+        """Opening connections before the first requests"""
+
+    @abstractmethod
+    async def bulk_create(
+        self,
+        table_name: str,
+        objects: Iterable[dict[str, Any] | BaseModel],
+        on_conflict: Literal["nothing", "update"] | None = None,
+        conflict_columns: list[str] | None = None,
+    ) -> int:
+        """Bulk insert of the objects into the table"""
+
 
 class SessionHandler(Protocol):
     """Intermediate class for managing temporarily-created session and handling exceptions."""
@@ -1 +1,14 @@
-from services.database.postgresql.postgresql import PostgreSQL
+from typing import TYPE_CHECKING
+
+
+if TYPE_CHECKING:
+    from services.database.postgresql.postgresql import PostgreSQL
+
+
+def __getattr__(name: str):
+    """Database drivers are imported only when the implementation is used"""
+    if name == "PostgreSQL":
+        from services.database.postgresql.postgresql import PostgreSQL  # pylint: disable=import-outside-toplevel
+
+        return PostgreSQL
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,15 +1,39 @@
+import asyncio
+import itertools
+import logging
 import socket
-from contextlib import suppress
+import time
+import uuid
+from contextlib import (
+    asynccontextmanager,
+    suppress,
+)
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Iterable,
+    Iterator,
+    Literal,
+    Sequence,
+)
 from urllib.parse import quote
 
+import asyncpg
 from psycopg2.errorcodes import UNIQUE_VIOLATION
+from pydantic import BaseModel
 from sqlalchemy import (
+    Executable,
     MetaData,
+    Row,
     Table,
+    text,
 )
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.exc import (
     DatabaseError,
     IntegrityError,
+    SQLAlchemyError,
 )
 from sqlalchemy.ext.asyncio import (
     async_sessionmaker,
@@ -24,10 +48,27 @@ from models.pydantic import (
     ObjectAlreadyExists,
 )
 from services.database import Database
+from services.database.postgresql.query_instrumentation import QueryInstrumentation
+from services.database.postgresql.replica import (
+    Replica,
+    is_recently_written,
+    mark_write,
+)
 from services.database.postgresql.settings import PostgreSQLParams
+from services.database.postgresql.unit_of_work import (
+    UnitOfWork,
+    get_unit_of_work,
+    reset_unit_of_work,
+    set_unit_of_work,
+)
+from services.metrics import Collector
 from services.services_base import ServiceBase
 
 
+MAX_QUERY_ARGUMENTS = 32767  # asyncpg limit of bind parameters in a single statement
+PRIMARY_POOL = "primary"
+
+
 class SessionHandler:
     """
     Intermediate class for managing temporarily-created session and handling exceptions.
@@ -35,22 +76,73 @@ class SessionHandler:
     !!! Warning: hardcoded always try to commit when errors not handled
 
     :param session(AsyncSession): managed session must be passed from outside
+    :param readonly(bool): session is bound to an autocommit engine, so neither BEGIN nor COMMIT is sent
+    :param replica(Replica): replica the session is bound to, its connection is checked before use
+    :param fallback(Callable): maker of the primary session, used if the replica is unavailable
+    :param shared(bool): session belongs to a unit of work, so it is flushed instead of committed and is not closed
+    :param collector(Collector): metrics collector for the connection checkout time
 
     """
 
-    def __init__(self, session: session.AsyncSession):  # pylint:disable=redefined-outer-name
+    def __init__(  # pylint:disable=too-many-arguments
+        self,
+        session: session.AsyncSession,  # pylint:disable=redefined-outer-name
+        readonly: bool = False,
+        replica: Replica | None = None,
+        fallback: Callable[[], session.AsyncSession] | None = None,
+        shared: bool = False,
+        collector: Collector | None = None,
+    ):
         self.session = session
+        self.readonly = readonly
+        self.replica = replica
+        self.fallback = fallback
+        self.shared = shared
+        self.collector = collector
 
     async def __aenter__(self) -> session.AsyncSession:
-        await self.session.begin()
+        # Shared sessions are entered by every repository call, but the connection is checked out once
+        if not self.session.in_transaction():
+            if not self.readonly:
+                await self.session.begin()
+            await self._checkout()
         return self.session
 
+    async def _checkout(self) -> None:
+        """Checks out the connection of the session, measuring the pool waiting and handling replica failures"""
+        started_at = time.perf_counter()
+        try:
+            # Checking out the connection pings the database (pool_pre_ping)
+            await self.session.connection()
+        except (SQLAlchemyError, OSError, asyncio.TimeoutError) as connection_error:
+            with suppress(Exception):
+                await self.session.close()
+            if not (self.replica and self.fallback):
+                raise DatabaseException(message="Failed to connect to the database") from connection_error
+            logging.warning("Replica is unavailable, reading from the primary", exc_info=True)
+            self.replica.mark_unavailable()
+            self.replica = None
+            self.session = self.fallback()
+            await self._checkout()
+            return
+        if self.collector:
+            self.collector.observe_database_checkout(
+                pool=self.session.info.get("pool", PRIMARY_POOL), duration=time.perf_counter() - started_at
+            )
+
     async def __aexit__(self, exception_type: type, exception: Exception, _traceback) -> None:
         """Handling errors that occur when working with the database"""
         try:
             if exception_type:
                 raise exception_type(exception) from exception
-            await self.session.commit()
+            if self.readonly:
+                return
+            if self.shared:
+                # Errors of the statements are raised here, the unit of work commits them once
+                await self.session.flush()
+            else:
+                await self.session.commit()
+                mark_write()
         except IntegrityError as integrity_error:
             await self.session.rollback()
             if hasattr(integrity_error.orig, "sqlstate"):
@@ -64,8 +156,9 @@ class SessionHandler:
             if isinstance(e, exception_type):
                 raise e
         finally:
-            with suppress(Exception):
-                await self.session.close()
+            if not self.shared:
+                with suppress(Exception):
+                    await self.session.close()
 
 
 class PostgreSQL(ServiceBase, Database):  # pylint: disable=too-many-instance-attributes
@@ -81,21 +174,29 @@ class PostgreSQL(ServiceBase, Database):  # pylint: disable=too-many-instance-at
     _engine: engine.AsyncEngine
     _metadata: MetaData
     _session_maker: async_sessionmaker[session.AsyncSession]
+    _readonly_session_maker: async_sessionmaker[session.AsyncSession]
+    _snapshot_session_maker: async_sessionmaker[session.AsyncSession]
+    _replicas: list[Replica]
+    _replica_counter: Iterator[int]
     _fetched_tables: dict[str, Table]
     _session: session.AsyncSession
     _autocommit: bool
 
-    def __init__(self, params: PostgreSQLParams) -> None:
+    def __init__(self, params: PostgreSQLParams, collector: Collector) -> None:
         """
         Initialize settings
         :param connection_params(PostgreSQLParams): Database connection parameters and settings for working with it
+        :param collector(Collector): metrics collector
         """
         super().__init__()
         self._params = params
+        self._collector = collector
         self._fetched_tables = {}
         self._metadata = MetaData()
         self._base = declarative_base(metadata=self._metadata)
         self._autocommit = True
+        self._replicas = []
+        self._replica_counter = itertools.count()
 
     @staticmethod
     def _make_url(params: PostgreSQLParams) -> str:
@@ -107,26 +208,389 @@ class PostgreSQL(ServiceBase, Database):  # pylint: disable=too-many-instance-at
         database: str = params.DATABASE
         return f"postgresql+asyncpg://{username}:{password}@{host}/{database}"
 
+    @staticmethod
+    def _make_statement_name() -> str:
+        """Prepared statement name, that is not taken on any server connection behind PgBouncer"""
+        return f"__asyncpg_{uuid.uuid4()}__"
+
+    def _create_engine(self, url: str, pool: str) -> engine.AsyncEngine:
+        """Engine with pool settings shared by the primary and the replicas"""
+        async_engine = create_async_engine(
+            url=url,
+            pool_size=self._params.POOL_SIZE,
+            max_overflow=self._params.MAX_OVERFLOW,
+            pool_timeout=self._params.POOL_TIMEOUT_SEC,
+            pool_recycle=self._params.POOL_RECYCLE_SEC,
+            echo_pool=self._params.ECHO_POOL,
+            pool_pre_ping=True,
+            connect_args={
+                "statement_cache_size": self._params.STATEMENT_CACHE_SIZE,
+                "prepared_statement_cache_size": self._params.PREPARED_STATEMENT_CACHE_SIZE,
+                "prepared_statement_name_func": (
+                    self._make_statement_name if self._params.UNIQUE_STATEMENT_NAMES else None
+                ),
+                "command_timeout": self._params.COMMAND_TIMEOUT_SEC,
+                "server_settings": {
+                    "statement_timeout": str(self._params.STATEMENT_TIMEOUT_MS),
+                },
+            },
+        )
+        self._collector.bind_database_pool(pool=pool, engine_pool=async_engine.sync_engine.pool)
+        QueryInstrumentation(
+            collector=self._collector,
+            pool=pool,
+            slow_query_threshold_ms=self._params.SLOW_QUERY_THRESHOLD_MS,
+        ).attach(async_engine=async_engine)
+        return async_engine
+
     async def connect(self) -> None:
         """Database connecting"""
         try:
-            self._engine = create_async_engine(
-                url=self._make_url(params=self._params),
-                pool_size=self._params.POOL_SIZE,
-                echo_pool=self._params.ECHO_POOL,
-                pool_pre_ping=True,
-                connect_args={
-                    "server_settings": {
-                        "statement_timeout": "5000",
-                    },
-                },
-            )
+            self._engine = self._create_engine(url=self._make_url(params=self._params), pool=PRIMARY_POOL)
             self._session_maker = async_sessionmaker(bind=self._engine, expire_on_commit=False)
+            # Reads share the pool, but every statement runs in its own implicit transaction
+            self._readonly_session_maker = async_sessionmaker(
+                bind=self._engine.execution_options(isolation_level="AUTOCOMMIT"),
+                expire_on_commit=False,
+            )
+            # Server-side cursors of asyncpg live only within a transaction
+            self._snapshot_session_maker = async_sessionmaker(
+                bind=self._engine.execution_options(isolation_level="REPEATABLE READ", postgresql_readonly=True),
+                expire_on_commit=False,
+            )
+            self._replicas = [
+                Replica(
+                    replica_engine=self._create_engine(url=dsn, pool=f"replica_{number}"),
+                    pool=f"replica_{number}",
+                    cooldown_sec=self._params.REPLICA_COOLDOWN_SEC,
+                )
+                for number, dsn in enumerate(self._params.REPLICA_DSNS)
+            ]
         except socket.gaierror:
             clean_params: PostgreSQLParams = self._params.copy(exclude={"PASSWORD"})
             self.logger.exception(f"Invalid postgresql connection params: {clean_params}")
             raise
 
-    def session(self) -> SessionHandler:
-        """Create an intermediate session"""
-        return SessionHandler(session=self._session_maker())
+    async def warm_up(self) -> None:
+        """Opens POOL_WARM_UP_SIZE connections of the primary and the replicas, so first requests do not wait for them.
+
+        Raises:
+            DatabaseException: if the primary is unavailable
+        """
+        connections = min(self._params.POOL_WARM_UP_SIZE, self._params.POOL_SIZE)
+        if connections <= 0:
+            return
+        try:
+            await asyncio.gather(
+                *(self._open_connection(async_engine=self._engine, pool=PRIMARY_POOL) for _ in range(connections))
+            )
+        except (SQLAlchemyError, OSError) as database_error:
+            raise DatabaseException(message="Failed to connect to the database") from database_error
+        replicas_warm_up = (
+            self._open_connection(async_engine=replica.engine, pool=replica.pool)
+            for replica in self._replicas
+            for _ in range(connections)
+        )
+        for result in await asyncio.gather(*replicas_warm_up, return_exceptions=True):
+            if isinstance(result, Exception):
+                self.logger.warning(f"Replica warm up failed: {result!r}")
+
+    async def _open_connection(self, async_engine: engine.AsyncEngine, pool: str) -> None:
+        """Opens a pool connection. Connections are checked out concurrently, so each of them is a new one"""
+        async with self._connect(async_engine=async_engine, pool=pool) as connection:
+            await connection.execute(text("SELECT 1"))
+
+    @asynccontextmanager
+    async def _connect(
+        self, async_engine: engine.AsyncEngine, pool: str, begin: bool = False
+    ) -> AsyncIterator[engine.AsyncConnection]:
+        """Connection of the engine without a session, its checkout is measured like the checkout of sessions.
+
+        :param async_engine(AsyncEngine): engine of the primary or a replica
+        :param pool(str): name of the engine pool in metrics
+        :param begin(bool): run the statements in a transaction, committed at the exit
+        """
+        started_at = time.perf_counter()
+        async with async_engine.connect() as connection:
+            self._collector.observe_database_checkout(pool=pool, duration=time.perf_counter() - started_at)
+            if not begin:
+                yield connection
+                return
+            async with connection.begin():
+                yield connection
+
+    def session(self, readonly: bool = False) -> SessionHandler:
+        """Create an intermediate session
+
+        :param readonly(bool): run statements in autocommit mode without BEGIN and COMMIT round trips,
+            only for reads, that do not need a consistent snapshot across statements.
+            Such reads are routed to replicas, unless the current request has just written to the primary
+        """
+        unit_of_work = get_unit_of_work()
+        if unit_of_work:
+            return self._shared_session(unit_of_work=unit_of_work, readonly=readonly)
+        return self._new_session(readonly=readonly)
+
+    @asynccontextmanager
+    async def unit_of_work(self) -> AsyncIterator[UnitOfWork]:
+        """Shares sessions between all repositories called within the context and commits once at its end.
+
+        An error raised by any repository or by the context body rolls back the whole unit of work.
+
+        Yields:
+            Unit of work to commit or rollback earlier, e.g. before sending a response
+        """
+        unit_of_work = UnitOfWork()
+        token = set_unit_of_work(unit_of_work)
+        try:
+            yield unit_of_work
+        except BaseException:
+            await unit_of_work.rollback()
+            raise
+        else:
+            await unit_of_work.commit()
+        finally:
+            await unit_of_work.close()
+            reset_unit_of_work(token)
+
+    async def stream(self, statement: Executable, partition_size: int = 1000) -> AsyncIterator[Sequence[Row]]:
+        """Iterates over the rows of a read statement with a server-side cursor, memory does not grow with the result.
+
+        Rows are read from a replica, if available, in a read-only snapshot transaction of its own: it is not shared
+        with the unit of work, so a long export does not hold the request transaction.
+
+        :param statement(Executable): read statement
+        :param partition_size(int): number of rows fetched from the cursor at once
+        """
+        replica = self._select_replica()
+        handler = SessionHandler(
+            session=replica.snapshot_session_maker() if replica else self._snapshot_session_maker(),
+            readonly=True,
+            replica=replica,
+            fallback=self._snapshot_session_maker,
+            collector=self._collector,
+        )
+        async with handler as snapshot_session:
+            result = await snapshot_session.stream(statement, execution_options={"yield_per": partition_size})
+            async for partition in result.partitions():
+                yield partition
+
+    def _shared_session(self, unit_of_work: UnitOfWork, readonly: bool) -> SessionHandler:
+        """Session of the unit of work, opened on the first use.
+
+        Reads use an autocommit session until the first write, then the write session, so they see the uncommitted
+        writes of the unit of work.
+        """
+        if readonly and unit_of_work.write_handler is None:
+            if unit_of_work.read_handler is None:
+                unit_of_work.read_handler = self._new_session(readonly=True)
+                unit_of_work.read_handler.shared = True
+            return unit_of_work.read_handler
+        if unit_of_work.write_handler is None:
+            unit_of_work.write_handler = SessionHandler(
+                session=self._session_maker(), shared=True, collector=self._collector
+            )
+        return unit_of_work.write_handler
+
+    def _new_session(self, readonly: bool) -> SessionHandler:
+        """Session used by a single repository call"""
+        if not readonly:
+            return SessionHandler(session=self._session_maker(), collector=self._collector)
+        replica = self._select_replica()
+        if replica:
+            return SessionHandler(
+                session=replica.session_maker(),
+                readonly=True,
+                replica=replica,
+                fallback=self._readonly_session_maker,
+                collector=self._collector,
+            )
+        return SessionHandler(session=self._readonly_session_maker(), readonly=True, collector=self._collector)
+
+    def _select_replica(self) -> Replica | None:
+        """Selects an available replica for reading.
+
+        Returns:
+            Replica or None, if reads have to be served by the primary
+        """
+        if not self._replicas or is_recently_written(window_sec=self._params.READ_YOUR_WRITES_SEC):
+            return None
+        available = [replica for replica in self._replicas if replica.is_available]
+        if not available:
+            return None
+        if self._params.REPLICA_SELECTION == "least_connections":
+            return min(available, key=lambda replica: replica.checked_out)
+        return available[next(self._replica_counter) % len(available)]
+
+    async def bulk_create(
+        self,
+        table_name: str,
+        objects: Iterable[dict[str, Any] | BaseModel],
+        on_conflict: Literal["nothing", "update"] | None = None,
+        conflict_columns: list[str] | None = None,
+    ) -> int:
+        """Inserts objects in a single transaction.
+
+        Without conflict handling rows are loaded with binary COPY, otherwise with multi-row
+        INSERT ... ON CONFLICT statements. Within a unit of work the rows are inserted in its transaction,
+        so they are committed or rolled back together with its other writes.
+
+        Args:
+            table_name: name of the target table
+            objects: rows as dictionaries or pydantic models, keys of the first object define inserted columns
+            on_conflict: "nothing" to skip conflicting rows, "update" to overwrite them, None to fail on conflicts
+            conflict_columns: columns of the unique constraint, primary key by default
+
+        Raises:
+            ObjectAlreadyExists: if any of the rows violates a unique constraint
+            DatabaseException: if the rows could not be inserted
+
+        Returns:
+            Number of inserted or updated rows
+        """
+        table = await self._prepare_metadata(table_name=table_name)
+        columns, records = self._prepare_objects(table=table, objects=objects)
+        if not records:
+            return 0
+        try:
+            if on_conflict is None:
+                affected = await self._copy_records(table=table, columns=columns, records=records)
+            else:
+                affected = await self._upsert_records(
+                    table=table,
+                    columns=columns,
+                    records=records,
+                    on_conflict=on_conflict,
+                    conflict_columns=conflict_columns or [column.name for column in table.primary_key],
+                )
+        except IntegrityError as integrity_error:
+            if getattr(integrity_error.orig, "sqlstate", None) == UNIQUE_VIOLATION:
+                raise ObjectAlreadyExists(message_prefix="Object already exists") from integrity_error
+            raise DatabaseException(message="Failed to perform database operation") from integrity_error
+        except asyncpg.UniqueViolationError as unique_violation:
+            raise ObjectAlreadyExists(message_prefix="Object already exists") from unique_violation
+        except (DatabaseError, asyncpg.PostgresError, OSError) as database_error:
+            raise DatabaseException(message="Failed to perform database operation") from database_error
+        mark_write()
+        return affected
+
+    @asynccontextmanager
+    async def _bulk_connection(self, begin: bool) -> AsyncIterator[engine.AsyncConnection]:
+        """Connection for bulk statements: the connection of the unit of work, if any, otherwise a new one.
+
+        :param begin(bool): run the statements of a new connection in a transaction, committed at the exit
+        """
+        unit_of_work = get_unit_of_work()
+        if unit_of_work:
+            # The unit of work commits or rolls back its transaction, so the handler is only entered
+            write_session = await self._shared_session(unit_of_work=unit_of_work, readonly=False).__aenter__()
+            yield await write_session.connection()
+            return
+        async with self._connect(async_engine=self._engine, pool=PRIMARY_POOL, begin=begin) as connection:
+            yield connection
+
+    async def _prepare_metadata(self, table_name: str) -> Table:
+        """Loads table metadata from the database once, then serves it from the cache.
+
+        Args:
+            table_name: name of the table
+
+        Returns:
+            Reflected table
+        """
+        table = self._fetched_tables.get(table_name)
+        if table is None:
+            async with self._connect(async_engine=self._engine, pool=PRIMARY_POOL) as connection:
+                table = await connection.run_sync(
+                    lambda sync_connection: Table(table_name, self._metadata, autoload_with=sync_connection)
+                )
+            self._fetched_tables[table_name] = table
+        return table
+
+    @staticmethod
+    def _prepare_objects(
+        table: Table,
+        objects: Iterable[dict[str, Any] | BaseModel],
+    ) -> tuple[list[str], list[tuple]]:
+        """Converts objects to records with values in the order of the table columns.
+
+        Args:
+            table: target table
+            objects: rows as dictionaries or pydantic models
+
+        Raises:
+            DatabaseException: if objects have keys, that are not columns of the table
+
+        Returns:
+            Inserted column names and records
+        """
+        rows = [obj.model_dump() if isinstance(obj, BaseModel) else obj for obj in objects]
+        if not rows:
+            return [], []
+        unknown_columns = rows[0].keys() - table.columns.keys()
+        if unknown_columns:
+            raise DatabaseException(message=f"Unknown columns of {table.name}: {sorted(unknown_columns)}")
+        columns = [column for column in table.columns.keys() if column in rows[0]]
+        return columns, [tuple(row[column] for column in columns) for row in rows]
+
+    async def _copy_records(self, table: Table, columns: list[str], records: list[tuple]) -> int:
+        """Loads records with binary COPY of asyncpg.
+
+        Args:
+            table: target table
+            columns: inserted column names
+            records: values in the order of columns
+
+        Returns:
+            Number of inserted rows
+        """
+        async with self._bulk_connection(begin=False) as connection:
+            raw_connection = await connection.get_raw_connection()
+            driver_connection: asyncpg.Connection = raw_connection.driver_connection
+            if connection.in_transaction() and not driver_connection.is_in_transaction():
+                # The driver transaction is begun by the first statement, COPY of the driver would run outside of it
+                await connection.execute(text("SELECT 1"))
+            await driver_connection.copy_records_to_table(
+                table.name,
+                records=records,
+                columns=columns,
+                schema_name=table.schema,
+            )
+        return len(records)
+
+    async def _upsert_records(  # pylint: disable=too-many-arguments
+        self,
+        table: Table,
+        columns: list[str],
+        records: list[tuple],
+        on_conflict: Literal["nothing", "update"],
+        conflict_columns: list[str],
+    ) -> int:
+        """Inserts records with multi-row INSERT ... ON CONFLICT statements in a single transaction.
+
+        Args:
+            table: target table
+            columns: inserted column names
+            records: values in the order of columns
+            on_conflict: "nothing" to skip conflicting rows, "update" to overwrite them
+            conflict_columns: columns of the unique constraint
+
+        Returns:
+            Number of inserted or updated rows
+        """
+        chunk_size = MAX_QUERY_ARGUMENTS // len(columns)
+        affected = 0
+        async with self._bulk_connection(begin=True) as connection:
+            for start in range(0, len(records), chunk_size):
+                rows = [dict(zip(columns, record)) for record in records[start : start + chunk_size]]
+                query = insert(table).values(rows)
+                if on_conflict == "update" and (updated_columns := set(columns) - set(conflict_columns)):
+                    query = query.on_conflict_do_update(
+                        index_elements=conflict_columns,
+                        set_={column: query.excluded[column] for column in updated_columns},
+                    )
+                else:
+                    query = query.on_conflict_do_nothing(index_elements=conflict_columns)
+                result = await connection.execute(query)
+                affected += result.rowcount
+        return affected
@@ -0,0 +1,153 @@
+import hashlib
+import logging
+import re
+import sys
+import time
+from functools import lru_cache
+from types import FrameType
+from typing import Any
+
+import greenlet
+from sqlalchemy import event
+from sqlalchemy.engine import (
+    Connection,
+    ExecutionContext,
+)
+from sqlalchemy.ext.asyncio import engine
+
+from services.metrics import (
+    Collector,
+    QueryMetrics,
+)
+
+
+_WHITESPACE = re.compile(r"\s+")
+_LITERALS = re.compile(r"\$\d+|%\(\w+\)s|'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_LISTS = re.compile(r"\?(?:\s*,\s*\?)+")
+_ROWS = re.compile(r"(\(\?(?:, \.\.\.)?\))(?:\s*,\s*\(\?(?:, \.\.\.)?\))+")
+# Frames of these modules are skipped when looking for the code that issued a query
+_INTERNAL_MODULES = ("sqlalchemy.", "services.database.", "asyncio.", "contextlib", "greenlet")
+
+
+@lru_cache(maxsize=1024)
+def normalize(statement: str) -> tuple[str, str, str]:
+    """Normalizes the statement, so statements differing only by values and list lengths have the same fingerprint.
+
+    Args:
+        statement: SQL statement with bind parameters
+
+    Returns:
+        Operation, fingerprint and normalized SQL
+    """
+    normalized = _WHITESPACE.sub(" ", statement).strip()
+    normalized = _LITERALS.sub("?", normalized)
+    normalized = _LISTS.sub("?, ...", normalized)
+    normalized = _ROWS.sub(r"\1, ...", normalized)
+    operation = normalized.split(" ", 1)[0].upper()
+    fingerprint = hashlib.blake2s(normalized.encode(), digest_size=6).hexdigest()
+    return operation, fingerprint, normalized
+
+
+def find_caller() -> str | None:
+    """Finds the application function, that issued the query being executed.
+
+    Async sessions run statements in a greenlet, so the frames of the awaiting coroutines are
+    reached through the parent greenlets.
+
+    Returns:
+        Module and qualified name of the function, None if not found
+    """
+    frame: FrameType | None = sys._getframe(1)  # pylint: disable=protected-access
+    current: greenlet.greenlet | None = greenlet.getcurrent()
+    while current is not None:
+        while frame is not None:
+            module = frame.f_globals.get("__name__", "")
+            if not module.startswith(_INTERNAL_MODULES):
+                return f"{module}.{frame.f_code.co_qualname}"
+            frame = frame.f_back
+        current = current.parent
+        frame = current.gr_frame if current is not None else None
+    return None
+
+
+class QueryInstrumentation:
+    """
+    Statement metrics of an engine
+    - latency and row count histograms by statement fingerprint (normalize), rows of server-side cursors are not counted
+    - metrics are bound once per statement text, so executions do no label lookups (_metrics)
+    - slow queries are logged with the calling function, the stack is walked only for them (find_caller)
+    """
+
+    _metrics: dict[str, tuple[str, str, QueryMetrics]]
+
+    def __init__(self, collector: Collector, pool: str, slow_query_threshold_ms: float) -> None:
+        """
+        Args:
+            collector: metrics collector
+            pool: name of the engine pool in logs
+            slow_query_threshold_ms: duration, after which queries are logged, 0 - slow queries are not logged
+        """
+        self._collector = collector
+        self._pool = pool
+        self._slow_query_threshold_sec = slow_query_threshold_ms / 1000
+        self._metrics = {}
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    def attach(self, async_engine: engine.AsyncEngine) -> None:
+        """Starts instrumenting statements of the engine"""
+        event.listen(async_engine.sync_engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(async_engine.sync_engine, "after_cursor_execute", self._after_cursor_execute)
+
+    @staticmethod
+    def _before_cursor_execute(  # pylint: disable=too-many-arguments
+        _connection: Connection,
+        _cursor: Any,
+        _statement: str,
+        _parameters: Any,
+        context: ExecutionContext,
+        _executemany: bool,
+    ) -> None:
+        # The context lives as long as the statement, so nothing is left behind by failed statements
+        context.query_started_at = time.perf_counter()  # type: ignore[attr-defined]
+
+    def _after_cursor_execute(  # pylint: disable=too-many-arguments
+        self,
+        _connection: Connection,
+        cursor: Any,
+        statement: str,
+        _parameters: Any,
+        context: ExecutionContext,
+        _executemany: bool,
+    ) -> None:
+        duration = time.perf_counter() - context.query_started_at  # type: ignore[attr-defined]
+        # The asyncpg adapter reports row count only for DML, selected rows are buffered in the cursor.
+        # Streamed results use server-side cursors, they buffer only the first rows, so their row count is unknown.
+        rows: int | None = cursor.rowcount
+        if rows is None or rows < 0:
+            rows = None if context.execution_options.get("stream_results") else len(getattr(cursor, "_rows", ()))
+
+        bound = self._metrics.get(statement)
+        if bound is None:
+            operation, fingerprint, normalized = normalize(statement)
+            if len(self._metrics) >= normalize.cache_info().maxsize:  # type: ignore[operator]
+                self._metrics.clear()
+            bound = self._metrics[statement] = (
+                fingerprint,
+                normalized,
+                self._collector.bind_database_query(operation=operation, fingerprint=fingerprint),
+            )
+        fingerprint, normalized, metrics = bound
+        metrics.seconds.observe(duration)
+        if rows is not None:
+            metrics.rows.observe(rows)
+
+        if self._slow_query_threshold_sec and duration >= self._slow_query_threshold_sec:
+            slow_query = {
+                "pool": self._pool,
+                "duration_ms": round(duration * 1000, 1),
+                "rows": rows,
+                "fingerprint": fingerprint,
+                "caller": find_caller(),
+                "sql": normalized,
+            }
+            self.logger.warning(f"Slow query: {slow_query}", extra={"slow_query": slow_query})
@@ -0,0 +1,80 @@
+import time
+from contextvars import ContextVar
+
+from sqlalchemy.ext.asyncio import (
+    async_sessionmaker,
+    engine,
+    session,
+)
+
+
+# Time of the last committed write of the current request (task context)
+_last_write_at: ContextVar[float] = ContextVar("last_write_at", default=0.0)
+
+
+def mark_write() -> None:
+    """Remembers that the current request has written to the primary"""
+    _last_write_at.set(time.monotonic())
+
+
+def is_recently_written(window_sec: float) -> bool:
+    """Checks whether the current request has written to the primary within the window.
+
+    Args:
+        window_sec: time during which reads of the request are served by the primary after a write
+
+    Returns:
+        True if replicas may not have the written data yet
+    """
+    last_write_at = _last_write_at.get()
+    return bool(last_write_at) and time.monotonic() - last_write_at < window_sec
+
+
+class Replica:
+    """
+    Read replica of the primary database
+    - statements are run in autocommit mode, replicas are never written
+    - streamed reads run in a read-only snapshot transaction, server-side cursors need one
+    - after a connection failure the replica is skipped for the cooldown period
+    """
+
+    engine: engine.AsyncEngine
+    pool: str
+    session_maker: async_sessionmaker[session.AsyncSession]
+    snapshot_session_maker: async_sessionmaker[session.AsyncSession]
+
+    def __init__(self, replica_engine: engine.AsyncEngine, pool: str, cooldown_sec: float) -> None:
+        """
+        Args:
+            replica_engine: engine connected to the replica
+            pool: name of the replica pool in metrics
+            cooldown_sec: time to skip the replica after a connection failure
+        """
+        self.engine = replica_engine
+        self.pool = pool
+        self.session_maker = async_sessionmaker(
+            bind=replica_engine.execution_options(isolation_level="AUTOCOMMIT"),
+            expire_on_commit=False,
+            info={"pool": pool},
+        )
+        self.snapshot_session_maker = async_sessionmaker(
+            bind=replica_engine.execution_options(isolation_level="REPEATABLE READ", postgresql_readonly=True),
+            expire_on_commit=False,
+            info={"pool": pool},
+        )
+        self._cooldown_sec = cooldown_sec
+        self._unavailable_until = 0.0
+
+    @property
+    def is_available(self) -> bool:
+        """Replica is not in the cooldown after a failure"""
+        return time.monotonic() >= self._unavailable_until
+
+    @property
+    def checked_out(self) -> int:
+        """Number of connections of the replica in use"""
+        return self.engine.sync_engine.pool.checkedout()  # type: ignore[attr-defined]
+
+    def mark_unavailable(self) -> None:
+        """Skips the replica for the cooldown period"""
+        self._unavailable_until = time.monotonic() + self._cooldown_sec
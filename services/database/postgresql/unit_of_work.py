@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+from contextlib import suppress
+from contextvars import (
+    ContextVar,
+    Token,
+)
+from typing import TYPE_CHECKING
+
+
+if TYPE_CHECKING:
+    from services.database.postgresql.postgresql import SessionHandler
+
+
+_unit_of_work: ContextVar[UnitOfWork | None] = ContextVar("unit_of_work", default=None)
+
+
+class UnitOfWork:
+    """
+    Sessions shared by all repositories within a request
+    - sessions are opened on the first use, so requests without database calls do not touch the pool
+    - reads use an autocommit session until the first write, writes use a single transaction
+    - repositories only flush, the transaction is committed once (commit)
+    - repositories of the unit must not be awaited concurrently, a session is not concurrency safe
+    """
+
+    read_handler: SessionHandler | None
+    write_handler: SessionHandler | None
+
+    def __init__(self) -> None:
+        self.read_handler = None
+        self.write_handler = None
+
+    async def commit(self) -> None:
+        """Commits the writes. Following writes of the unit are done in a new transaction
+
+        Raises:
+            ObjectAlreadyExists: if a unique constraint is violated on commit
+            DatabaseException: if the transaction could not be committed
+        """
+        if self.write_handler is None:
+            return
+        write_handler, self.write_handler = self.write_handler, None
+        # Finished as an ordinary session: committed with its error handling and closed
+        write_handler.shared = False
+        await write_handler.__aexit__(None, None, None)  # type: ignore[arg-type]
+
+    async def rollback(self) -> None:
+        """Discards the writes"""
+        if self.write_handler is None:
+            return
+        write_handler, self.write_handler = self.write_handler, None
+        with suppress(Exception):
+            await write_handler.session.rollback()
+        with suppress(Exception):
+            await write_handler.session.close()
+
+    async def close(self) -> None:
+        """Returns connections of the unit to the pool, not committed writes are discarded"""
+        await self.rollback()
+        if self.read_handler is not None:
+            read_handler, self.read_handler = self.read_handler, None
+            with suppress(Exception):
+                await read_handler.session.close()
+
+
+def get_unit_of_work() -> UnitOfWork | None:
+    """Unit of work of the current request, if any"""
+    return _unit_of_work.get()
+
+
+def set_unit_of_work(unit_of_work: UnitOfWork) -> Token:
+    """Makes the unit of work current for the request"""
+    return _unit_of_work.set(unit_of_work)
+
+
+def reset_unit_of_work(token: Token) -> None:
+    """Restores the unit of work, that was current before set_unit_of_work"""
+    _unit_of_work.reset(token)
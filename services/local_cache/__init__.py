@@ -0,0 +1,2 @@
+from services.local_cache.local_cache import LocalCache
+from services.local_cache.settings import LocalCacheParams
@@ -0,0 +1,99 @@
+import time
+from collections import OrderedDict
+from typing import Hashable
+
+from models import enum
+from services.local_cache.settings import LocalCacheParams
+from services.metrics import Collector
+
+
+ENTRY_OVERHEAD_BYTES = 200  # approximate memory of an entry besides its value: key, timestamp and dictionary slot
+
+
+class LocalCache:
+    """
+    In-process LRU cache with TTL in front of a shared cache
+    - values are stored as bytes, so their memory is known and cached objects are never shared between requests
+    - least recently used entries are evicted, when either the entries or the bytes bound is exceeded
+    - expired entries are removed on access
+    - entries are invalidated by writes of this process, writes of other processes are seen after TTL
+    - not thread safe, it is used from the event loop only
+    """
+
+    _entries: OrderedDict[Hashable, tuple[float, bytes]]  # key -> (expiration time, value), oldest first
+
+    def __init__(self, name: str, params: LocalCacheParams, collector: Collector) -> None:
+        """
+        Args:
+            name: name of the cache in metrics
+            params: bounds and TTL of the cache
+            collector: metrics collector
+        """
+        self._max_entries = params.MAX_ENTRIES
+        self._max_bytes = params.MAX_BYTES
+        self._ttl_sec = params.TTL_SEC
+        self._entries = OrderedDict()
+        self._size_bytes = 0
+        self._metrics = collector.bind_cache(cache=name, tier=enum.CollectorCacheTier.LOCAL)
+        collector.bind_local_cache_size(cache=name, entries=self._entries.__len__, size_bytes=lambda: self._size_bytes)
+
+    def get(self, key: Hashable) -> bytes | None:
+        """Gets the value and marks it as recently used.
+
+        Args:
+            key: key of the value
+
+        Returns:
+            Value, None if it is missing or expired
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self._metrics.miss.inc()
+            return None
+        expires_at, value = entry
+        if time.monotonic() >= expires_at:
+            self._remove(key)
+            self._metrics.expired.inc()
+            self._metrics.miss.inc()
+            return None
+        self._entries.move_to_end(key)
+        self._metrics.hit.inc()
+        return value
+
+    def set(self, key: Hashable, value: bytes) -> None:
+        """Stores the value, evicting least recently used entries to fit the bounds.
+
+        Args:
+            key: key of the value
+            value: serialized value
+        """
+        if not self._max_entries or len(value) + ENTRY_OVERHEAD_BYTES > self._max_bytes:
+            return
+        self._remove(key)
+        self._entries[key] = (time.monotonic() + self._ttl_sec, value)
+        self._size_bytes += len(value) + ENTRY_OVERHEAD_BYTES
+        while len(self._entries) > self._max_entries or self._size_bytes > self._max_bytes:
+            self._remove(next(iter(self._entries)))
+            self._metrics.evicted.inc()
+
+    def invalidate(self, key: Hashable) -> None:
+        """Removes the value after it was changed.
+
+        Args:
+            key: key of the value
+        """
+        if self._remove(key):
+            self._metrics.invalidated.inc()
+
+    def clear(self) -> None:
+        """Removes all values"""
+        self._entries.clear()
+        self._size_bytes = 0
+
+    def _remove(self, key: Hashable) -> bool:
+        """Removes the entry, returns whether it existed"""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self._size_bytes -= len(entry[1]) + ENTRY_OVERHEAD_BYTES
+        return True
@@ -0,0 +1,16 @@
+from pydantic import Field
+from pydantic_settings import (
+    BaseSettings,
+    SettingsConfigDict,
+)
+
+
+class LocalCacheParams(BaseSettings):
+    """In-process cache settings"""
+
+    MAX_ENTRIES: int = Field(default=10000)  # 0 - the in-process tier is disabled
+    MAX_BYTES: int = Field(default=16 * 1024 * 1024)
+    # Writes of other processes are seen after TTL at the latest, so it is kept shorter than the Redis TTL
+    TTL_SEC: float = Field(default=2.0)
+
+    model_config = SettingsConfigDict(env_prefix="SERVICE_NAME_LOCAL_CACHE_")
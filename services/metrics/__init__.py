@@ -1 +1,6 @@
-from services.metrics.prometheus_collector import Collector
+from services.metrics.prometheus_collector import (
+    CacheMetrics,
+    Collector,
+    ListenerMetrics,
+    QueryMetrics,
+)
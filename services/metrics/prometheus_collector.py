@@ -1,14 +1,82 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+)
+
 import prometheus_client
 
 from models import enum
-from models.sqlalchemy.base import SqlAlchemyBase
+
+
+if TYPE_CHECKING:
+    from sqlalchemy.pool import QueuePool
+
+    from models.sqlalchemy.base import SqlAlchemyBase
+
+
+BATCH_SIZE_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+@dataclass
+class ListenerMetrics:
+    """Metrics of a single listener, bound to its labels once, so the hot path does no label lookups"""
+
+    total: prometheus_client.metrics.Counter
+    deserialization_error: prometheus_client.metrics.Counter
+    processing_error: prometheus_client.metrics.Counter
+    dead_letter: prometheus_client.metrics.Counter
+    queue_depth: prometheus_client.metrics.Gauge
+    batch_size: prometheus_client.metrics.Histogram
+    batch_fill_seconds: prometheus_client.metrics.Histogram
+    handler_seconds: prometheus_client.metrics.Histogram
+
+
+@dataclass
+class QueryMetrics:
+    """Metrics of a database statement fingerprint, bound to its labels once"""
+
+    seconds: prometheus_client.metrics.Histogram
+    rows: prometheus_client.metrics.Histogram
+
+
+@dataclass
+class CacheMetrics:
+    """Metrics of a cache tier, bound to its labels once"""
+
+    hit: prometheus_client.metrics.Counter
+    miss: prometheus_client.metrics.Counter
+    evicted: prometheus_client.metrics.Counter
+    expired: prometheus_client.metrics.Counter
+    invalidated: prometheus_client.metrics.Counter
+    coalesced: prometheus_client.metrics.Counter
 
 
 class Collector:
     """Mechanism for collecting statistics"""
 
     db_objects: prometheus_client.Counter  # Metrics for objects created in the database
-    consumer_objects: prometheus_client.Counter  # Metrics for objects created in the database
+    consumer_objects: prometheus_client.Counter  # Metrics for messages processed by listeners
+    consumer_batch_size: prometheus_client.Histogram  # Messages given to the listener at once
+    consumer_batch_fill_seconds: prometheus_client.Histogram  # Time from the first buffered message to the flush
+    consumer_handler_seconds: prometheus_client.Histogram  # Duration of listener calls
+    consumer_commit_seconds: prometheus_client.Histogram  # Duration of offsets commits
+    consumer_lag: prometheus_client.Gauge  # Messages between the partition high watermark and the committed offset
+    consumer_queue_depth: prometheus_client.Gauge  # Messages received by listeners, but not processed yet
+    consumer_paused_partitions: prometheus_client.Gauge  # Partitions paused due to overflowed listener queues
+    schema_cache_requests: prometheus_client.Counter  # Schema Registry cache hits and misses
+    database_pool_connections: prometheus_client.Gauge  # Connections of the database pools by their state
+    database_pool_checkout_seconds: prometheus_client.Histogram  # Waiting for a connection from the pool
+    database_query_seconds: prometheus_client.Histogram  # Duration of statements by their fingerprints
+    database_query_rows: prometheus_client.Histogram  # Rows returned or affected by statements
+    startup_phase_seconds: prometheus_client.Gauge  # Duration of the services initialization on startup
+    cache_operations: prometheus_client.Counter  # Hits, misses, removals and coalesced loads of the cache tiers
+    cache_local_entries: prometheus_client.Gauge  # Entries of the in-process cache
+    cache_local_bytes: prometheus_client.Gauge  # Approximate memory of the in-process cache entries
+
+    _consumer_lag_children: dict[tuple[str, int], prometheus_client.metrics.Gauge]
 
     def initialize(self) -> None:
         """
@@ -20,38 +88,216 @@ class Collector:
         self.consumer_objects = prometheus_client.Counter(
             "consumer_objects",
             "Consumer processing results",
-            labelnames=["type"],
+            labelnames=["topic", "key", "type"],
         )
         self.db_objects = prometheus_client.Counter(
             "database_objects",
             "Database models processing",
+            labelnames=["table", "type"],
+        )
+        self.consumer_batch_size = prometheus_client.Histogram(
+            "consumer_batch_size",
+            "Messages given to the listener at once",
+            labelnames=["topic", "key"],
+            buckets=BATCH_SIZE_BUCKETS,
+        )
+        self.consumer_batch_fill_seconds = prometheus_client.Histogram(
+            "consumer_batch_fill_seconds",
+            "Time from the first buffered message to the buffer flush",
+            labelnames=["topic", "key"],
+        )
+        self.consumer_handler_seconds = prometheus_client.Histogram(
+            "consumer_handler_seconds",
+            "Duration of the listener calls",
+            labelnames=["topic", "key"],
+        )
+        self.consumer_commit_seconds = prometheus_client.Histogram(
+            "consumer_commit_seconds",
+            "Duration of the offsets commits",
+        )
+        self.consumer_lag = prometheus_client.Gauge(
+            "consumer_lag",
+            "Messages between the partition high watermark and the committed offset",
+            labelnames=["topic", "partition"],
+        )
+        self._consumer_lag_children = {}
+        self.database_pool_connections = prometheus_client.Gauge(
+            "database_pool_connections",
+            "Connections of the database pool by their state",
+            labelnames=["pool", "state"],
+        )
+        self.database_pool_checkout_seconds = prometheus_client.Histogram(
+            "database_pool_checkout_seconds",
+            "Time to get a connection from the database pool, including the pre-ping",
+            labelnames=["pool"],
+            buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+        )
+        self.database_query_seconds = prometheus_client.Histogram(
+            "database_query_seconds",
+            "Duration of the database statements",
+            labelnames=["operation", "fingerprint"],
+            buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+        )
+        self.startup_phase_seconds = prometheus_client.Gauge(
+            "startup_phase_seconds",
+            "Duration of the services initialization on startup",
+            labelnames=["phase"],
+        )
+        self.database_query_rows = prometheus_client.Histogram(
+            "database_query_rows",
+            "Rows returned or affected by the database statements",
+            labelnames=["operation", "fingerprint"],
+            buckets=(0, 1, 5, 10, 50, 100, 500, 1000, 5000, 10000),
+        )
+        self.consumer_queue_depth = prometheus_client.Gauge(
+            "consumer_queue_depth",
+            "Messages received by the listener, but not processed yet",
+            labelnames=["topic", "key"],
+        )
+        self.consumer_paused_partitions = prometheus_client.Gauge(
+            "consumer_paused_partitions",
+            "Partitions paused due to overflowed listener queues",
+        )
+        self.schema_cache_requests = prometheus_client.Counter(
+            "schema_cache_requests",
+            "Schema Registry cache requests",
             labelnames=["type"],
         )
+        self.cache_operations = prometheus_client.Counter(
+            "cache_operations",
+            "Hits, misses, removals and coalesced loads of the application cache tiers",
+            labelnames=["cache", "tier", "type"],
+        )
+        self.cache_local_entries = prometheus_client.Gauge(
+            "cache_local_entries",
+            "Entries of the in-process cache",
+            labelnames=["cache"],
+        )
+        self.cache_local_bytes = prometheus_client.Gauge(
+            "cache_local_bytes",
+            "Approximate memory of the in-process cache entries",
+            labelnames=["cache"],
+        )
 
-    def increment_consumer_total(self, topic: str, key: str | None, count: int = 1) -> None:
-        """Adding metrics for processed data"""
-        label = f"{topic}.{key}.{enum.CollectorConsumerType.TOTAL}"
-        self.consumer_objects.labels(label).inc(count)
+    def bind_listener(self, topic: str, key: str | None) -> ListenerMetrics:
+        """Binds consumer metrics to the listener labels.
+
+        Args:
+            topic: Kafka topic name
+            key: message key of the listener
+
+        Returns:
+            Metrics ready to be updated without label lookups
+        """
+        key = str(key)
+        return ListenerMetrics(
+            total=self.consumer_objects.labels(topic, key, enum.CollectorConsumerType.TOTAL),
+            deserialization_error=self.consumer_objects.labels(
+                topic, key, enum.CollectorConsumerType.DESERIALIZATION_ERROR
+            ),
+            processing_error=self.consumer_objects.labels(topic, key, enum.CollectorConsumerType.PROCESSING_ERROR),
+            dead_letter=self.consumer_objects.labels(topic, key, enum.CollectorConsumerType.DEAD_LETTER),
+            queue_depth=self.consumer_queue_depth.labels(topic, key),
+            batch_size=self.consumer_batch_size.labels(topic, key),
+            batch_fill_seconds=self.consumer_batch_fill_seconds.labels(topic, key),
+            handler_seconds=self.consumer_handler_seconds.labels(topic, key),
+        )
 
-    def increment_consumer_error(self, topic: str, key: str | None) -> None:
-        """Adding metrics for processed data"""
-        label = f"{topic}.{key}.{enum.CollectorConsumerType.DESERIALIZATION_ERROR}"
-        self.consumer_objects.labels(label).inc()
+    def observe_consumer_commit(self, duration: float) -> None:
+        """Duration of the offsets commit"""
+        self.consumer_commit_seconds.observe(duration)
 
-    def increment_consumer_processing_error(self, topic: str, key: str | None) -> None:
-        """Adding metrics for processed data"""
-        label = f"{topic}.{key}.{enum.CollectorConsumerType.PROCESSING_ERROR}"
-        self.consumer_objects.labels(label).inc()
+    def set_consumer_lag(self, topic: str, partition: int, lag: int) -> None:
+        """Number of messages in the partition, that are not committed yet"""
+        child = self._consumer_lag_children.get((topic, partition))
+        if child is None:
+            child = self._consumer_lag_children[(topic, partition)] = self.consumer_lag.labels(topic, str(partition))
+        child.set(lag)
+
+    def set_consumer_paused_partitions(self, count: int) -> None:
+        """Number of partitions paused by listeners backpressure"""
+        self.consumer_paused_partitions.set(count)
+
+    def increment_schema_cache_hit(self) -> None:
+        """Schema found in the cache"""
+        self.schema_cache_requests.labels(enum.CollectorSchemaCacheType.HIT).inc()
+
+    def increment_schema_cache_miss(self) -> None:
+        """Schema requested from the registry"""
+        self.schema_cache_requests.labels(enum.CollectorSchemaCacheType.MISS).inc()
+
+    def bind_cache(self, cache: str, tier: enum.CollectorCacheTier) -> CacheMetrics:
+        """Binds cache metrics to the cache and tier labels.
+
+        Args:
+            cache: name of the cache
+            tier: cache tier
+
+        Returns:
+            Metrics ready to be updated without label lookups
+        """
+        return CacheMetrics(
+            hit=self.cache_operations.labels(cache, tier, enum.CollectorCacheType.HIT),
+            miss=self.cache_operations.labels(cache, tier, enum.CollectorCacheType.MISS),
+            evicted=self.cache_operations.labels(cache, tier, enum.CollectorCacheType.EVICTED),
+            expired=self.cache_operations.labels(cache, tier, enum.CollectorCacheType.EXPIRED),
+            invalidated=self.cache_operations.labels(cache, tier, enum.CollectorCacheType.INVALIDATED),
+            coalesced=self.cache_operations.labels(cache, tier, enum.CollectorCacheType.COALESCED),
+        )
+
+    def bind_local_cache_size(self, cache: str, entries: Callable[[], int], size_bytes: Callable[[], int]) -> None:
+        """Size gauges, that are read from the in-process cache on every scrape.
+
+        Args:
+            cache: name of the cache
+            entries: function returning the number of entries
+            size_bytes: function returning the approximate memory of the entries
+        """
+        self.cache_local_entries.labels(cache).set_function(entries)
+        self.cache_local_bytes.labels(cache).set_function(size_bytes)
+
+    def set_startup_phase_duration(self, phase: str, duration: float) -> None:
+        """Duration of the service initialization"""
+        self.startup_phase_seconds.labels(phase).set(duration)
+
+    def bind_database_pool(self, pool: str, engine_pool: QueuePool) -> None:
+        """Connections gauges, that are read from the pool on every scrape.
+
+        Args:
+            pool: name of the pool in metrics
+            engine_pool: SQLAlchemy pool of the engine
+        """
+        self.database_pool_connections.labels(pool, "checked_out").set_function(engine_pool.checkedout)
+        self.database_pool_connections.labels(pool, "idle").set_function(engine_pool.checkedin)
+        # Negative overflow means connections, that may still be opened within the pool size
+        self.database_pool_connections.labels(pool, "overflow").set_function(lambda: max(0, engine_pool.overflow()))
+
+    def observe_database_checkout(self, pool: str, duration: float) -> None:
+        """Time of waiting for a connection from the pool"""
+        self.database_pool_checkout_seconds.labels(pool).observe(duration)
+
+    def bind_database_query(self, operation: str, fingerprint: str) -> QueryMetrics:
+        """Binds statement metrics to the fingerprint labels.
+
+        Args:
+            operation: SQL command of the statement
+            fingerprint: hash of the normalized statement
+
+        Returns:
+            Metrics ready to be updated without label lookups
+        """
+        return QueryMetrics(
+            seconds=self.database_query_seconds.labels(operation, fingerprint),
+            rows=self.database_query_rows.labels(operation, fingerprint),
+        )
 
-    def increment_database_total(self, model: SqlAlchemyBase) -> None:
+    def increment_database_total(self, model: SqlAlchemyBase | type[SqlAlchemyBase], count: int = 1) -> None:
         """DB creations counter"""
-        label = f"{model.__tablename__}.{enum.CollectorDatabaseType.TOTAL_CREATED}"
-        self.db_objects.labels(label).inc()
+        self.db_objects.labels(model.__tablename__, enum.CollectorDatabaseType.TOTAL_CREATED).inc(count)
 
     def increment_database_error(self, model: SqlAlchemyBase) -> None:
         """DB error creations counter"""
-        label = f"{model.__tablename__}.{enum.CollectorDatabaseType.ERROR_CREATION}"
-        self.db_objects.labels(label).inc()
+        self.db_objects.labels(model.__tablename__, enum.CollectorDatabaseType.ERROR_CREATION).inc()
 
     def generate(self) -> bytes:
         """Forwarding the generation of statistics results"""
@@ -1,4 +1,18 @@
-from services.s3_storage.boto3.boto3 import S3Boto3
+from typing import TYPE_CHECKING
+
 from services.s3_storage.boto3.settings import S3Params
 from services.s3_storage.minio.settings import MinioParams
 from services.s3_storage.s3_storage import S3Storage
+
+
+if TYPE_CHECKING:
+    from services.s3_storage.boto3.boto3 import S3Boto3
+
+
+def __getattr__(name: str):
+    """AWS clients are imported only when the implementation is used"""
+    if name == "S3Boto3":
+        from services.s3_storage.boto3.boto3 import S3Boto3  # pylint: disable=import-outside-toplevel
+
+        return S3Boto3
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
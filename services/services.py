@@ -1,57 +1,165 @@
+from __future__ import annotations
+
 import asyncio
 import logging
-
-from aiostorage_orm import (
-    AIORedisORM,
-    AIOStorageORM,
+import time
+from contextlib import suppress
+from typing import (
+    TYPE_CHECKING,
+    Awaitable,
+    Callable,
+    Generic,
+    TypeVar,
 )
-from minio import Minio
 
-from app.settings import Settings
-from services.broker import (
-    Broker,
-    KafkaBroker,
-)
-from services.database import (
-    Database,
-    PostgreSQL,
-)
-from services.metrics import Collector
 
+if TYPE_CHECKING:
+    from aiostorage_orm import AIOStorageORM
+    from minio import Minio
+    from redis.asyncio import Redis
 
-class Services:
-    """Service Orchestrator"""
+    from app.settings import Settings
+    from services.broker import Broker
+    from services.database import Database
+    from services.metrics import Collector
 
-    config: Settings = Settings()
 
-    collector: Collector = Collector()
+ServiceType = TypeVar("ServiceType")
 
-    pg_echo_pool = "debug" if config.postgresql.ECHO_POOL else False
-    database: Database = PostgreSQL(params=config.postgresql)
-    broker: Broker = KafkaBroker(
-        bootstrap_servers=config.kafka_settings.BOOTSTRAP_SERVERS,
-        group_id=config.kafka_settings.GROUP_ID,
-        collector=collector,
-        schema_registry_configuration=config.kafka_settings.schema_registry_configuration,
-    )
-    storage_orm: AIOStorageORM = AIORedisORM(
-        host=config.redis.HOST,
-        port=config.redis.PORT,
-        db=config.redis.DB,
+
+class LazyService(Generic[ServiceType]):
+    """
+    Service constructed on the first access.
+    The constructed service replaces the descriptor in the class, so next accesses are plain attribute reads.
+    """
+
+    def __init__(self, factory: Callable[[type[Services]], ServiceType]) -> None:
+        """
+        Args:
+            factory: function constructing the service, services it depends on are taken from the container
+        """
+        self._factory = factory
+        self._name = factory.__name__
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self._name = name
+
+    def __get__(self, instance: Services | None, owner: type[Services]) -> ServiceType:
+        service = self._factory(owner)
+        setattr(owner, self._name, service)
+        return service
+
+
+def _create_config(_services: type[Services]) -> Settings:
+    from app.settings import Settings  # pylint: disable=import-outside-toplevel
+
+    return Settings()
+
+
+def _create_collector(_services: type[Services]) -> Collector:
+    from services.metrics import Collector  # pylint: disable=import-outside-toplevel
+
+    return Collector()
+
+
+def _create_database(services: type[Services]) -> Database:
+    from services.database import PostgreSQL  # pylint: disable=import-outside-toplevel
+
+    return PostgreSQL(params=services.config.postgresql, collector=services.collector)
+
+
+def _create_broker(services: type[Services]) -> Broker:
+    from services.broker import KafkaBroker  # pylint: disable=import-outside-toplevel
+
+    return KafkaBroker(params=services.config.kafka_settings, collector=services.collector)
+
+
+def _create_redis(services: type[Services]) -> Redis:
+    from redis.asyncio import Redis  # pylint: disable=import-outside-toplevel
+
+    return Redis(
+        host=services.config.redis.HOST,
+        port=services.config.redis.PORT,
+        db=services.config.redis.DB,
     )
-    minio: Minio = Minio(
-        endpoint=config.minio.ENDPOINT,
-        access_key=config.minio.ACCESS_KEY,
-        secret_key=config.minio.SECRET_KEY,
-        secure=config.minio.SECURE,
+
+
+def _create_storage_orm(services: type[Services]) -> AIOStorageORM:
+    from aiostorage_orm import AIORedisORM  # pylint: disable=import-outside-toplevel
+
+    # Shares the connection pool with the plain Redis client
+    return AIORedisORM(client=services.redis)
+
+
+def _create_minio(services: type[Services]) -> Minio:
+    from minio import Minio  # pylint: disable=import-outside-toplevel
+
+    return Minio(
+        endpoint=services.config.minio.ENDPOINT,
+        access_key=services.config.minio.ACCESS_KEY,
+        secret_key=services.config.minio.SECRET_KEY,
+        secure=services.config.minio.SECURE,
     )
 
+
+class Services:
+    """
+    Service Orchestrator
+    Services are constructed on the first access, so importing the module has no side effects
+    and does not import the clients of services, that are not used
+    """
+
+    config: Settings = LazyService(_create_config)  # type: ignore[assignment]
+
+    collector: Collector = LazyService(_create_collector)  # type: ignore[assignment]
+
+    database: Database = LazyService(_create_database)  # type: ignore[assignment]
+    broker: Broker = LazyService(_create_broker)  # type: ignore[assignment]
+    redis: Redis = LazyService(_create_redis)  # type: ignore[assignment]
+    storage_orm: AIOStorageORM = LazyService(_create_storage_orm)  # type: ignore[assignment]
+    minio: Minio = LazyService(_create_minio)  # type: ignore[assignment]
+
+    _consumer_task: asyncio.Task | None = None
+
     def set_logging_config(self):
         """Уровень логирования, в зависимости от режима DEBUG"""
         logging_level = "DEBUG" if self.config.DEBUG else "INFO"
         logging_format = "%(asctime)s [%(name)s:%(lineno)s] [%(levelname)s]: %(message)s"
         logging.basicConfig(level=logging_level, format=logging_format)
 
+    async def initialize(self) -> None:
+        """Initializes all services concurrently, so startup takes as long as the slowest of them.
+
+        Message handlers use the database and the cache, so the broker starts consuming only after they are ready.
+        If any service fails to initialize, the consumer is stopped and the error is raised.
+        """
+        started_at = time.perf_counter()
+        await self.initialize_services()
+        database = asyncio.create_task(self._initialize_phase(phase="database", initialize=self.initialize_db))
+        cache = asyncio.create_task(self._initialize_phase(phase="cache", initialize=self.initialize_cache))
+        broker = asyncio.create_task(self._initialize_phase(phase="broker", initialize=self.initialize_broker))
+        s3 = asyncio.create_task(self._initialize_phase(phase="s3", initialize=self.initialize_s3))
+        phases = [database, cache, broker, s3]
+        try:
+            await asyncio.gather(database, cache, broker)
+            self.start_consumer()
+            await asyncio.gather(*phases)
+        except BaseException:
+            for phase in phases:
+                phase.cancel()
+            await asyncio.gather(*phases, return_exceptions=True)
+            await self.stop_broker()
+            raise
+        self.collector.set_startup_phase_duration(phase="total", duration=time.perf_counter() - started_at)
+
+    async def _initialize_phase(self, phase: str, initialize: Callable[[], Awaitable[None]]) -> None:
+        """Initializes a service and records its startup duration"""
+        started_at = time.perf_counter()
+        await initialize()
+        duration = time.perf_counter() - started_at
+        self.collector.set_startup_phase_duration(phase=phase, duration=duration)
+        logging.info(f"Service initialized: {phase=}, {duration=:.3f}s")
+
     async def initialize_services(self) -> None:
         """Perform initialization operations. Including making connections"""
         self.set_logging_config()
@@ -60,10 +168,15 @@ class Services:
     async def initialize_db(self) -> None:
         """Perform initialization operations. Including making connections"""
         await self.database.connect()
+        await self.database.warm_up()
 
     async def initialize_broker(self) -> None:
-        """Perform initialization operations. Including making connections"""
-        asyncio.create_task(self.broker.start())
+        """Perform initialization operations. Consuming is started separately by start_consumer"""
+        await self.broker.warm_up()
+
+    def start_consumer(self) -> None:
+        """Starts consuming messages in the background"""
+        self.__class__._consumer_task = asyncio.create_task(self.broker.start(), name="broker-consumer")
 
     async def initialize_cache(self) -> None:
         """Perform initialization operations. Including making connections"""
@@ -71,15 +184,20 @@ class Services:
 
     async def initialize_s3(self) -> None:
         """Perform initialization operations. Including making connections"""
-        self.minio = Minio(
-            endpoint=self.config.minio.ENDPOINT,
-            access_key=self.config.minio.ACCESS_KEY,
-            secret_key=self.config.minio.SECRET_KEY,
-            secure=self.config.minio.SECURE,
-        )
+        # Minio client is synchronous, the bucket is checked without blocking other services initialization
+        await asyncio.to_thread(self._ensure_bucket)
+
+    def _ensure_bucket(self) -> None:
+        """Creates the bucket, if it does not exist"""
         if not self.minio.bucket_exists(self.config.minio.BUCKET):
             self.minio.make_bucket(self.config.minio.BUCKET)
 
     async def stop_broker(self) -> None:
         """Perform stop operations"""
+        consumer_task, self.__class__._consumer_task = self._consumer_task, None
+        if consumer_task and not consumer_task.done():
+            # Cancelled first, so the consumer is not started after the broker is stopped
+            consumer_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await consumer_task
         await self.broker.stop()
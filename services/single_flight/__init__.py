@@ -0,0 +1,2 @@
+from services.single_flight.settings import SingleFlightParams
+from services.single_flight.single_flight import SingleFlight
@@ -0,0 +1,16 @@
+from pydantic import Field
+from pydantic_settings import (
+    BaseSettings,
+    SettingsConfigDict,
+)
+
+
+class SingleFlightParams(BaseSettings):
+    """Settings of loads coalescing on cache misses"""
+
+    # Coalesce loads of all processes with a Redis lock, not only loads of the process
+    LOCK: bool = Field(default=False)
+    LOCK_TIMEOUT_SEC: float = Field(default=2.0)  # lock expiration and the longest wait for the lock holder
+    LOCK_POLL_SEC: float = Field(default=0.05)  # interval of checking the cache, while another process loads
+
+    model_config = SettingsConfigDict(env_prefix="SERVICE_NAME_SINGLE_FLIGHT_")
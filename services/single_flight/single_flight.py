@@ -0,0 +1,110 @@
+import asyncio
+import contextvars
+import time
+from contextlib import suppress
+from typing import (
+    Awaitable,
+    Callable,
+    Generic,
+    TypeVar,
+)
+
+from redis.asyncio import Redis
+from redis.exceptions import (
+    LockError,
+    RedisError,
+)
+
+from models import enum
+from services.metrics import Collector
+from services.single_flight.settings import SingleFlightParams
+
+
+ResultType = TypeVar("ResultType")
+
+
+class SingleFlight(Generic[ResultType]):
+    """
+    Coalescing of concurrent loads of the same key on cache misses
+    - concurrent callers of the process wait for a single load (_pending)
+    - optionally, processes coordinate with a Redis lock: the lock holder loads, others wait for the cache to be
+      filled by it and load themselves, if the lock is released or expires without it
+    - the load runs in a task of its own, so a cancelled caller does not cancel the load for the others
+    """
+
+    _pending: dict[str, asyncio.Task]
+
+    def __init__(self, name: str, params: SingleFlightParams, collector: Collector, redis: Redis | None = None) -> None:
+        """
+        Args:
+            name: name of the cache in metrics and lock keys
+            params: lock settings
+            collector: metrics collector
+            redis: Redis client for the lock, only loads of the process are coalesced if not passed
+        """
+        self._name = name
+        self._params = params
+        self._redis = redis if params.LOCK else None
+        self._pending = {}
+        self._local_metrics = collector.bind_cache(cache=name, tier=enum.CollectorCacheTier.LOCAL)
+        self._redis_metrics = collector.bind_cache(cache=name, tier=enum.CollectorCacheTier.REDIS)
+
+    async def do(
+        self,
+        key: str,
+        load: Callable[[], Awaitable[ResultType]],
+        lookup: Callable[[], Awaitable[ResultType | None]],
+    ) -> ResultType:
+        """Loads the value of the key once for all concurrent callers.
+
+        Args:
+            key: key of the value
+            load: function loading the value from the source and filling the cache
+            lookup: function reading the value from the shared cache, used while another process loads it
+
+        Returns:
+            Loaded value
+        """
+        task = self._pending.get(key)
+        if task is None:
+            # The load does not belong to the request, that started it, e.g. to its database unit of work
+            task = asyncio.create_task(self._load(key=key, load=load, lookup=lookup), context=contextvars.Context())
+            self._pending[key] = task
+            task.add_done_callback(lambda _: self._pending.pop(key, None))
+        else:
+            self._local_metrics.coalesced.inc()
+        return await asyncio.shield(task)
+
+    async def _load(
+        self,
+        key: str,
+        load: Callable[[], Awaitable[ResultType]],
+        lookup: Callable[[], Awaitable[ResultType | None]],
+    ) -> ResultType:
+        """Loads the value holding the Redis lock, or waits for the process holding it"""
+        if self._redis is None:
+            return await load()
+        lock = self._redis.lock(f"single_flight.{self._name}.{key}", timeout=self._params.LOCK_TIMEOUT_SEC)
+        try:
+            acquired = await lock.acquire(blocking=False)
+        except RedisError:
+            return await load()
+        if acquired:
+            try:
+                return await load()
+            finally:
+                with suppress(LockError, RedisError):
+                    await lock.release()
+
+        self._redis_metrics.coalesced.inc()
+        deadline = time.monotonic() + self._params.LOCK_TIMEOUT_SEC
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self._params.LOCK_POLL_SEC)
+            value = await lookup()
+            if value is not None:
+                return value
+            # Released lock without the cached value: the holder failed or there is nothing to cache
+            with suppress(RedisError):
+                if not await lock.locked():
+                    break
+        return await load()
@@ -0,0 +1,33 @@
+import json
+import uuid
+from typing import AsyncIterator
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.managers.projects import ProjectsManager
+
+
+async def make_body(*rows: dict) -> AsyncIterator[bytes]:
+    yield "\n".join(json.dumps(row) for row in rows).encode()
+
+
+@pytest.fixture
+def created(monkeypatch: pytest.MonkeyPatch) -> AsyncMock:
+    """Chunks of created projects, the database is not touched"""
+    create_chunk = AsyncMock(side_effect=lambda project_models: len(project_models))
+    monkeypatch.setattr(ProjectsManager, "_create_chunk", create_chunk)
+    return create_chunk
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("row", [{"name": "Apollo"}, {"id": "", "name": "Apollo"}, {"id": None, "name": "Apollo"}])
+async def test_missing_id_is_generated(created: AsyncMock, row: dict) -> None:
+    response = await ProjectsManager().import_projects(chunks=make_body(row), content_type="application/x-ndjson")
+
+    assert response.imported == 1
+    assert response.failed == 0
+    (project,) = created.await_args.kwargs["project_models"]
+    assert isinstance(project.id, uuid.UUID)
+    assert project.name == "Apollo"
+
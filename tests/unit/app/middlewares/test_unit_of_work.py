@@ -0,0 +1,105 @@
+import json
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+from unittest.mock import (
+    AsyncMock,
+    Mock,
+)
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from starlette.types import (
+    ASGIApp,
+    Message,
+)
+
+from app.middlewares import UnitOfWorkMiddleware
+from models import pydantic
+from services import Services
+
+
+async def create_project(request) -> JSONResponse:
+    return JSONResponse({"id": 1}, status_code=201)
+
+
+async def fail_validation(request) -> JSONResponse:
+    return JSONResponse({"detail": "Invalid project"}, status_code=422)
+
+
+@pytest.fixture
+def unit_of_work(monkeypatch: pytest.MonkeyPatch) -> Mock:
+    """Unit of work of the requests, the database is not touched"""
+    request_unit_of_work = Mock(commit=AsyncMock(), rollback=AsyncMock())
+
+    @asynccontextmanager
+    async def make_unit_of_work() -> AsyncIterator[Mock]:
+        yield request_unit_of_work
+
+    monkeypatch.setattr(Services, "database", Mock(unit_of_work=make_unit_of_work))
+    return request_unit_of_work
+
+
+@pytest.fixture
+def app() -> ASGIApp:
+    application = Starlette(
+        routes=[Route("/projects", create_project, methods=["POST"]), Route("/invalid", fail_validation)]
+    )
+    application.add_middleware(UnitOfWorkMiddleware)
+    return application
+
+
+async def call(app: ASGIApp, method: str, path: str) -> tuple[int, dict]:
+    """Sends the request to the application and returns the status and JSON body of its response"""
+    scope = {"type": "http", "method": method, "path": path, "headers": [], "query_string": b""}
+    messages: list[Message] = []
+
+    async def receive() -> Message:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: Message) -> None:
+        messages.append(message)
+
+    await app(scope, receive, send)
+    assert [message["type"] for message in messages] == ["http.response.start", "http.response.body"]
+    return messages[0]["status"], json.loads(messages[1]["body"])
+
+
+@pytest.mark.asyncio
+async def test_success_response_is_sent_after_commit(app: ASGIApp, unit_of_work: Mock) -> None:
+    status, body = await call(app, "POST", "/projects")
+
+    assert status == 201
+    assert body == {"id": 1}
+    unit_of_work.commit.assert_awaited_once()
+    unit_of_work.rollback.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_error_response_rolls_writes_back(app: ASGIApp, unit_of_work: Mock) -> None:
+    status, _ = await call(app, "GET", "/invalid")
+
+    assert status == 422
+    unit_of_work.rollback.assert_awaited_once()
+    unit_of_work.commit.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_commit_error_is_sent_instead_of_success(app: ASGIApp, unit_of_work: Mock) -> None:
+    unit_of_work.commit.side_effect = pydantic.ObjectAlreadyExists(message_prefix="Object already exists", id=1)
+
+    status, body = await call(app, "POST", "/projects")
+
+    assert status == 409
+    assert body == {"detail": "Object already exists: {'id': 1}"}
+
+
+@pytest.mark.asyncio
+async def test_unexpected_commit_error_is_sent_as_database_error(app: ASGIApp, unit_of_work: Mock) -> None:
+    unit_of_work.commit.side_effect = ConnectionResetError("Connection reset by peer")
+
+    status, body = await call(app, "POST", "/projects")
+
+    assert status == 500
+    assert body == {"detail": "Database error: Failed to perform database operation"}
@@ -0,0 +1,186 @@
+import json
+import threading
+from collections import Counter
+from http import HTTPStatus
+from http.server import (
+    BaseHTTPRequestHandler,
+    ThreadingHTTPServer,
+)
+from typing import Iterator
+from unittest.mock import (
+    AsyncMock,
+    Mock,
+)
+
+import aiokafka
+import pytest
+from confluent_kafka.schema_registry import SchemaRegistryClient
+from pydantic import BaseModel
+
+from services.broker import KafkaBroker
+from services.broker.kafka.listener import Listener
+from services.broker.kafka.settings import KafkaSettings
+from services.metrics import Collector
+
+
+TOPIC = "dev.admin.cdc.project.0"
+
+
+class Project(BaseModel):
+    name: str
+
+
+class StandInRegistry:
+    """
+    Schema Registry serving registered schemas over HTTP
+    - only the requests of the schema cache are supported: the latest subject version and the schema by ID
+    - while it is unavailable, every request is answered with 503
+    """
+
+    def __init__(self) -> None:
+        self.subjects: dict[str, int] = {}
+        self.schemas: dict[int, str] = {}
+        self.requests: Counter[str] = Counter()
+        self.available = True
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self.url = f"http://127.0.0.1:{self._server.server_port}"
+
+    def register(self, subject: str, schema: dict) -> int:
+        """Registers a new version of the subject and returns its schema ID"""
+        schema_id = len(self.schemas) + 1
+        self.schemas[schema_id] = json.dumps(schema)
+        self.subjects[subject] = schema_id
+        return schema_id
+
+    def start(self) -> None:
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _make_handler(self) -> type[BaseHTTPRequestHandler]:
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:  # pylint: disable=invalid-name
+                path = self.path.split("?")[0]
+                registry.requests[path] = registry.requests[path] + 1
+                if not registry.available:
+                    self._respond(HTTPStatus.SERVICE_UNAVAILABLE, {"error_code": 50301, "message": "Unavailable"})
+                    return
+                parts = path.strip("/").split("/")
+                if parts[:2] == ["schemas", "ids"] and int(parts[2]) in registry.schemas:
+                    self._respond(HTTPStatus.OK, {"schema": registry.schemas[int(parts[2])]})
+                elif parts[0] == "subjects" and parts[1] in registry.subjects:
+                    schema_id = registry.subjects[parts[1]]
+                    schema_str = registry.schemas[schema_id]
+                    self._respond(
+                        HTTPStatus.OK, {"subject": parts[1], "id": schema_id, "version": schema_id, "schema": schema_str}
+                    )
+                else:
+                    self._respond(HTTPStatus.NOT_FOUND, {"error_code": 40401, "message": "Not found"})
+
+            def _respond(self, status: HTTPStatus, body: dict) -> None:
+                content = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/vnd.schemaregistry.v1+json")
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, *args) -> None:
+                """Requests are not logged"""
+
+        return Handler
+
+
+def make_records(topic_partition: aiokafka.TopicPartition, count: int) -> list[aiokafka.ConsumerRecord]:
+    """Records with project names as values"""
+    return [
+        aiokafka.ConsumerRecord(
+            topic=topic_partition.topic,
+            partition=topic_partition.partition,
+            offset=offset,
+            timestamp=0,
+            timestamp_type=0,
+            key=None,
+            value=f"{topic_partition.partition}-{offset}".encode(),
+            checksum=0,
+            serialized_key_size=0,
+            serialized_value_size=0,
+            headers=[],
+        )
+        for offset in range(count)
+    ]
+
+
+def add_listener(kafka_broker: type[KafkaBroker], function: AsyncMock, messages_count: int) -> Listener:
+    """Registers a listener of project batches"""
+    listener = Listener(
+        topic_key=kafka_broker.make_key(topic=TOPIC, key=None),
+        function=function,
+        model=Project,
+        is_multiple=True,
+        max_buffer_size=messages_count,
+        interval_period_sec=0.05,
+        retry_backoff_sec=0.01,
+        metrics=Mock(),
+    )
+    kafka_broker._listeners[listener.topic_key] = listener  # pylint: disable=protected-access
+    return listener
+
+
+@pytest.fixture
+def registry() -> Iterator[StandInRegistry]:
+    stand_in_registry = StandInRegistry()
+    stand_in_registry.start()
+    yield stand_in_registry
+    stand_in_registry.stop()
+
+
+@pytest.fixture
+def schema_registry_client(registry: StandInRegistry) -> SchemaRegistryClient:
+    return SchemaRegistryClient(conf={"url": registry.url})
+
+
+@pytest.fixture
+def collector() -> Mock:
+    return Mock(spec=Collector)
+
+
+@pytest.fixture
+def consumer() -> Mock:
+    """Consumer, that rejects commits of partitions not assigned to it"""
+    kafka_consumer = Mock(spec=aiokafka.AIOKafkaConsumer)
+    kafka_consumer.assignment.return_value = set()
+    kafka_consumer.highwater.return_value = None
+
+    async def commit(offsets: dict[aiokafka.TopicPartition, int]) -> None:
+        if not set(offsets) <= kafka_consumer.assignment.return_value:
+            raise aiokafka.errors.IllegalStateError("Partitions are not assigned")
+
+    kafka_consumer.commit = AsyncMock(side_effect=commit)
+    return kafka_consumer
+
+
+@pytest.fixture
+def kafka_broker(monkeypatch: pytest.MonkeyPatch, consumer: Mock, collector: Mock) -> type[KafkaBroker]:
+    """Broker class with the stand-in consumer and its own state, restored after the test.
+
+    Message values are project names, so no Avro encoding is needed.
+    """
+
+    async def prepare_objs(buffer: list[aiokafka.ConsumerRecord], target_model: type[BaseModel], decoder=None):
+        return [target_model(name=message.value.decode()) for message in buffer]
+
+    monkeypatch.setattr(KafkaBroker, "_listeners", {})
+    monkeypatch.setattr(KafkaBroker, "_partition_workers", {})
+    monkeypatch.setattr(KafkaBroker, "_paused_partitions", {})
+    monkeypatch.setattr(KafkaBroker, "_committed_offsets", {})
+    params = KafkaSettings(FAILED_BUFFER_MAX_BACKOFF_SEC=0.01)
+    monkeypatch.setattr(KafkaBroker, "_params", params, raising=False)
+    monkeypatch.setattr(KafkaBroker, "_collector", collector, raising=False)
+    monkeypatch.setattr(KafkaBroker, "consumer", consumer, raising=False)
+    monkeypatch.setattr(KafkaBroker, "prepare_objs", prepare_objs)
+    return KafkaBroker
@@ -0,0 +1,76 @@
+import asyncio
+from unittest.mock import (
+    AsyncMock,
+    Mock,
+)
+
+import aiokafka
+import pytest
+
+from services.broker import KafkaBroker
+from services.broker.kafka.partition_worker import PartitionRebalanceListener
+from tests.unit.services.broker.kafka.conftest import (
+    TOPIC,
+    Project,
+    add_listener,
+    make_records,
+)
+
+
+PARTITION = aiokafka.TopicPartition(TOPIC, 0)
+
+
+@pytest.mark.asyncio
+async def test_revoke_does_not_wait_for_pending_fetch(kafka_broker: type[KafkaBroker], consumer: Mock) -> None:
+    consumer.assignment.return_value = {PARTITION}
+    fetched = asyncio.Event()
+
+    async def getmany(*partitions: aiokafka.TopicPartition, timeout_ms: int, max_records: int):
+        if not fetched.is_set():
+            fetched.set()
+            return {PARTITION: make_records(PARTITION, 2)}
+        await asyncio.Future()  # no more records until the rebalance is over
+
+    consumer.getmany = AsyncMock(side_effect=getmany)
+    handler = AsyncMock()
+    add_listener(kafka_broker, handler, messages_count=10)
+    rebalance_listener = PartitionRebalanceListener(broker=kafka_broker)
+    await rebalance_listener.on_partitions_assigned({PARTITION})
+    await fetched.wait()
+    await asyncio.sleep(0)
+
+    await asyncio.wait_for(rebalance_listener.on_partitions_revoked({PARTITION}), timeout=1.0)
+
+    handler.assert_awaited_once_with([Project(name="0-0"), Project(name="0-1")])
+    consumer.commit.assert_awaited_once_with({PARTITION: 2})
+    assert not kafka_broker._partition_workers  # pylint: disable=protected-access
+
+
+@pytest.mark.asyncio
+async def test_failed_buffer_is_retried_with_partition_paused(kafka_broker: type[KafkaBroker], consumer: Mock) -> None:
+    consumer.assignment.return_value = {PARTITION}
+    records = [make_records(PARTITION, 2)]
+
+    async def getmany(*partitions: aiokafka.TopicPartition, timeout_ms: int, max_records: int):
+        if records:
+            return {PARTITION: records.pop()}
+        await asyncio.sleep(timeout_ms / 1000)
+        return {}
+
+    consumer.getmany = AsyncMock(side_effect=getmany)
+    handler = AsyncMock(side_effect=[RuntimeError("Database is unavailable"), RuntimeError("Still unavailable"), None])
+    add_listener(kafka_broker, handler, messages_count=2)
+    rebalance_listener = PartitionRebalanceListener(broker=kafka_broker)
+    await rebalance_listener.on_partitions_assigned({PARTITION})
+    for _ in range(100):
+        if consumer.commit.await_count:
+            break
+        await asyncio.sleep(0.01)
+
+    worker = kafka_broker._partition_workers[PARTITION]  # pylint: disable=protected-access
+    assert not worker._task.done()  # pylint: disable=protected-access
+    assert handler.await_count == 3
+    consumer.commit.assert_awaited_once_with({PARTITION: 2})
+    consumer.pause.assert_called_with(PARTITION)
+    consumer.resume.assert_called_once_with(PARTITION)
+    await rebalance_listener.on_partitions_revoked({PARTITION})
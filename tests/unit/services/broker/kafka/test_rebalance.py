@@ -0,0 +1,81 @@
+import asyncio
+from unittest.mock import (
+    AsyncMock,
+    Mock,
+)
+
+import aiokafka
+import pytest
+
+from services.broker import KafkaBroker
+from services.broker.kafka.rebalance_listener import BackpressureRebalanceListener
+from tests.unit.services.broker.kafka.conftest import (
+    TOPIC,
+    Project,
+    add_listener,
+    make_records,
+)
+
+
+REVOKED = aiokafka.TopicPartition(TOPIC, 0)
+KEPT = aiokafka.TopicPartition(TOPIC, 1)
+
+@pytest.mark.asyncio
+async def test_queued_records_of_revoked_partition_are_not_processed(
+    kafka_broker: type[KafkaBroker], consumer: Mock
+) -> None:
+    handler = AsyncMock()
+    listener = add_listener(kafka_broker, handler, messages_count=10)
+    consumer.assignment.return_value = {REVOKED, KEPT}
+    kafka_broker._dispatch(make_records(REVOKED, 3))  # pylint: disable=protected-access
+    kafka_broker._dispatch(make_records(KEPT, 2))  # pylint: disable=protected-access
+
+    consumer.assignment.return_value = {KEPT}
+    await BackpressureRebalanceListener(broker=kafka_broker).on_partitions_revoked({REVOKED})
+    capacitor = asyncio.create_task(kafka_broker.capacitor(listener))
+    await asyncio.sleep(0.2)
+    capacitor.cancel()
+
+    handler.assert_awaited_once_with([Project(name="1-0"), Project(name="1-1")])
+    consumer.commit.assert_awaited_once_with({KEPT: 2})
+    assert listener.queue_depth == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_buffer_of_revoked_partition_is_not_retried(
+    kafka_broker: type[KafkaBroker], consumer: Mock
+) -> None:
+    consumer.assignment.return_value = {REVOKED}
+
+    async def fail_and_revoke(projects: list[Project]) -> None:
+        consumer.assignment.return_value = set()
+        raise RuntimeError("Database is unavailable")
+
+    handler = AsyncMock(side_effect=fail_and_revoke)
+    listener = add_listener(kafka_broker, handler, messages_count=10)
+
+    processing = kafka_broker._process_until_success(  # pylint: disable=protected-access
+        listener=listener, buffer=make_records(REVOKED, 3)
+    )
+    await asyncio.wait_for(processing, timeout=1.0)
+
+    assert handler.await_count == 1
+    consumer.commit.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_failed_commit_is_not_retried_as_processing_error(
+    kafka_broker: type[KafkaBroker], consumer: Mock
+) -> None:
+    consumer.assignment.return_value = {KEPT}
+    consumer.commit.side_effect = aiokafka.errors.CommitFailedError("Group is rebalancing")
+    handler = AsyncMock()
+    listener = add_listener(kafka_broker, handler, messages_count=10)
+
+    processing = kafka_broker._process_until_success(  # pylint: disable=protected-access
+        listener=listener, buffer=make_records(KEPT, 3)
+    )
+    await asyncio.wait_for(processing, timeout=1.0)
+
+    assert handler.await_count == 1
+    assert listener.metrics.processing_error.inc.call_count == 0
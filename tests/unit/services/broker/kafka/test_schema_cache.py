@@ -0,0 +1,191 @@
+import asyncio
+import json
+import time
+from pathlib import Path
+from unittest.mock import Mock
+
+import pytest
+from confluent_kafka.schema_registry import SchemaRegistryClient
+
+from services.broker.kafka.schema_cache import SchemaCache
+from tests.unit.services.broker.kafka.conftest import StandInRegistry
+
+
+SUBJECT = "dev.admin.cdc.project.0-value"
+PROJECT_SCHEMA = {
+    "type": "record",
+    "name": "Project",
+    "fields": [{"name": "name", "type": "string"}],
+}
+PROJECT_SCHEMA_V2 = {
+    "type": "record",
+    "name": "Project",
+    "fields": [
+        {"name": "name", "type": "string"},
+        {"name": "description", "type": ["null", "string"], "default": None},
+    ],
+}
+LATEST_PATH = f"/subjects/{SUBJECT}/versions/latest"
+
+
+def make_cache(
+    schema_registry_client: SchemaRegistryClient,
+    collector: Mock,
+    snapshot_path: Path | None = None,
+    ttl_sec: float = 300.0,
+) -> SchemaCache:
+    return SchemaCache(
+        schema_registry_client=schema_registry_client,
+        collector=collector,
+        ttl_sec=ttl_sec,
+        snapshot_path=str(snapshot_path) if snapshot_path else None,
+    )
+
+
+def expire(schema_cache: SchemaCache, subject: str, ttl_sec: float) -> None:
+    """Makes the cached latest version of the subject older than TTL"""
+    schema_cache._subjects[subject].fetched_at = time.monotonic() - ttl_sec  # pylint: disable=protected-access
+
+
+@pytest.mark.asyncio
+async def test_latest_version_is_served_from_cache(
+    registry: StandInRegistry, schema_registry_client: SchemaRegistryClient, collector: Mock
+) -> None:
+    schema_id = registry.register(SUBJECT, PROJECT_SCHEMA)
+    schema_cache = make_cache(schema_registry_client, collector)
+
+    first = await schema_cache.get_latest(SUBJECT)
+    second = await schema_cache.get_latest(SUBJECT)
+
+    assert first is second
+    assert first.schema_id == schema_id
+    assert registry.requests[LATEST_PATH] == 1
+    assert collector.increment_schema_cache_miss.call_count == 1
+    assert collector.increment_schema_cache_hit.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_single_request(
+    registry: StandInRegistry, schema_registry_client: SchemaRegistryClient, collector: Mock
+) -> None:
+    registry.register(SUBJECT, PROJECT_SCHEMA)
+    schema_cache = make_cache(schema_registry_client, collector)
+
+    results = await asyncio.gather(*(schema_cache.get_latest(SUBJECT) for _ in range(10)))
+
+    assert len({id(result) for result in results}) == 1
+    assert registry.requests[LATEST_PATH] == 1
+
+
+@pytest.mark.asyncio
+async def test_schema_by_id_is_fetched_once(
+    registry: StandInRegistry, schema_registry_client: SchemaRegistryClient, collector: Mock
+) -> None:
+    schema_id = registry.register(SUBJECT, PROJECT_SCHEMA)
+    schema_cache = make_cache(schema_registry_client, collector)
+
+    first = await schema_cache.get_by_id(schema_id)
+    second = await schema_cache.get_by_id(schema_id)
+
+    assert first is second
+    assert first["name"] == "Project"
+    assert registry.requests[f"/schemas/ids/{schema_id}"] == 1
+
+
+@pytest.mark.asyncio
+async def test_expired_version_is_refetched(
+    registry: StandInRegistry, schema_registry_client: SchemaRegistryClient, collector: Mock
+) -> None:
+    registry.register(SUBJECT, PROJECT_SCHEMA)
+    schema_cache = make_cache(schema_registry_client, collector, ttl_sec=60.0)
+    await schema_cache.get_latest(SUBJECT)
+    new_schema_id = registry.register(SUBJECT, PROJECT_SCHEMA_V2)
+    expire(schema_cache, SUBJECT, ttl_sec=60.0)
+
+    cached_schema = await schema_cache.get_latest(SUBJECT)
+
+    assert cached_schema.schema_id == new_schema_id
+    assert registry.requests[LATEST_PATH] == 2
+
+
+@pytest.mark.asyncio
+async def test_stale_version_is_served_while_registry_is_unavailable(
+    registry: StandInRegistry, schema_registry_client: SchemaRegistryClient, collector: Mock
+) -> None:
+    schema_id = registry.register(SUBJECT, PROJECT_SCHEMA)
+    schema_cache = make_cache(schema_registry_client, collector, ttl_sec=60.0)
+    await schema_cache.get_latest(SUBJECT)
+    registry.available = False
+    expire(schema_cache, SUBJECT, ttl_sec=60.0)
+
+    cached_schema = await schema_cache.get_latest(SUBJECT)
+
+    assert cached_schema.schema_id == schema_id
+    assert registry.requests[LATEST_PATH] > 1
+
+
+@pytest.mark.asyncio
+async def test_miss_fails_while_registry_is_unavailable(
+    registry: StandInRegistry, schema_registry_client: SchemaRegistryClient, collector: Mock
+) -> None:
+    registry.register(SUBJECT, PROJECT_SCHEMA)
+    registry.available = False
+    schema_cache = make_cache(schema_registry_client, collector)
+
+    with pytest.raises(Exception):
+        await schema_cache.get_latest(SUBJECT)
+
+
+@pytest.mark.asyncio
+async def test_snapshot_is_used_while_registry_is_unavailable(
+    registry: StandInRegistry, schema_registry_client: SchemaRegistryClient, collector: Mock, tmp_path: Path
+) -> None:
+    snapshot_path = tmp_path / "schemas.json"
+    schema_id = registry.register(SUBJECT, PROJECT_SCHEMA)
+    await make_cache(schema_registry_client, collector, snapshot_path=snapshot_path).warm_up(subjects=[SUBJECT])
+    registry.available = False
+    requests_before = sum(registry.requests.values())
+
+    schema_cache = make_cache(schema_registry_client, collector, snapshot_path=snapshot_path)
+    await schema_cache.warm_up(subjects=[])
+
+    assert (await schema_cache.get_latest(SUBJECT)).schema_id == schema_id
+    assert (await schema_cache.get_by_id(schema_id))["name"] == "Project"
+    assert sum(registry.requests.values()) == requests_before
+
+
+@pytest.mark.asyncio
+async def test_snapshot_is_not_changed_by_concurrent_fetches(
+    registry: StandInRegistry, schema_registry_client: SchemaRegistryClient, collector: Mock, tmp_path: Path
+) -> None:
+    snapshot_path = tmp_path / "schemas.json"
+    registry.register(SUBJECT, PROJECT_SCHEMA)
+    other_schema_id = registry.register("other-value", PROJECT_SCHEMA_V2)
+    schema_cache = make_cache(schema_registry_client, collector, snapshot_path=snapshot_path)
+    await schema_cache.get_latest(SUBJECT)
+    save_snapshot = Mock(wraps=schema_cache._save_snapshot)  # pylint: disable=protected-access
+    schema_cache._save_snapshot = save_snapshot  # pylint: disable=protected-access
+
+    await asyncio.gather(schema_cache.save_snapshot(), schema_cache.get_by_id(other_schema_id))
+
+    first_snapshot = save_snapshot.call_args_list[0].args[0]
+    assert list(first_snapshot["subjects"]) == [SUBJECT]
+    assert str(other_schema_id) not in first_snapshot["schemas"]
+
+
+@pytest.mark.asyncio
+async def test_schema_by_id_is_saved_to_snapshot(
+    registry: StandInRegistry, schema_registry_client: SchemaRegistryClient, collector: Mock, tmp_path: Path
+) -> None:
+    snapshot_path = tmp_path / "schemas.json"
+    schema_id = registry.register(SUBJECT, PROJECT_SCHEMA)
+    await make_cache(schema_registry_client, collector, snapshot_path=snapshot_path).get_by_id(schema_id)
+    registry.available = False
+
+    # The client caches schemas by ID too, so the restarted service gets a new one
+    restarted_client = SchemaRegistryClient(conf={"url": registry.url})
+    schema_cache = make_cache(restarted_client, collector, snapshot_path=snapshot_path)
+    await schema_cache.warm_up(subjects=[])
+
+    assert (await schema_cache.get_by_id(schema_id))["name"] == "Project"
+    assert registry.requests[f"/schemas/ids/{schema_id}"] == 1